@@ -0,0 +1,106 @@
+"""Missed check-in alarms.
+
+Each user's deadline is stored in ``users.alarm_due_at``. Check-ins set it to
+``last_checkin_at + alarm_hours``, and profile updates move it when
+``alarm_hours`` changes. A partial index covers only the armed rows, so a scan
+touches the alarms that are due and not the whole user table.
+
+``fire_due_alarms`` claims due alarms with a single
+``UPDATE ... SET alarm_due_at = NULL ... RETURNING``. It inserts the
+notifications in the same transaction, so an alarm fires at most once even
+when several workers scan at the same time. The next check-in re-arms it.
+
+Escalation goes to the user's contacts. A contact receives an in-app
+notification when their phone number belongs to a registered user.
+"""
+
+import os
+from datetime import datetime
+
+from sqlalchemy import case, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from .models import Contact, Notification, User
+from .unread_counts import count_new_notifications
+from .user_cache import invalidate_after_commit
+
+ALARM_BATCH_SIZE = int(os.getenv("ALARM_BATCH_SIZE", "500"))
+
+
+def alarm_deadline(checked_in_at, hours=User.alarm_hours):
+    """SQL expression for ``checked_in_at + hours``, evaluated against the user row."""
+    return func.datetime(checked_in_at, func.printf("%d hours", hours))
+
+
+def arm_alarm(user: User, checked_in_at: datetime) -> None:
+    """Record a check-in time and re-arm the alarm (applied on the next flush)."""
+    user.last_checkin_at = checked_in_at
+    user.alarm_due_at = alarm_deadline(checked_in_at)
+
+
+def reschedule_alarm(user: User, alarm_hours: int) -> None:
+    """Move an armed alarm to a new ``alarm_hours``; a fired alarm stays cleared."""
+    user.alarm_due_at = case(
+        (User.alarm_due_at.is_not(None), alarm_deadline(User.last_checkin_at, alarm_hours)),
+        else_=None,
+    )
+
+
+def alarm_message(name: str, alarm_hours: int) -> str:
+    return f"{name} 已超过 {alarm_hours} 小时未打卡，请尽快确认 TA 的情况"
+
+
+def fire_due_alarms(db: Session, batch_size: int = ALARM_BATCH_SIZE) -> int:
+    """Claim and escalate every alarm due now; returns alarms fired."""
+    now = datetime.utcnow()
+    fired = 0
+    while True:
+        due = (
+            select(User.id)
+            .where(User.alarm_due_at <= now)
+            .order_by(User.alarm_due_at)
+            .limit(batch_size)
+            .scalar_subquery()
+        )
+        claimed = db.execute(
+            update(User)
+            .where(User.id.in_(due), User.alarm_due_at <= now)
+            .values(alarm_due_at=None)
+            .returning(User.id, User.nickname, User.phone, User.alarm_hours),
+            execution_options={"synchronize_session": False},
+        ).all()
+        if not claimed:
+            db.commit()
+            return fired
+
+        users = {row.id: row for row in claimed}
+        contact_rows = db.execute(
+            select(Contact.user_id, User.id)
+            .join(User, User.phone == Contact.phone)
+            .where(Contact.user_id.in_(users), User.id != Contact.user_id)
+        ).all()
+        notifications = []
+        seen: set[tuple[int, int]] = set()
+        for owner_id, contact_user_id in contact_rows:
+            if (owner_id, contact_user_id) in seen:
+                continue
+            seen.add((owner_id, contact_user_id))
+            owner = users[owner_id]
+            notifications.append(
+                {
+                    "user_id": contact_user_id,
+                    "from_user_id": owner_id,
+                    "related_user_id": owner_id,
+                    "kind": "alarm",
+                    "message": alarm_message(owner.nickname or owner.phone, owner.alarm_hours),
+                    "created_at": now,
+                }
+            )
+        if notifications:
+            db.execute(insert(Notification), notifications)
+            count_new_notifications(db, notifications)
+        invalidate_after_commit(db, users)
+        db.commit()
+        fired += len(claimed)
+        if len(claimed) < batch_size:
+            return fired
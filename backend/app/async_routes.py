@@ -0,0 +1,81 @@
+"""Serve the sync routers on the event loop when DB_MODE=async.
+
+Route handlers are written once, against a sync ``Session``. In async mode each
+handler is wrapped in an ``async def`` that receives an ``AsyncSession`` and
+runs the original body through ``AsyncSession.run_sync``, so requests no longer
+occupy a threadpool slot while they wait on the database. ``run_sync`` runs on
+the event loop. Handlers without a session still run in the threadpool, and
+CPU-heavy steps such as decoding images belong in sync dependencies, which
+FastAPI runs in the threadpool before the handler.
+"""
+
+import functools
+import inspect
+
+from fastapi import APIRouter
+from fastapi.params import Depends as DependsParam
+from fastapi.routing import APIRoute
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .db import get_async_db, get_db
+from .models import User
+from .security import get_current_user, get_current_user_async
+
+ASYNC_DEPENDENCIES = {
+    get_db: (get_async_db, AsyncSession),
+    get_current_user: (get_current_user_async, User),
+}
+
+
+def asyncify_endpoint(endpoint):
+    signature = inspect.signature(endpoint)
+    parameters = []
+    db_param = None
+    for param in signature.parameters.values():
+        default = param.default
+        if isinstance(default, DependsParam) and default.dependency in ASYNC_DEPENDENCIES:
+            if default.dependency is get_db:
+                db_param = param.name
+            dependency, annotation = ASYNC_DEPENDENCIES[default.dependency]
+            param = param.replace(
+                default=DependsParam(dependency, use_cache=default.use_cache),
+                annotation=annotation,
+            )
+        parameters.append(param)
+
+    @functools.wraps(endpoint)
+    async def wrapper(**kwargs):
+        if db_param is None:
+            return await run_in_threadpool(endpoint, **kwargs)
+        db: AsyncSession = kwargs[db_param]
+        return await db.run_sync(lambda session: endpoint(**{**kwargs, db_param: session}))
+
+    wrapper.__signature__ = signature.replace(parameters=parameters)
+    return wrapper
+
+
+def asyncify_router(router: APIRouter) -> APIRouter:
+    async_router = APIRouter()
+    for route in router.routes:
+        if not isinstance(route, APIRoute) or inspect.iscoroutinefunction(route.endpoint):
+            async_router.routes.append(route)
+            continue
+        async_router.add_api_route(
+            route.path,
+            asyncify_endpoint(route.endpoint),
+            methods=list(route.methods),
+            response_model=route.response_model,
+            status_code=route.status_code,
+            tags=route.tags,
+            dependencies=route.dependencies,
+            summary=route.summary,
+            description=route.description,
+            response_description=route.response_description,
+            responses=route.responses,
+            deprecated=route.deprecated,
+            name=route.name,
+            response_class=route.response_class,
+            include_in_schema=route.include_in_schema,
+        )
+    return async_router
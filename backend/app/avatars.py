@@ -0,0 +1,160 @@
+"""Content-addressed avatar storage.
+
+Uploaded images are keyed by a hash of their bytes and rendered once into a
+square WebP at ``AVATAR_SIZE`` and a thumbnail at ``THUMBNAIL_SIZE``:
+
+    {AVATAR_DIR}/ab/ab12...ef.webp
+    {AVATAR_DIR}/ab/ab12...ef-128.webp
+
+``users.avatar_url`` and ``contacts.avatar_url`` store the short path
+``/avatars/<key>.webp``. Responses turn it into a public URL, using the
+thumbnail where a list only shows a small avatar. A file's content never
+changes, so ``GET /avatars/...`` is served with an immutable cache header.
+Inline ``data:`` URLs sent by older clients are stored the same way on
+write. ``python -m app.manage extract-avatars`` converts the ones already in
+the database.
+"""
+
+import base64
+import binascii
+import hashlib
+import io
+import logging
+import os
+import re
+import tempfile
+from pathlib import Path
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from .models import Contact, User
+from .versions import bump_user_versions
+
+logger = logging.getLogger(__name__)
+
+AVATAR_DIR = Path(os.getenv("AVATAR_DIR", "./avatars"))
+# Prefix clients need to reach the API, e.g. "/api" behind the Vite proxy.
+AVATAR_PUBLIC_BASE = os.getenv("AVATAR_PUBLIC_BASE", "").rstrip("/")
+AVATAR_MAX_BYTES = int(os.getenv("AVATAR_MAX_BYTES", str(5 * 1024 * 1024)))
+# Checked against the header before any pixel data is decoded.
+AVATAR_MAX_PIXELS = int(os.getenv("AVATAR_MAX_PIXELS", "40000000"))
+AVATAR_EXTRACT_BATCH_SIZE = int(os.getenv("AVATAR_EXTRACT_BATCH_SIZE", "100"))
+
+AVATAR_SIZE = 512
+THUMBNAIL_SIZE = 128
+AVATAR_PATH = "/avatars/"
+AVATAR_FILE_NAME = re.compile(rf"^([0-9a-f]{{32}})(-{THUMBNAIL_SIZE})?\.webp$")
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+class InvalidAvatar(ValueError):
+    pass
+
+
+def avatar_file(name: str) -> Path:
+    return AVATAR_DIR / name[:2] / name
+
+
+def render(image: Image.Image, size: int) -> bytes:
+    square = ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS)
+    buffer = io.BytesIO()
+    square.save(buffer, "WEBP", quality=85, method=4)
+    return buffer.getvalue()
+
+
+def write_atomically(path: Path, data: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    with os.fdopen(fd, "wb") as handle:
+        handle.write(data)
+    os.replace(tmp, path)
+
+
+def store_avatar(data: bytes) -> str:
+    """Store an uploaded image and its thumbnail; returns the stored ``/avatars/...`` path."""
+    if len(data) > AVATAR_MAX_BYTES:
+        raise InvalidAvatar("Image too large")
+    key = hashlib.sha256(data).hexdigest()[:32]
+    name = f"{key}.webp"
+    thumbnail = f"{key}-{THUMBNAIL_SIZE}.webp"
+    if not (avatar_file(name).exists() and avatar_file(thumbnail).exists()):
+        try:
+            with Image.open(io.BytesIO(data)) as image:
+                if image.width * image.height > AVATAR_MAX_PIXELS:
+                    raise InvalidAvatar("Image too large")
+                image = ImageOps.exif_transpose(image)
+                image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+        except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as exc:
+            raise InvalidAvatar("Invalid image") from exc
+        write_atomically(avatar_file(thumbnail), render(image, THUMBNAIL_SIZE))
+        write_atomically(avatar_file(name), render(image, AVATAR_SIZE))
+    return AVATAR_PATH + name
+
+
+def decode_data_url(value: str) -> bytes:
+    header, _, payload = value.partition(",")
+    if not header.startswith("data:image/") or not header.endswith(";base64"):
+        raise InvalidAvatar("Invalid image")
+    try:
+        return base64.b64decode(payload, validate=True)
+    except (binascii.Error, ValueError) as exc:
+        raise InvalidAvatar("Invalid image") from exc
+
+
+def stored_avatar_url(value: str | None) -> str | None:
+    """Normalize an ``avatar_url`` from a request into what the database stores.
+
+    Inline images are stored on disk, and our own public URLs (as echoed back
+    by clients) are reduced to the stored path. Other URLs pass through.
+    """
+    if not value:
+        return None
+    if value.startswith("data:"):
+        return store_avatar(decode_data_url(value))
+    path = value.removeprefix(AVATAR_PUBLIC_BASE) if AVATAR_PUBLIC_BASE else value
+    if path.startswith(AVATAR_PATH):
+        match = AVATAR_FILE_NAME.match(path.removeprefix(AVATAR_PATH))
+        if not match:
+            raise InvalidAvatar("Invalid avatar URL")
+        return f"{AVATAR_PATH}{match.group(1)}.webp"
+    return value
+
+
+def public_avatar_url(stored: str | None, thumbnail: bool = False) -> str | None:
+    if not stored or not stored.startswith(AVATAR_PATH):
+        return stored
+    if thumbnail:
+        stored = stored.removesuffix(".webp") + f"-{THUMBNAIL_SIZE}.webp"
+    return AVATAR_PUBLIC_BASE + stored
+
+
+def extract_inline_avatars(db: Session, batch_size: int = AVATAR_EXTRACT_BATCH_SIZE) -> int:
+    """Move inline ``data:`` avatars of users and contacts to disk; returns rows converted."""
+    converted = 0
+    for model in (User, Contact):
+        last_id = 0
+        while True:
+            rows = db.execute(
+                select(model.id, model.avatar_url)
+                .where(model.id > last_id, model.avatar_url.like("data:%"))
+                .order_by(model.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+            values = []
+            for row in rows:
+                try:
+                    values.append({"id": row.id, "avatar_url": stored_avatar_url(row.avatar_url)})
+                except InvalidAvatar:
+                    logger.warning("%s %d: inline avatar is not a valid image, left as is", model.__tablename__, row.id)
+            if values:
+                db.execute(update(model), values)
+                if model is User:
+                    bump_user_versions(db, [value["id"] for value in values])
+            db.commit()
+            converted += len(values)
+    return converted
@@ -1,14 +1,104 @@
-from sqlalchemy import create_engine
+import logging
+import os
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from . import config  # noqa: F401  (loads backend/.env)
+
+logger = logging.getLogger(__name__)
+
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./checkins.db")
+# "sync" serves requests from the threadpool with Session, "async" runs them on
+# the event loop with AsyncSession (aiosqlite for SQLite).
+DB_MODE = os.getenv("DB_MODE", "sync")
+if DB_MODE not in ("sync", "async"):
+    raise RuntimeError(f"DB_MODE must be 'sync' or 'async', got {DB_MODE!r}")
+
+# SQLite tuning, applied on every new DBAPI connection.
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+# Negative values are KiB, positive values are pages (SQLite semantics).
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-65536"))
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "20"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "-1"))
+
+
+def is_sqlite(url: str) -> bool:
+    return make_url(url).get_backend_name() == "sqlite"
+
+
+def is_memory_sqlite(url: str) -> bool:
+    parsed = make_url(url)
+    return is_sqlite(url) and parsed.database in (None, "", ":memory:")
+
+
+def to_async_url(url: str) -> str:
+    parsed = make_url(url)
+    if parsed.drivername == "sqlite":
+        parsed = parsed.set(drivername="sqlite+aiosqlite")
+    return parsed.render_as_string(hide_password=False)
+
+
+def engine_options(url: str) -> dict:
+    options: dict = {}
+    if is_sqlite(url):
+        options["connect_args"] = {
+            "check_same_thread": False,
+            "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000,
+        }
+    if not is_memory_sqlite(url):
+        # In-memory SQLite uses a per-thread singleton pool that takes no sizing.
+        options.update(
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+        )
+    return options
 
-DATABASE_URL = "sqlite:///./checkins.db"
 
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False},
-)
+def apply_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"PRAGMA busy_timeout = {SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute(f"PRAGMA journal_mode = {SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous = {SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA mmap_size = {SQLITE_MMAP_SIZE}")
+        cursor.execute(f"PRAGMA cache_size = {SQLITE_CACHE_SIZE}")
+    finally:
+        cursor.close()
+
+
+engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL))
+if is_sqlite(DATABASE_URL):
+    event.listen(engine, "connect", apply_sqlite_pragmas)
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = None
+AsyncSessionLocal = None
+if DB_MODE == "async":
+    async_options = engine_options(DATABASE_URL)
+    if not is_memory_sqlite(DATABASE_URL):
+        # aiosqlite defaults to NullPool; keep the same pool sizing as sync mode.
+        async_options["poolclass"] = AsyncAdaptedQueuePool
+    async_engine = create_async_engine(to_async_url(DATABASE_URL), **async_options)
+    if is_sqlite(DATABASE_URL):
+        event.listen(async_engine.sync_engine, "connect", apply_sqlite_pragmas)
+    # Objects stay loaded after commit: lazy refreshes cannot run outside the greenlet.
+    AsyncSessionLocal = async_sessionmaker(
+        async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+    )
+
 
 class Base(DeclarativeBase):
     pass
@@ -20,3 +110,34 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def describe_engine() -> dict:
+    """Return the settings the running engine actually ended up with."""
+    report: dict = {
+        "mode": DB_MODE,
+        "url": engine.url.render_as_string(hide_password=True),
+        "pool": type(engine.pool).__name__,
+    }
+    if hasattr(engine.pool, "size"):
+        report.update(
+            pool_size=engine.pool.size(),
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+        )
+    if is_sqlite(DATABASE_URL):
+        with engine.connect() as conn:
+            for pragma in ("journal_mode", "synchronous", "busy_timeout", "mmap_size", "cache_size"):
+                report[pragma] = conn.exec_driver_sql(f"PRAGMA {pragma}").scalar()
+    return report
+
+
+def log_engine_settings() -> None:
+    report = describe_engine()
+    logger.info("database settings: %s", ", ".join(f"{k}={v}" for k, v in report.items()))
@@ -0,0 +1,40 @@
+"""Weak ETags and ``If-None-Match`` handling for read-heavy GETs.
+
+A handler builds its tag from the version stamps in app/versions.py (plus the
+user's local date where the response depends on "today"). It then calls
+``not_modified`` before running the query that builds the response. When the
+client's ``If-None-Match`` still matches, the handler returns the 304 at once
+and skips the query and serialization. Otherwise the ETag goes on the normal
+200 response. Tags include the user id, so a browser cache shared across
+logins never revalidates one user's body for another.
+"""
+
+import hashlib
+
+from fastapi import Response
+
+CACHE_HEADERS = {"Cache-Control": "private, no-cache", "Vary": "Authorization"}
+
+
+def weak_etag(*parts) -> str:
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Weak comparison against an ``If-None-Match`` list (RFC 9110 13.1.2)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+def not_modified(response: Response, if_none_match: str | None, etag: str) -> Response | None:
+    """Return a 304 when the client's copy is current; else tag ``response`` and return None."""
+    headers = {"ETag": etag, **CACHE_HEADERS}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
@@ -0,0 +1,146 @@
+"""Argon2 password hashing in a bounded process pool.
+
+Hashing and verifying cost tens of milliseconds of CPU each. Running them in
+request threads lets a login storm hold the GIL and starve every other
+endpoint. Instead they are sent to ``PASSWORD_HASH_WORKERS`` worker
+processes. At most ``PASSWORD_HASH_QUEUE_DEPTH`` calls may be running or
+queued at once, and calls past that limit fail fast with ``PasswordPoolBusy``
+instead of queueing without bound.
+
+In async mode handlers run inside ``AsyncSession.run_sync``. There the wait
+for the worker is awaited through SQLAlchemy's greenlet bridge, so it yields
+to the event loop instead of blocking it.
+
+``PASSWORD_HASH_WORKERS=0`` hashes inline, as before.
+
+Hashes use passlib's Argon2 defaults, as before the pool. ``ARGON2_TIME_COST``,
+``ARGON2_MEMORY_COST`` (KiB) and ``ARGON2_PARALLELISM`` override them for new
+hashes only. Existing hashes carry their own parameters and still verify.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from passlib.context import CryptContext
+from sqlalchemy.util import await_only
+from sqlalchemy.util.concurrency import in_greenlet
+
+# Only the settings given in the environment are passed; the rest stay passlib's.
+ARGON2_SETTINGS = {
+    setting: int(os.environ[name])
+    for setting, name in (
+        ("time_cost", "ARGON2_TIME_COST"),
+        ("memory_cost", "ARGON2_MEMORY_COST"),
+        ("parallelism", "ARGON2_PARALLELISM"),
+    )
+    if os.getenv(name)
+}
+
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_QUEUE_DEPTH = int(
+    os.getenv("PASSWORD_HASH_QUEUE_DEPTH", str(max(1, PASSWORD_HASH_WORKERS) * 8))
+)
+
+pwd_context = CryptContext(
+    schemes=["argon2"],
+    deprecated="auto",
+    **{f"argon2__{setting}": value for setting, value in ARGON2_SETTINGS.items()},
+)
+
+
+class PasswordPoolBusy(RuntimeError):
+    """Raised when the hashing queue is full."""
+
+
+def hash_in_worker(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def verify_in_worker(password: str, hashed: str) -> bool:
+    return pwd_context.verify(password, hashed)
+
+
+def warm_up() -> None:
+    """No-op run once per worker so the first real login skips process start-up."""
+
+
+class PasswordPool:
+    def __init__(self, workers: int, queue_depth: int) -> None:
+        self.workers = workers
+        self.queue_depth = queue_depth
+        self.slots = threading.BoundedSemaphore(queue_depth)
+        self.lock = threading.Lock()
+        self.executor: ProcessPoolExecutor | None = None
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def start(self) -> None:
+        if self.workers <= 0:
+            return
+        with self.lock:
+            if self.executor is None:
+                # spawn: forking a process that already runs threads is unsafe.
+                self.executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+                executor = self.executor
+            else:
+                return
+        for future in [executor.submit(warm_up) for _ in range(self.workers)]:
+            future.result()
+
+    def shutdown(self) -> None:
+        with self.lock:
+            executor, self.executor = self.executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def release(self, _future: Future) -> None:
+        with self.lock:
+            self.in_flight -= 1
+            self.completed += 1
+        self.slots.release()
+
+    def run(self, fn, *args):
+        if self.workers <= 0:
+            return fn(*args)
+        if not self.slots.acquire(blocking=False):
+            with self.lock:
+                self.rejected += 1
+            raise PasswordPoolBusy("password hashing queue is full")
+        with self.lock:
+            self.in_flight += 1
+        try:
+            if self.executor is None:
+                self.start()
+            future = self.executor.submit(fn, *args)
+        except BaseException:
+            with self.lock:
+                self.in_flight -= 1
+            self.slots.release()
+            raise
+        future.add_done_callback(self.release)
+        if in_greenlet():
+            return await_only(asyncio.wrap_future(future))
+        return future.result()
+
+    def stats(self) -> dict:
+        argon2 = pwd_context.handler("argon2")
+        with self.lock:
+            return {
+                "workers": self.workers,
+                "queue_depth": self.queue_depth,
+                "in_flight": self.in_flight,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "time_cost": argon2.default_rounds,
+                "memory_cost": argon2.memory_cost,
+                "parallelism": argon2.parallelism,
+            }
+
+
+password_pool = PasswordPool(PASSWORD_HASH_WORKERS, PASSWORD_HASH_QUEUE_DEPTH)
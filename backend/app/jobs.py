@@ -0,0 +1,76 @@
+"""Periodic maintenance jobs run inside the API process.
+
+``start_jobs`` is called from the app lifespan and starts one asyncio task per
+job with a positive interval. Each run happens in a worker thread with its
+own session, so a slow purge never blocks request handling. Failures are
+logged and the job runs again after the next interval. Every job must be
+safe to run from several worker processes at once. Set an interval to 0 to
+turn a job off, for example on all but one worker.
+"""
+
+import asyncio
+import logging
+import os
+from dataclasses import dataclass
+from typing import Callable
+
+from sqlalchemy.orm import Session
+
+from .alarms import fire_due_alarms
+from .db import SessionLocal
+from .outbox import dispatch_outbox
+from .refresh_tokens import purge_refresh_tokens
+from .retention import archive_notifications
+
+logger = logging.getLogger(__name__)
+
+ALARM_SCAN_INTERVAL_SECONDS = float(os.getenv("ALARM_SCAN_INTERVAL_SECONDS", "30"))
+OUTBOX_DISPATCH_INTERVAL_SECONDS = float(os.getenv("OUTBOX_DISPATCH_INTERVAL_SECONDS", "1"))
+REFRESH_TOKEN_PURGE_INTERVAL_SECONDS = float(os.getenv("REFRESH_TOKEN_PURGE_INTERVAL_SECONDS", "3600"))
+NOTIFICATION_ARCHIVE_INTERVAL_SECONDS = float(os.getenv("NOTIFICATION_ARCHIVE_INTERVAL_SECONDS", "3600"))
+
+
+@dataclass(frozen=True)
+class PeriodicJob:
+    name: str
+    interval_seconds: float
+    run: Callable[[Session], int]
+    log_level: int = logging.INFO
+
+
+JOBS = [
+    PeriodicJob("dispatch-outbox", OUTBOX_DISPATCH_INTERVAL_SECONDS, dispatch_outbox, logging.DEBUG),
+    PeriodicJob("fire-due-alarms", ALARM_SCAN_INTERVAL_SECONDS, fire_due_alarms),
+    PeriodicJob("purge-refresh-tokens", REFRESH_TOKEN_PURGE_INTERVAL_SECONDS, purge_refresh_tokens),
+    PeriodicJob("archive-notifications", NOTIFICATION_ARCHIVE_INTERVAL_SECONDS, archive_notifications),
+]
+
+
+def run_job_once(job: PeriodicJob) -> int:
+    with SessionLocal() as db:
+        return job.run(db)
+
+
+async def run_periodically(job: PeriodicJob) -> None:
+    while True:
+        try:
+            count = await asyncio.to_thread(run_job_once, job)
+            if count:
+                logger.log(job.log_level, "job %s processed %d row(s)", job.name, count)
+        except Exception:
+            logger.exception("job %s failed", job.name)
+        await asyncio.sleep(job.interval_seconds)
+
+
+def start_jobs() -> list[asyncio.Task]:
+    return [
+        asyncio.create_task(run_periodically(job), name=job.name)
+        for job in JOBS
+        if job.interval_seconds > 0
+    ]
+
+
+async def stop_jobs(tasks: list[asyncio.Task]) -> None:
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,99 @@
+"""Group join-code allocation.
+
+Codes are letters only (no I, L or O), so one is never mistaken for a
+numeric group id in ``POST /groups/join``, and at least
+``JOIN_CODE_MIN_LENGTH`` long. A code costs one or two statements and never a
+retry:
+
+* a code released by ``rotate_invite_code`` at least
+  ``JOIN_CODE_RECYCLE_AFTER_DAYS`` ago is reused first, oldest first. The
+  delay keeps old invites from leading into someone else's group right away;
+* otherwise ``join_code_state.next_value`` is taken and mapped to a code by a
+  keyed permutation (a small Feistel network) of the code space. Every
+  sequence number gives a different code, and codes do not reveal their
+  neighbours. The key is generated by the migration and must not change.
+
+Once a length's code space is used up, the sequence carries on into codes
+one character longer. Old 4-digit codes stay valid but are not recycled.
+"""
+
+import hashlib
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.orm import Session
+
+from .models import JoinCodeState, ReleasedJoinCode
+
+JOIN_CODE_ALPHABET = "ABCDEFGHJKMNPQRSTUVWXYZ"
+# Part of the sequence-to-code mapping: changing it would reissue used codes.
+JOIN_CODE_MIN_LENGTH = 6
+JOIN_CODE_RECYCLE_AFTER_DAYS = int(os.getenv("JOIN_CODE_RECYCLE_AFTER_DAYS", "30"))
+
+FEISTEL_ROUNDS = 4
+
+
+def permute(value: int, size: int, key: bytes) -> int:
+    """Keyed bijection of ``range(size)``: Feistel rounds plus cycle-walking."""
+    half_bits = ((size - 1).bit_length() + 1) // 2
+    mask = (1 << half_bits) - 1
+    while True:
+        left, right = value >> half_bits, value & mask
+        for round_number in range(FEISTEL_ROUNDS):
+            digest = hashlib.blake2b(bytes([round_number]) + right.to_bytes(8, "big"), key=key, digest_size=8)
+            left, right = right, left ^ (int.from_bytes(digest.digest(), "big") & mask)
+        value = (left << half_bits) | right
+        # The network permutes a power-of-two range of at most 4 * size, so
+        # walking until the value falls inside takes under two rounds on average.
+        if value < size:
+            return value
+
+
+def code_for_sequence(sequence: int, key: bytes) -> str:
+    length = JOIN_CODE_MIN_LENGTH
+    while sequence >= len(JOIN_CODE_ALPHABET) ** length:
+        sequence -= len(JOIN_CODE_ALPHABET) ** length
+        length += 1
+    value = permute(sequence, len(JOIN_CODE_ALPHABET) ** length, key)
+    chars = []
+    for _ in range(length):
+        value, index = divmod(value, len(JOIN_CODE_ALPHABET))
+        chars.append(JOIN_CODE_ALPHABET[index])
+    return "".join(reversed(chars))
+
+
+def allocate_join_code(db: Session) -> str:
+    """A free join code; the caller commits it together with the group row."""
+    cutoff = datetime.utcnow() - timedelta(days=JOIN_CODE_RECYCLE_AFTER_DAYS)
+    oldest = (
+        select(ReleasedJoinCode.code)
+        .where(ReleasedJoinCode.released_at < cutoff)
+        .order_by(ReleasedJoinCode.released_at)
+        .limit(1)
+        .scalar_subquery()
+    )
+    recycled = db.scalar(
+        delete(ReleasedJoinCode).where(ReleasedJoinCode.code == oldest).returning(ReleasedJoinCode.code),
+        execution_options={"synchronize_session": False},
+    )
+    if recycled:
+        return recycled
+    next_value, key = db.execute(
+        update(JoinCodeState)
+        .where(JoinCodeState.id == 1)
+        .values(next_value=JoinCodeState.next_value + 1)
+        .returning(JoinCodeState.next_value, JoinCodeState.key),
+        execution_options={"synchronize_session": False},
+    ).one()
+    return code_for_sequence(next_value - 1, bytes.fromhex(key))
+
+
+def normalize_join_code(code: str) -> str:
+    return code.strip().upper()
+
+
+def release_join_code(db: Session, code: str) -> None:
+    """Queue a code that no group uses any more for reuse."""
+    if len(code) >= JOIN_CODE_MIN_LENGTH and all(char in JOIN_CODE_ALPHABET for char in code):
+        db.add(ReleasedJoinCode(code=code, released_at=datetime.utcnow()))
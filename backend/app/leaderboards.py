@@ -0,0 +1,260 @@
+"""Per-group leaderboards.
+
+``group_leaderboard_scores`` holds one row per (group, metric, member), and
+the writes that change a score update it in the same transaction:
+
+* ``encouragements``: encouragements sent in the group, all time. Each
+  ``POST /groups/{id}/encourage`` adds one;
+* ``streak``: the member's ``current_streak``, for the day it ends on;
+* ``week``: the member's check-ins in the Monday-based week of their latest
+  check-in.
+
+A new check-in rewrites the streak and week rows of that user in each of
+their groups, and a member who joins gets them seeded from their current
+state. Streak and week rows carry the day or week they belong to in
+``period``. Rows from earlier periods are ignored rather than reset at
+midnight.
+
+Members of one group live in different timezones, so every viewer reads the
+same boards against one reference date, today in ``LEADERBOARD_TIMEZONE``
+(by default the users' default timezone). The live days run from the day
+before the reference date to two days after it. A streak is on the board
+while its row's day is a live day, so it stays while it can still be
+extended. A streak day of a member behind the reference timezone is stored
+that many whole days later. Otherwise their streak would leave the board at
+the reference midnight, while their own day still had hours to run. The week
+board reads the weeks the live days fall in. On a Monday it shows last
+week's count for members who have not checked in this week yet.
+
+The index on ``(group_id, metric, period, score DESC, user_id)`` keeps each
+period's board sorted. The top N is an index seek plus N entries per period
+read: one for ``encouragements``, and one per live day or week for
+``streak`` and ``week``, merged here. Triggers keep
+``group_leaderboard_counts`` in step with every score write. It holds the
+members per bucket of scores, ``score >> level`` for levels 0 to 31. A
+member's rank is one plus the members at higher scores, and equal scores
+share a rank. Any range of higher scores is the union of at most one bucket
+per level, so a rank reads at most 32 rows per period. That cost does not
+depend on members or distinct scores; each score write updates 32 rows.
+``rebuild_leaderboards`` recomputes everything
+(``python -m app.manage rebuild-leaderboards``).
+"""
+
+import heapq
+import os
+from datetime import date, timedelta
+
+from sqlalchemy import Integer, case, column, delete, func, literal, select, table
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from .models import (
+    Checkin,
+    GroupEncouragement,
+    GroupLeaderboardCount,
+    GroupLeaderboardScore,
+    GroupMember,
+    User,
+)
+from .rollups import week_start
+from .timezones import LocalDates, get_zone
+
+LEADERBOARD_METRICS = ("encouragements", "streak", "week")
+# ``period`` of the all-time encouragements metric.
+ALL_TIME = date(1970, 1, 1)
+
+# Defaults to the users.timezone default.
+LEADERBOARD_TIMEZONE = os.getenv("LEADERBOARD_TIMEZONE", "Asia/Shanghai")
+# Streak days fall at most two days after the reference date: timezones are at
+# most 26 hours apart, whether a member is ahead or their day was moved later.
+LIVE_DAYS = 4
+# Levels 0 to 31 of the score buckets in group_leaderboard_counts (migration 014).
+LEVELS = table("group_leaderboard_levels", column("level", Integer))
+
+SCORE_KEY = [GroupLeaderboardScore.group_id, GroupLeaderboardScore.metric, GroupLeaderboardScore.user_id]
+SCORE_COLUMNS = ["group_id", "metric", "user_id", "period", "score"]
+
+
+def live_days(dates: LocalDates) -> list[date]:
+    first = dates.today(LEADERBOARD_TIMEZONE) - timedelta(days=1)
+    return [first + timedelta(days=n) for n in range(LIVE_DAYS)]
+
+
+def leaderboard_periods(metric: str, dates: LocalDates) -> list[date]:
+    """The ``period`` values on the board, the same for every viewer at one instant."""
+    if metric == "streak":
+        return live_days(dates)
+    if metric == "week":
+        return sorted({week_start(day) for day in live_days(dates)})
+    return [ALL_TIME]
+
+
+def days_behind_reference(timezones, dates: LocalDates) -> dict[str, int]:
+    """Whole days, rounded up, each timezone behind ``LEADERBOARD_TIMEZONE`` trails it by now."""
+    reference = dates.now.astimezone(get_zone(LEADERBOARD_TIMEZONE)).utcoffset()
+    behind = {}
+    for timezone in timezones:
+        lag = reference - dates.now.astimezone(get_zone(timezone)).utcoffset()
+        if lag > timedelta(0):
+            behind[timezone] = -(-lag // timedelta(days=1))
+    return behind
+
+
+def week_rate(score: int, period: date, today: date) -> float:
+    """Check-ins per day of the member's week so far, by the member's own today."""
+    days_so_far = min(max((today - period).days + 1, 1), 7)
+    return round(score / days_so_far, 2)
+
+
+def count_group_encouragement(db: Session, group_id: int, user_id: int) -> None:
+    """Add one sent encouragement to the member's score. Call before commit."""
+    stmt = sqlite_insert(GroupLeaderboardScore).values(
+        group_id=group_id, metric="encouragements", user_id=user_id, period=ALL_TIME, score=1
+    )
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=SCORE_KEY, set_={"score": GroupLeaderboardScore.score + 1}
+        )
+    )
+
+
+def refresh_member_scores(db: Session, *member_filter) -> None:
+    """Rewrite the streak and week rows of accepted members matching ``member_filter``.
+
+    Reads the users' stored streak counters and their check-ins since the start
+    of the week of their latest check-in. Call before commit.
+    """
+    db.flush()
+    members = (
+        select(
+            GroupMember.group_id,
+            User.id.label("user_id"),
+            User.timezone,
+            User.last_checkin_date,
+            User.current_streak,
+        )
+        .join(User, User.id == GroupMember.user_id)
+        .where(GroupMember.status == "accepted", User.last_checkin_date.is_not(None), *member_filter)
+        .subquery()
+    )
+    behind = days_behind_reference(db.scalars(select(members.c.timezone).distinct()), LocalDates())
+    streak_day = members.c.last_checkin_date
+    if behind:
+        shift = case(
+            {timezone: f"+{days} days" for timezone, days in behind.items()},
+            value=members.c.timezone,
+            else_="+0 days",
+        )
+        streak_day = func.date(streak_day, shift)
+    week = func.date(members.c.last_checkin_date, "-6 days", "weekday 1")
+    week_count = (
+        select(func.count(Checkin.id))
+        .where(Checkin.user_id == members.c.user_id, Checkin.date >= week)
+        .scalar_subquery()
+    )
+    rows = {
+        "streak": (streak_day, members.c.current_streak),
+        "week": (week, week_count),
+    }
+    for metric, (period, score) in rows.items():
+        stmt = sqlite_insert(GroupLeaderboardScore).from_select(
+            SCORE_COLUMNS,
+            select(members.c.group_id, literal(metric), members.c.user_id, period, score).where(
+                members.c.current_streak > 0
+            ),
+        )
+        db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=SCORE_KEY,
+                set_={"period": stmt.excluded.period, "score": stmt.excluded.score},
+            )
+        )
+
+
+def record_leaderboard_checkin(db: Session, user_id: int) -> None:
+    """Account for a new check-in in every group of the user. Call before commit."""
+    refresh_member_scores(db, GroupMember.user_id == user_id)
+
+
+def seed_member(db: Session, group_id: int, user_id: int) -> None:
+    """Put a newly accepted member on the group's leaderboards. Call before commit."""
+    refresh_member_scores(db, GroupMember.group_id == group_id, GroupMember.user_id == user_id)
+
+
+def leaderboard_top(
+    db: Session, group_id: int, metric: str, periods: list[date], limit: int
+) -> list[tuple[int, int, date, int]]:
+    """(user_id, score, period, rank) of the first ``limit`` places, best first."""
+    boards = [
+        db.execute(
+            select(GroupLeaderboardScore.user_id, GroupLeaderboardScore.score, GroupLeaderboardScore.period)
+            .where(
+                GroupLeaderboardScore.group_id == group_id,
+                GroupLeaderboardScore.metric == metric,
+                GroupLeaderboardScore.period == period,
+            )
+            .order_by(GroupLeaderboardScore.score.desc(), GroupLeaderboardScore.user_id)
+            .limit(limit)
+        ).all()
+        for period in periods
+    ]
+    rows = heapq.merge(*boards, key=lambda row: (-row.score, row.user_id))
+    ranked = []
+    for place, (user_id, score, period) in enumerate(rows, start=1):
+        if place > limit:
+            break
+        rank = ranked[-1][3] if ranked and ranked[-1][1] == score else place
+        ranked.append((user_id, score, period, rank))
+    return ranked
+
+
+def leaderboard_rank(db: Session, group_id: int, metric: str, periods: list[date], user_id: int) -> tuple[int, int]:
+    """(score, rank) of a member; members without a score rank after everyone with one."""
+    score = db.scalar(
+        select(GroupLeaderboardScore.score).where(
+            GroupLeaderboardScore.group_id == group_id,
+            GroupLeaderboardScore.metric == metric,
+            GroupLeaderboardScore.user_id == user_id,
+            GroupLeaderboardScore.period.in_(periods),
+        )
+    )
+    score = score or 0
+    # The scores above ``score`` are, at each level where its bit is 0, the
+    # bucket right after its own; one index seek per such level.
+    own_bucket = literal(score).op(">>")(LEVELS.c.level)
+    members = (
+        select(func.sum(GroupLeaderboardCount.members))
+        .where(
+            GroupLeaderboardCount.group_id == group_id,
+            GroupLeaderboardCount.metric == metric,
+            GroupLeaderboardCount.period.in_(periods),
+            GroupLeaderboardCount.level == LEVELS.c.level,
+            GroupLeaderboardCount.bucket == own_bucket + 1,
+        )
+        .scalar_subquery()
+    )
+    ahead = db.scalar(
+        select(func.coalesce(func.sum(members), 0)).select_from(LEVELS).where(own_bucket.op("&")(1) == 0)
+    )
+    return score, ahead + 1
+
+
+def rebuild_leaderboards(db: Session) -> int:
+    """Recompute every leaderboard row; returns rows written."""
+    db.execute(delete(GroupLeaderboardScore))
+    db.execute(
+        sqlite_insert(GroupLeaderboardScore).from_select(
+            SCORE_COLUMNS,
+            select(
+                GroupEncouragement.group_id,
+                literal("encouragements"),
+                GroupEncouragement.user_id,
+                literal(ALL_TIME, GroupLeaderboardScore.period.type),
+                func.count(GroupEncouragement.id),
+            ).group_by(GroupEncouragement.group_id, GroupEncouragement.user_id),
+        )
+    )
+    refresh_member_scores(db)
+    written = db.scalar(select(func.count()).select_from(GroupLeaderboardScore))
+    db.commit()
+    return written
@@ -1,19 +1,45 @@
+import asyncio
 import logging
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from .db import Base, engine
-from .routers import auth, checkins, notifications, social, groups
-
-Base.metadata.create_all(bind=engine)
+from .async_routes import asyncify_router
+from .db import DB_MODE, async_engine, log_engine_settings
+from .hashing import password_pool
+from .jobs import start_jobs, stop_jobs
+from .migrate import pending_migrations
+from .notification_stream import broker
+from .pagination import NEXT_CURSOR_HEADER
+from .routers import auth, avatars, checkins, notifications, social, groups
+from .user_cache import user_cache
 
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s | %(levelname)s | %(name)s | %(message)s",
 )
 
-app = FastAPI(title="SiLeMe App")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    log_engine_settings()
+    pending = pending_migrations()
+    if pending:
+        logging.getLogger(__name__).warning(
+            "database schema is behind, run `python -m app.manage migrate`: %s", ", ".join(pending)
+        )
+    await asyncio.to_thread(password_pool.start)
+    jobs = start_jobs()
+    jobs.append(asyncio.create_task(broker.tail(notifications.fetch_new_notifications)))
+    yield
+    await stop_jobs(jobs)
+    await asyncio.to_thread(password_pool.shutdown)
+    if async_engine is not None:
+        await async_engine.dispose()
+
+
+app = FastAPI(title="SiLeMe App", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -26,15 +52,22 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
-app.include_router(checkins.router)
-app.include_router(auth.router)
-app.include_router(social.router)
-app.include_router(notifications.router)
-app.include_router(groups.router)
+for router in (checkins.router, auth.router, social.router, notifications.router, groups.router, avatars.router):
+    app.include_router(asyncify_router(router) if DB_MODE == "async" else router)
 
 
 @app.get("/")
 def root():
     return {"status": "ok"}
+
+
+@app.get("/internal/stats")
+def internal_stats():
+    return {
+        "user_cache": user_cache.stats(),
+        "password_pool": password_pool.stats(),
+        "notification_stream": broker.stats(),
+    }
@@ -0,0 +1,145 @@
+"""Maintenance commands, run from backend/:
+
+    python -m app.manage migrate            # apply pending migrations
+    python -m app.manage migrate --status   # list pending migrations only
+    python -m app.manage rebuild-streaks    # recompute stored streak counters
+    python -m app.manage rebuild-rollups    # recompute weekly check-in rollups
+    python -m app.manage purge-tokens       # delete expired and revoked refresh tokens
+    python -m app.manage fire-alarms        # escalate missed check-in alarms that are due
+    python -m app.manage dispatch-outbox    # fan out pending notification events now
+    python -m app.manage rebuild-unread-counts  # recompute unread notification counters
+    python -m app.manage extract-avatars    # move inline data: URL avatars to disk
+    python -m app.manage archive-notifications  # move old notifications to the archive
+    python -m app.manage compact-db         # VACUUM the database and truncate the WAL
+    python -m app.manage rebuild-leaderboards  # recompute group leaderboard scores
+"""
+
+import argparse
+import logging
+
+from .alarms import fire_due_alarms
+from .avatars import extract_inline_avatars
+from .db import SessionLocal
+from .leaderboards import rebuild_leaderboards
+from .migrate import pending_migrations, run_migrations
+from .outbox import dispatch_outbox
+from .refresh_tokens import purge_refresh_tokens
+from .retention import archive_notifications, compact_database
+from .rollups import rebuild_rollups
+from .streaks import rebuild_streaks
+from .unread_counts import rebuild_unread_counts
+
+
+def cmd_migrate(args: argparse.Namespace) -> None:
+    if args.status:
+        pending = pending_migrations()
+        print("\n".join(pending) if pending else "up to date")
+        return
+    applied = run_migrations()
+    print(f"applied {len(applied)} migration(s)")
+
+
+def cmd_rebuild_streaks(args: argparse.Namespace) -> None:
+    with SessionLocal() as db:
+        updated = rebuild_streaks(db)
+    print(f"rebuilt streaks for {updated} user(s)")
+
+
+def cmd_rebuild_rollups(args: argparse.Namespace) -> None:
+    with SessionLocal() as db:
+        written = rebuild_rollups(db)
+    print(f"rebuilt {written} weekly rollup(s)")
+
+
+def cmd_purge_tokens(args: argparse.Namespace) -> None:
+    with SessionLocal() as db:
+        deleted = purge_refresh_tokens(db)
+    print(f"deleted {deleted} refresh token(s)")
+
+
+def cmd_fire_alarms(args: argparse.Namespace) -> None:
+    with SessionLocal() as db:
+        fired = fire_due_alarms(db)
+    print(f"fired {fired} alarm(s)")
+
+
+def cmd_dispatch_outbox(args: argparse.Namespace) -> None:
+    with SessionLocal() as db:
+        dispatched = dispatch_outbox(db)
+    print(f"dispatched {dispatched} notification event(s)")
+
+
+def cmd_rebuild_unread_counts(args: argparse.Namespace) -> None:
+    with SessionLocal() as db:
+        written = rebuild_unread_counts(db)
+    print(f"rebuilt {written} unread counter(s)")
+
+
+def cmd_extract_avatars(args: argparse.Namespace) -> None:
+    with SessionLocal() as db:
+        converted = extract_inline_avatars(db)
+    print(f"extracted {converted} inline avatar(s)")
+
+
+def cmd_archive_notifications(args: argparse.Namespace) -> None:
+    with SessionLocal() as db:
+        archived = archive_notifications(db)
+    print(f"archived {archived} notification(s)")
+
+
+def cmd_compact_db(args: argparse.Namespace) -> None:
+    before, after = compact_database()
+    print(f"compacted database: {before} -> {after} byte(s)")
+
+
+def cmd_rebuild_leaderboards(args: argparse.Namespace) -> None:
+    with SessionLocal() as db:
+        written = rebuild_leaderboards(db)
+    print(f"rebuilt {written} leaderboard score(s)")
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s | %(name)s | %(message)s")
+    parser = argparse.ArgumentParser(prog="python -m app.manage")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    migrate = commands.add_parser("migrate", help="apply pending schema migrations")
+    migrate.add_argument("--status", action="store_true", help="only list pending migrations")
+    migrate.set_defaults(func=cmd_migrate)
+
+    streaks = commands.add_parser("rebuild-streaks", help="recompute streak counters from check-ins")
+    streaks.set_defaults(func=cmd_rebuild_streaks)
+
+    rollups = commands.add_parser("rebuild-rollups", help="recompute weekly check-in rollups")
+    rollups.set_defaults(func=cmd_rebuild_rollups)
+
+    purge = commands.add_parser("purge-tokens", help="delete expired and revoked refresh tokens")
+    purge.set_defaults(func=cmd_purge_tokens)
+
+    alarms = commands.add_parser("fire-alarms", help="escalate missed check-in alarms that are due")
+    alarms.set_defaults(func=cmd_fire_alarms)
+
+    outbox = commands.add_parser("dispatch-outbox", help="fan out pending notification events now")
+    outbox.set_defaults(func=cmd_dispatch_outbox)
+
+    unread = commands.add_parser("rebuild-unread-counts", help="recompute unread notification counters")
+    unread.set_defaults(func=cmd_rebuild_unread_counts)
+
+    avatars = commands.add_parser("extract-avatars", help="move inline data: URL avatars to disk")
+    avatars.set_defaults(func=cmd_extract_avatars)
+
+    archive = commands.add_parser("archive-notifications", help="move old notifications to the archive")
+    archive.set_defaults(func=cmd_archive_notifications)
+
+    compact = commands.add_parser("compact-db", help="VACUUM the database and truncate the WAL")
+    compact.set_defaults(func=cmd_compact_db)
+
+    leaderboards = commands.add_parser("rebuild-leaderboards", help="recompute group leaderboard scores")
+    leaderboards.set_defaults(func=cmd_rebuild_leaderboards)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
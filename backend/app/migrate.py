@@ -0,0 +1,157 @@
+"""Versioned SQL migrations for the SQLite database.
+
+Migrations are the numbered ``NNN_name.sql`` files under ``backend/migrations``,
+applied set by set in ``MIGRATION_SETS`` order and recorded in
+``schema_migrations``. Run them once before starting the workers:
+
+    python -m app.manage migrate
+
+Each file runs in its own ``BEGIN IMMEDIATE`` transaction, so concurrent
+runners serialize on the SQLite write lock and a file is never applied twice.
+A file whose first line is ``-- migrate: per-statement`` commits after every
+statement instead, which keeps index builds on large tables from holding the
+write lock for the whole file; such files must be safe to re-run.
+"""
+
+import logging
+import re
+import sqlite3
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+
+from sqlalchemy.engine import Engine
+
+from .db import engine, is_sqlite
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = Path(__file__).resolve().parents[1] / "migrations"
+MIGRATION_SETS = ("core", "social", "versions")
+MIGRATION_FILE = re.compile(r"^\d{3}_[\w-]+\.sql$")
+PER_STATEMENT_MARKER = "-- migrate: per-statement"
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: str
+    path: Path
+
+    @property
+    def per_statement(self) -> bool:
+        with self.path.open(encoding="utf-8") as handle:
+            return handle.readline().strip() == PER_STATEMENT_MARKER
+
+
+def discover_migrations(root: Path = MIGRATIONS_DIR) -> list[Migration]:
+    migrations: list[Migration] = []
+    for name in MIGRATION_SETS:
+        directory = root / name
+        if not directory.is_dir():
+            continue
+        for path in sorted(directory.iterdir()):
+            if MIGRATION_FILE.match(path.name):
+                migrations.append(Migration(version=f"{name}/{path.stem}", path=path))
+    return migrations
+
+
+def split_statements(sql: str) -> list[str]:
+    statements: list[str] = []
+    buffer = ""
+    for line in sql.splitlines(keepends=True):
+        if not buffer and (not line.strip() or line.lstrip().startswith("--")):
+            continue
+        buffer += line
+        if sqlite3.complete_statement(buffer):
+            statements.append(buffer.strip())
+            buffer = ""
+    if buffer.strip():
+        statements.append(buffer.strip())
+    return statements
+
+
+def ensure_version_table(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        " version TEXT PRIMARY KEY,"
+        " applied_at DATETIME NOT NULL)"
+    )
+
+
+def applied_versions(conn: sqlite3.Connection) -> set[str]:
+    return {row[0] for row in conn.execute("SELECT version FROM schema_migrations")}
+
+
+def execute_statement(conn: sqlite3.Connection, statement: str) -> None:
+    try:
+        conn.execute(statement)
+    except sqlite3.OperationalError as exc:
+        # Databases created by the old create_all() already have these columns.
+        if "duplicate column name" not in str(exc):
+            raise
+        logger.info("skipping already applied statement: %s", statement.splitlines()[0])
+
+
+def apply_migration(conn: sqlite3.Connection, migration: Migration) -> bool:
+    statements = split_statements(migration.path.read_text(encoding="utf-8"))
+    per_statement = migration.per_statement
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if migration.version in applied_versions(conn):
+            conn.execute("ROLLBACK")
+            return False
+        for statement in statements:
+            execute_statement(conn, statement)
+            if per_statement:
+                conn.execute("COMMIT")
+                conn.execute("BEGIN IMMEDIATE")
+        conn.execute(
+            "INSERT INTO schema_migrations (version, applied_at) VALUES (?, ?)",
+            (migration.version, datetime.utcnow().isoformat(sep=" ")),
+        )
+        conn.execute("COMMIT")
+    except BaseException:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    return True
+
+
+def run_migrations(bind: Engine = engine) -> list[str]:
+    if not is_sqlite(str(bind.url)):
+        raise RuntimeError("The migration runner only supports SQLite databases")
+    raw = bind.raw_connection()
+    try:
+        conn: sqlite3.Connection = raw.driver_connection
+        previous_isolation = conn.isolation_level
+        conn.isolation_level = None  # we issue BEGIN/COMMIT ourselves
+        try:
+            ensure_version_table(conn)
+            applied: list[str] = []
+            for migration in discover_migrations():
+                if apply_migration(conn, migration):
+                    logger.info("applied migration %s", migration.version)
+                    applied.append(migration.version)
+            if applied:
+                conn.execute("PRAGMA optimize")
+            return applied
+        finally:
+            conn.isolation_level = previous_isolation
+    finally:
+        raw.close()
+
+
+def pending_migrations(bind: Engine = engine) -> list[str]:
+    """Versions not yet recorded in schema_migrations (cheap; safe at startup)."""
+    if not is_sqlite(str(bind.url)):
+        return []
+    raw = bind.raw_connection()
+    try:
+        conn: sqlite3.Connection = raw.driver_connection
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'schema_migrations'"
+        ).fetchone()
+        done = applied_versions(conn) if exists else set()
+    finally:
+        raw.close()
+    return [m.version for m in discover_migrations() if m.version not in done]
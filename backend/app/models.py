@@ -20,6 +20,14 @@ class User(Base):
     alarm_hours: Mapped[int] = mapped_column(Integer, default=24, nullable=False)
     estate_note: Mapped[str | None] = mapped_column(Text, nullable=True)
     last_checkin_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    # Derived from checkins; see app/streaks.py.
+    current_streak: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    longest_streak: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    last_checkin_date: Mapped[date | None] = mapped_column(Date, nullable=True)
+    # last_checkin_at + alarm_hours while armed; cleared when it fires. See app/alarms.py.
+    alarm_due_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    # Bumped by writes that change what the user's cached GETs return; see app/versions.py.
+    version: Mapped[int] = mapped_column(Integer, default=1, nullable=False)
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), default=datetime.utcnow, nullable=False
     )
@@ -73,6 +81,24 @@ class Checkin(Base):
     note: Mapped[str | None] = mapped_column(Text, nullable=True)
 
 
+class CheckinRollup(Base):
+    """Weekly check-in aggregates per user; see app/rollups.py."""
+
+    __tablename__ = "checkin_rollups"
+    __table_args__ = (UniqueConstraint("user_id", "week_start", name="uq_checkin_rollups_user_week"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
+    week_start: Mapped[date] = mapped_column(Date, nullable=False)  # Monday
+    checkins: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    sleep_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    sleep_sum: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    energy_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    energy_sum: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    mood_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    mood_sum: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+
+
 class Friendship(Base):
     __tablename__ = "friendships"
     __table_args__ = (UniqueConstraint("user_id", "friend_id", name="uq_friendships_pair"),)
@@ -145,6 +171,57 @@ class Notification(Base):
     read_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
 
 
+class NotificationArchive(Base):
+    """Notifications moved out of ``notifications`` by app/retention.py; ids are kept."""
+
+    __tablename__ = "notifications_archive"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
+    from_user_id: Mapped[int | None] = mapped_column(ForeignKey("users.id"), nullable=True)
+    related_group_id: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    related_user_id: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    kind: Mapped[str] = mapped_column(String(32), nullable=False)
+    message: Mapped[str] = mapped_column(String(200), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    read_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
+    archived_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+
+
+class NotificationUnreadCount(Base):
+    """Unread notifications per user, kind and related group; see app/unread_counts.py."""
+
+    __tablename__ = "notification_unread_counts"
+    __table_args__ = (
+        UniqueConstraint("user_id", "kind", "group_id", name="uq_notification_unread_counts_key"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
+    kind: Mapped[str] = mapped_column(String(32), nullable=False)
+    group_id: Mapped[int] = mapped_column(Integer, default=0, nullable=False)  # 0 = no related group
+    unread: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+
+
+class NotificationOutboxEvent(Base):
+    """A notification waiting to be fanned out to its recipients; see app/outbox.py."""
+
+    __tablename__ = "notification_outbox"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    audience: Mapped[str] = mapped_column(String(16), nullable=False)  # user | group_admins
+    target_id: Mapped[int] = mapped_column(Integer, nullable=False)  # user id or group id
+    exclude_user_id: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    from_user_id: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    related_group_id: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    related_user_id: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    kind: Mapped[str] = mapped_column(String(32), nullable=False)
+    message: Mapped[str] = mapped_column(String(200), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=datetime.utcnow, nullable=False
+    )
+
+
 class Group(Base):
     __tablename__ = "groups"
 
@@ -155,11 +232,30 @@ class Group(Base):
     join_code: Mapped[str] = mapped_column(String(16), nullable=False, unique=True)
     owner_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False, index=True)
     announcement: Mapped[str | None] = mapped_column(Text, nullable=True)
+    # Bumped by writes that change the group's GroupOut; see app/versions.py.
+    version: Mapped[int] = mapped_column(Integer, default=1, nullable=False)
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), default=datetime.utcnow, nullable=False
     )
 
 
+class JoinCodeState(Base):
+    """Single row (id 1): the join-code sequence and its permutation key; see app/join_codes.py."""
+
+    __tablename__ = "join_code_state"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    next_value: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    key: Mapped[str] = mapped_column(String(32), nullable=False)
+
+
+class ReleasedJoinCode(Base):
+    __tablename__ = "released_join_codes"
+
+    code: Mapped[str] = mapped_column(String(16), primary_key=True)
+    released_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, index=True)
+
+
 class GroupMember(Base):
     __tablename__ = "group_members"
     __table_args__ = (UniqueConstraint("group_id", "user_id", name="uq_group_members"),)
@@ -197,3 +293,38 @@ class GroupReminder(Base):
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), default=datetime.utcnow, nullable=False
     )
+
+
+class GroupLeaderboardScore(Base):
+    """A member's score on one group leaderboard; see app/leaderboards.py."""
+
+    __tablename__ = "group_leaderboard_scores"
+    __table_args__ = (
+        UniqueConstraint("group_id", "metric", "user_id", name="uq_group_leaderboard_scores_key"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    group_id: Mapped[int] = mapped_column(ForeignKey("groups.id"), nullable=False)
+    metric: Mapped[str] = mapped_column(String(16), nullable=False)  # encouragements | streak | week
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False)
+    # The day or week the score belongs to; a constant for all-time metrics.
+    period: Mapped[date] = mapped_column(Date, nullable=False)
+    score: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+
+
+class GroupLeaderboardCount(Base):
+    """Members per score bucket on one group leaderboard, kept by triggers; see app/leaderboards.py."""
+
+    __tablename__ = "group_leaderboard_counts"
+    __table_args__ = (
+        UniqueConstraint("group_id", "metric", "period", "level", "bucket", name="uq_group_leaderboard_counts_key"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    group_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    metric: Mapped[str] = mapped_column(String(16), nullable=False)
+    period: Mapped[date] = mapped_column(Date, nullable=False)
+    # Scores ``bucket << level`` up to ``((bucket + 1) << level) - 1``.
+    level: Mapped[int] = mapped_column(Integer, nullable=False)
+    bucket: Mapped[int] = mapped_column(Integer, nullable=False)
+    members: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
@@ -0,0 +1,122 @@
+"""In-process pub/sub for ``GET /notifications/stream``.
+
+Each open stream subscribes a bounded ``asyncio.Queue`` for its user. The
+broker has two sources of events:
+
+* a tailer task that polls ``notifications`` for rows newer than the last id
+  it has seen (one query per poll interval per process, however many streams
+  are open) and publishes them to the recipients' local streams, so
+  notifications written by any worker or job are delivered;
+* ``publish_threadsafe`` calls for read-state changes made in this process.
+
+Notification events carry the notification id as the SSE ``id`` so a client
+reconnecting with ``Last-Event-ID`` is replayed what it missed. A subscriber
+whose queue overflows is dropped; its client reconnects and replays from the
+database.
+"""
+
+import asyncio
+import logging
+import os
+from dataclasses import dataclass, field
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+NOTIFICATION_STREAM_POLL_SECONDS = float(os.getenv("NOTIFICATION_STREAM_POLL_SECONDS", "1"))
+NOTIFICATION_STREAM_HEARTBEAT_SECONDS = float(os.getenv("NOTIFICATION_STREAM_HEARTBEAT_SECONDS", "15"))
+NOTIFICATION_STREAM_QUEUE_SIZE = int(os.getenv("NOTIFICATION_STREAM_QUEUE_SIZE", "100"))
+
+
+@dataclass(frozen=True)
+class ServerEvent:
+    event: str
+    data: str
+    id: int | None = None
+
+    def encode(self) -> str:
+        lines = [f"event: {self.event}"]
+        if self.id is not None:
+            lines.append(f"id: {self.id}")
+        lines.extend(f"data: {line}" for line in self.data.splitlines() or [""])
+        return "\n".join(lines) + "\n\n"
+
+
+@dataclass(eq=False)
+class Subscription:
+    user_id: int
+    # ServerEvents, or None once the broker has dropped the subscription.
+    queue: asyncio.Queue = field(default_factory=lambda: asyncio.Queue(NOTIFICATION_STREAM_QUEUE_SIZE))
+
+
+class NotificationBroker:
+    def __init__(self) -> None:
+        self.subscribers: dict[int, set[Subscription]] = {}
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self.last_id: int | None = None
+        self.dropped = 0
+
+    def subscribe(self, user_id: int) -> Subscription:
+        subscription = Subscription(user_id)
+        self.subscribers.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscriptions = self.subscribers.get(subscription.user_id)
+        if subscriptions is None:
+            return
+        subscriptions.discard(subscription)
+        if not subscriptions:
+            del self.subscribers[subscription.user_id]
+
+    def publish(self, user_id: int, event: ServerEvent) -> None:
+        """Deliver to the user's local streams; call on the event loop."""
+        for subscription in list(self.subscribers.get(user_id, ())):
+            try:
+                subscription.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Too slow to keep up: end the stream so the client reconnects
+                # and replays from the database.
+                while not subscription.queue.empty():
+                    subscription.queue.get_nowait()
+                subscription.queue.put_nowait(None)
+                self.dropped += 1
+                self.unsubscribe(subscription)
+
+    def publish_threadsafe(self, user_id: int, event: ServerEvent) -> None:
+        """``publish`` from a worker thread (or from ``run_sync`` on the loop)."""
+        if self.loop is None or user_id not in self.subscribers:
+            return
+        self.loop.call_soon_threadsafe(self.publish, user_id, event)
+
+    async def tail(
+        self, fetch_new: Callable[[int | None, set[int]], tuple[int, list[tuple[int, ServerEvent]]]]
+    ) -> None:
+        """Poll for new notifications and publish them to local subscribers.
+
+        ``fetch_new(after_id, user_ids)`` runs in a thread and returns the
+        highest id seen plus ``(user_id, event)`` pairs for ``user_ids``;
+        with ``after_id=None`` it only returns the current highest id.
+        """
+        self.loop = asyncio.get_running_loop()
+        while True:
+            try:
+                last_id, events = await asyncio.to_thread(fetch_new, self.last_id, set(self.subscribers))
+            except Exception:
+                logger.exception("notification stream poll failed")
+            else:
+                self.last_id = last_id
+                for user_id, event in events:
+                    self.publish(user_id, event)
+            await asyncio.sleep(NOTIFICATION_STREAM_POLL_SECONDS)
+
+    def stats(self) -> dict:
+        return {
+            "connections": sum(len(subscriptions) for subscriptions in self.subscribers.values()),
+            "users": len(self.subscribers),
+            "last_id": self.last_id,
+            "dropped": self.dropped,
+        }
+
+
+broker = NotificationBroker()
@@ -0,0 +1,155 @@
+"""Transactional notification outbox.
+
+Request handlers call ``notify_user`` or ``notify_group_admins``. Each call
+adds one ``notification_outbox`` row to the handler's own transaction, so the
+notification commits or rolls back together with the change it describes.
+The request pays for one row however many recipients there end up being.
+
+``dispatch_outbox`` runs as a periodic job. It claims a batch of events with
+``DELETE ... RETURNING``, expands group audiences with one query, and writes
+all resulting notifications with a single bulk insert, bumping the unread
+counters alongside. The claim and the insert share a transaction, so every
+event is delivered exactly once, even with several workers dispatching.
+"""
+
+import os
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+
+from .models import GroupMember, Notification, NotificationOutboxEvent
+from .unread_counts import count_new_notifications
+
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "500"))
+
+EVENT_COLUMNS = (
+    NotificationOutboxEvent.id,
+    NotificationOutboxEvent.audience,
+    NotificationOutboxEvent.target_id,
+    NotificationOutboxEvent.exclude_user_id,
+    NotificationOutboxEvent.from_user_id,
+    NotificationOutboxEvent.related_group_id,
+    NotificationOutboxEvent.related_user_id,
+    NotificationOutboxEvent.kind,
+    NotificationOutboxEvent.message,
+    NotificationOutboxEvent.created_at,
+)
+
+
+def notify_user(
+    db: Session,
+    user_id: int,
+    *,
+    kind: str,
+    message: str,
+    from_user_id: int | None = None,
+    related_group_id: int | None = None,
+    related_user_id: int | None = None,
+) -> None:
+    db.add(
+        NotificationOutboxEvent(
+            audience="user",
+            target_id=user_id,
+            from_user_id=from_user_id,
+            related_group_id=related_group_id,
+            related_user_id=related_user_id,
+            kind=kind,
+            message=message,
+        )
+    )
+
+
+def notify_group_admins(
+    db: Session,
+    group_id: int,
+    *,
+    kind: str,
+    message: str,
+    exclude_user_id: int | None = None,
+    from_user_id: int | None = None,
+    related_user_id: int | None = None,
+) -> None:
+    """Notify the group's owner and admins as of dispatch time."""
+    db.add(
+        NotificationOutboxEvent(
+            audience="group_admins",
+            target_id=group_id,
+            exclude_user_id=exclude_user_id,
+            from_user_id=from_user_id,
+            related_group_id=group_id,
+            related_user_id=related_user_id,
+            kind=kind,
+            message=message,
+        )
+    )
+
+
+def group_admin_ids(db: Session, group_ids: set[int]) -> dict[int, list[int]]:
+    admins: dict[int, list[int]] = {group_id: [] for group_id in group_ids}
+    if not group_ids:
+        return admins
+    rows = db.execute(
+        select(GroupMember.group_id, GroupMember.user_id)
+        .where(
+            GroupMember.group_id.in_(group_ids),
+            GroupMember.status == "accepted",
+            GroupMember.role.in_(("owner", "admin")),
+        )
+        .order_by(GroupMember.id)
+    )
+    for group_id, user_id in rows:
+        admins[group_id].append(user_id)
+    return admins
+
+
+def dispatch_outbox(db: Session, batch_size: int = OUTBOX_BATCH_SIZE) -> int:
+    """Fan out pending events into notifications; returns events dispatched."""
+    dispatched = 0
+    while True:
+        pending = db.scalar(select(NotificationOutboxEvent.id).limit(1))
+        # End the read transaction: upgrading it to a write under WAL fails
+        # with SQLITE_BUSY if another connection committed in the meantime.
+        db.commit()
+        if pending is None:
+            return dispatched
+
+        batch = (
+            select(NotificationOutboxEvent.id)
+            .order_by(NotificationOutboxEvent.id)
+            .limit(batch_size)
+            .scalar_subquery()
+        )
+        events = db.execute(
+            delete(NotificationOutboxEvent)
+            .where(NotificationOutboxEvent.id.in_(batch))
+            .returning(*EVENT_COLUMNS),
+            execution_options={"synchronize_session": False},
+        ).all()
+        events.sort(key=lambda event: event.id)
+        admins = group_admin_ids(
+            db, {event.target_id for event in events if event.audience == "group_admins"}
+        )
+        rows = []
+        for event in events:
+            recipients = [event.target_id] if event.audience == "user" else admins.get(event.target_id, [])
+            for user_id in recipients:
+                if user_id == event.exclude_user_id:
+                    continue
+                rows.append(
+                    {
+                        "user_id": user_id,
+                        "from_user_id": event.from_user_id,
+                        "related_group_id": event.related_group_id,
+                        "related_user_id": event.related_user_id,
+                        "kind": event.kind,
+                        "message": event.message,
+                        "created_at": event.created_at,
+                    }
+                )
+        if rows:
+            db.execute(insert(Notification), rows)
+            count_new_notifications(db, rows)
+        db.commit()
+        dispatched += len(events)
+        if len(events) < batch_size:
+            return dispatched
@@ -0,0 +1,67 @@
+"""Keyset (cursor) pagination.
+
+A page is ordered by ``(sort column, id)`` and the cursor encodes the last row
+of the previous page, so the next page starts with an index range seek on a
+``(..., sort column, id)`` index instead of skipping ``offset`` rows. Cursors
+are opaque to clients: base64url-encoded JSON of ``[sort value, id]``. List
+endpoints keep returning a plain JSON array and put the cursor for the next
+page in the ``X-Next-Cursor`` response header, which is absent on the last
+page.
+"""
+
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from typing import Callable
+
+from fastapi import HTTPException, Response
+from sqlalchemy import Select, tuple_
+from sqlalchemy.orm import Session
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(value: date | datetime, row_id: int) -> str:
+    raw = json.dumps([value.isoformat(), row_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str, parse: Callable[[str], date | datetime]) -> tuple[date | datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        value, row_id = json.loads(raw)
+        return parse(value), int(row_id)
+    except (binascii.Error, ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset_page(
+    db: Session,
+    stmt: Select,
+    sort_column,
+    id_column,
+    *,
+    limit: int,
+    cursor: str | None,
+    response: Response,
+    descending: bool = True,
+) -> list:
+    """Run ``stmt`` for one page after ``cursor``; sets the next cursor on ``response``."""
+    parse = date.fromisoformat if sort_column.type.python_type is date else datetime.fromisoformat
+    key = tuple_(sort_column, id_column)
+    if cursor:
+        after = tuple_(*decode_cursor(cursor, parse))
+        stmt = stmt.where(key < after if descending else key > after)
+    if descending:
+        stmt = stmt.order_by(sort_column.desc(), id_column.desc())
+    else:
+        stmt = stmt.order_by(sort_column.asc(), id_column.asc())
+    rows = list(db.scalars(stmt.limit(limit + 1)).all())
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(
+            getattr(last, sort_column.key), getattr(last, id_column.key)
+        )
+    return rows
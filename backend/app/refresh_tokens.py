@@ -0,0 +1,71 @@
+"""Refresh-token housekeeping.
+
+Every ``/auth/refresh`` inserts a new row and only revokes the old one, so
+``purge_refresh_tokens`` regularly deletes rows that can no longer be used:
+expired tokens, and revoked tokens older than ``REFRESH_TOKEN_REVOKED_RETENTION_HOURS``.
+It deletes in small committed batches so the SQLite write lock is never held
+for long. It runs from ``app.jobs`` and ``python -m app.manage purge-tokens``.
+
+``active_devices`` lists a user's signed-in devices in SQL: one row per
+(device name, user agent, IP) among the tokens that are still usable.
+"""
+
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, or_, select
+from sqlalchemy.orm import Session
+
+from .models import RefreshToken
+
+REFRESH_TOKEN_PURGE_BATCH_SIZE = int(os.getenv("REFRESH_TOKEN_PURGE_BATCH_SIZE", "1000"))
+REFRESH_TOKEN_REVOKED_RETENTION_HOURS = int(os.getenv("REFRESH_TOKEN_REVOKED_RETENTION_HOURS", "24"))
+
+
+def active_token_filter(now: datetime):
+    return (RefreshToken.revoked_at.is_(None), RefreshToken.expires_at > now)
+
+
+def active_devices(db: Session, user_id: int) -> list[RefreshToken]:
+    """The newest active token per device, newest first."""
+    now = datetime.utcnow()
+    newest = (
+        select(func.max(RefreshToken.id))
+        .where(RefreshToken.user_id == user_id, *active_token_filter(now))
+        .group_by(RefreshToken.device_name, RefreshToken.user_agent, RefreshToken.ip_address)
+    )
+    stmt = (
+        select(RefreshToken)
+        .where(RefreshToken.id.in_(newest))
+        .order_by(RefreshToken.created_at.desc(), RefreshToken.id.desc())
+    )
+    return list(db.scalars(stmt).all())
+
+
+def same_device_filter(token: RefreshToken):
+    return (
+        RefreshToken.user_id == token.user_id,
+        RefreshToken.device_name.is_not_distinct_from(token.device_name),
+        RefreshToken.user_agent.is_not_distinct_from(token.user_agent),
+        RefreshToken.ip_address.is_not_distinct_from(token.ip_address),
+    )
+
+
+def purge_refresh_tokens(db: Session, batch_size: int = REFRESH_TOKEN_PURGE_BATCH_SIZE) -> int:
+    """Delete expired and long-revoked tokens in batches; returns rows deleted."""
+    now = datetime.utcnow()
+    purgeable = or_(
+        RefreshToken.expires_at <= now,
+        RefreshToken.revoked_at < now - timedelta(hours=REFRESH_TOKEN_REVOKED_RETENTION_HOURS),
+    )
+    deleted = 0
+    while True:
+        batch = select(RefreshToken.id).where(purgeable).limit(batch_size).scalar_subquery()
+        result = db.execute(
+            delete(RefreshToken).where(RefreshToken.id.in_(batch)),
+            execution_options={"synchronize_session": False},
+        )
+        db.commit()
+        deleted += result.rowcount
+        if result.rowcount < batch_size:
+            return deleted
@@ -0,0 +1,115 @@
+"""Notification retention.
+
+``notifications`` only keeps what clients still page through.
+``archive_notifications`` moves older rows into ``notifications_archive`` in
+small committed batches:
+
+* read notifications whose ``read_at`` is older than ``NOTIFICATION_RETENTION_DAYS``;
+* unread ones created more than ``NOTIFICATION_UNREAD_RETENTION_DAYS`` ago
+  (0 keeps them), taking them off the unread counters in the same transaction.
+
+Each batch copies and deletes the same ids in one transaction, so a row is
+never in both tables or in neither. Rows keep their id, and
+``GET /notifications/archive`` pages through them. ``notifications.id`` is a
+plain ``INTEGER PRIMARY KEY``, so SQLite numbers new rows from the largest id
+left in the table. The newest notification is therefore never archived:
+deleting it would let a new row reuse an archived id, clash in the archive
+and fall behind the SSE tailer's and clients' last seen ids. The job runs from
+``app.jobs`` and ``python -m app.manage archive-notifications``.
+
+Deleted rows leave free pages in the database file. ``compact_database``
+(``python -m app.manage compact-db``) vacuums them away and truncates the WAL.
+It rewrites the whole file, so run it off-peak rather than on a timer.
+"""
+
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, insert, literal, select, text
+from sqlalchemy.orm import Session
+
+from .db import DATABASE_URL, engine, is_sqlite
+from .models import Notification, NotificationArchive
+from .unread_counts import count_read_notifications
+
+NOTIFICATION_RETENTION_DAYS = int(os.getenv("NOTIFICATION_RETENTION_DAYS", "30"))
+NOTIFICATION_UNREAD_RETENTION_DAYS = int(os.getenv("NOTIFICATION_UNREAD_RETENTION_DAYS", "180"))
+NOTIFICATION_ARCHIVE_BATCH_SIZE = int(os.getenv("NOTIFICATION_ARCHIVE_BATCH_SIZE", "1000"))
+
+ARCHIVED_COLUMNS = (
+    Notification.id,
+    Notification.user_id,
+    Notification.from_user_id,
+    Notification.related_group_id,
+    Notification.related_user_id,
+    Notification.kind,
+    Notification.message,
+    Notification.created_at,
+    Notification.read_at,
+)
+
+
+def archive_batch(db: Session, eligible: tuple, batch_size: int, now: datetime) -> int:
+    eligible = (*eligible, Notification.id < select(func.max(Notification.id)).scalar_subquery())
+    ids = list(db.scalars(select(Notification.id).where(*eligible).limit(batch_size)))
+    if not ids:
+        return 0
+    # Re-check the condition inside the write transaction: a row may have
+    # been read since the SELECT above.
+    batch = (Notification.id.in_(ids), *eligible)
+    db.execute(
+        insert(NotificationArchive).from_select(
+            [column.key for column in ARCHIVED_COLUMNS] + ["archived_at"],
+            select(*ARCHIVED_COLUMNS, literal(now, NotificationArchive.archived_at.type)).where(*batch),
+        )
+    )
+    moved = db.execute(
+        delete(Notification)
+        .where(*batch)
+        .returning(Notification.user_id, Notification.kind, Notification.related_group_id, Notification.read_at),
+        execution_options={"synchronize_session": False},
+    ).all()
+    # Archived unread notifications no longer count as unread.
+    count_read_notifications(
+        db, ((row.user_id, row.kind, row.related_group_id) for row in moved if row.read_at is None)
+    )
+    db.commit()
+    return len(moved)
+
+
+def archive_notifications(db: Session, batch_size: int = NOTIFICATION_ARCHIVE_BATCH_SIZE) -> int:
+    """Move notifications past retention into the archive; returns rows moved."""
+    now = datetime.utcnow()
+    passes = [(Notification.read_at < now - timedelta(days=NOTIFICATION_RETENTION_DAYS),)]
+    if NOTIFICATION_UNREAD_RETENTION_DAYS > 0:
+        passes.append(
+            (
+                Notification.read_at.is_(None),
+                Notification.created_at < now - timedelta(days=NOTIFICATION_UNREAD_RETENTION_DAYS),
+            )
+        )
+    archived = 0
+    for eligible in passes:
+        while True:
+            moved = archive_batch(db, eligible, batch_size, now)
+            archived += moved
+            if moved < batch_size:
+                break
+    return archived
+
+
+def database_size(conn) -> int:
+    return conn.execute(text("PRAGMA page_count")).scalar() * conn.execute(text("PRAGMA page_size")).scalar()
+
+
+def compact_database() -> tuple[int, int]:
+    """VACUUM the SQLite file and truncate the WAL; returns file bytes before and after."""
+    if not is_sqlite(DATABASE_URL):
+        return 0, 0
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        before = database_size(conn)
+        conn.execute(text("VACUUM"))
+        conn.execute(text("PRAGMA wal_checkpoint(TRUNCATE)"))
+        conn.execute(text("PRAGMA optimize"))
+        after = database_size(conn)
+    return before, after
@@ -0,0 +1,139 @@
+"""Weekly check-in rollups.
+
+Every check-in write adds its delta to the ``checkin_rollups`` row for the
+Monday-based week it falls in. ``window_totals``, used by ``/checkins/stats``,
+then reads the whole weeks inside the window from the rollups and only
+aggregates the partial weeks at either edge from ``checkins``, so the cost no
+longer grows with the window length. Sums are integers, so the averages match
+a row scan exactly. ``/checkins/summary`` returns an item per day of its
+window, so it reads the check-in rows and does not use the rollups.
+"""
+
+from dataclasses import dataclass, fields
+from datetime import date, timedelta
+
+from sqlalchemy import and_, delete, func, insert, or_, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from .models import Checkin, CheckinRollup
+
+
+@dataclass
+class WindowTotals:
+    checkins: int = 0
+    sleep_count: int = 0
+    sleep_sum: int = 0
+    energy_count: int = 0
+    energy_sum: int = 0
+    mood_count: int = 0
+    mood_sum: int = 0
+
+    def __add__(self, other: "WindowTotals") -> "WindowTotals":
+        return WindowTotals(*(getattr(self, f.name) + getattr(other, f.name) for f in fields(self)))
+
+    def __sub__(self, other: "WindowTotals") -> "WindowTotals":
+        return WindowTotals(*(getattr(self, f.name) - getattr(other, f.name) for f in fields(self)))
+
+    @property
+    def avg_sleep(self) -> float:
+        return self.sleep_sum / self.sleep_count if self.sleep_count else 0.0
+
+    @property
+    def avg_energy(self) -> float:
+        return self.energy_sum / self.energy_count if self.energy_count else 0.0
+
+    @property
+    def avg_mood(self) -> float:
+        return self.mood_sum / self.mood_count if self.mood_count else 0.0
+
+
+def week_start(day: date) -> date:
+    return day - timedelta(days=day.weekday())
+
+
+def checkin_totals(checkin: Checkin | None) -> WindowTotals:
+    """The contribution of one check-in row (or of no row) to its week."""
+    if checkin is None:
+        return WindowTotals()
+    return WindowTotals(
+        checkins=1,
+        sleep_count=int(checkin.sleep_hours is not None),
+        sleep_sum=checkin.sleep_hours or 0,
+        energy_count=int(checkin.energy is not None),
+        energy_sum=checkin.energy or 0,
+        mood_count=int(checkin.mood is not None),
+        mood_sum=checkin.mood or 0,
+    )
+
+
+def apply_rollup_delta(db: Session, user_id: int, day: date, delta: WindowTotals) -> None:
+    """Add ``delta`` to the user's rollup for ``day``'s week in the current transaction."""
+    values = {f.name: getattr(delta, f.name) for f in fields(delta)}
+    if not any(values.values()):
+        return
+    stmt = sqlite_insert(CheckinRollup).values(user_id=user_id, week_start=week_start(day), **values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[CheckinRollup.user_id, CheckinRollup.week_start],
+        set_={name: getattr(CheckinRollup, name) + stmt.excluded[name] for name in values},
+    )
+    db.execute(stmt)
+
+
+def checkin_aggregates():
+    """Aggregate columns over ``checkins`` in ``WindowTotals`` field order."""
+    return (
+        func.count(Checkin.id),
+        func.count(Checkin.sleep_hours),
+        func.coalesce(func.sum(Checkin.sleep_hours), 0),
+        func.count(Checkin.energy),
+        func.coalesce(func.sum(Checkin.energy), 0),
+        func.count(Checkin.mood),
+        func.coalesce(func.sum(Checkin.mood), 0),
+    )
+
+
+def window_totals(db: Session, user_id: int, start: date, end: date) -> WindowTotals:
+    """Totals over ``start``..``end`` inclusive: whole weeks from rollups, edges from rows."""
+    first_full = start + timedelta(days=(7 - start.weekday()) % 7)
+    full_until = week_start(end + timedelta(days=1))
+    totals = WindowTotals()
+    if first_full < full_until:
+        row = db.execute(
+            select(
+                func.coalesce(func.sum(CheckinRollup.checkins), 0),
+                func.coalesce(func.sum(CheckinRollup.sleep_count), 0),
+                func.coalesce(func.sum(CheckinRollup.sleep_sum), 0),
+                func.coalesce(func.sum(CheckinRollup.energy_count), 0),
+                func.coalesce(func.sum(CheckinRollup.energy_sum), 0),
+                func.coalesce(func.sum(CheckinRollup.mood_count), 0),
+                func.coalesce(func.sum(CheckinRollup.mood_sum), 0),
+            ).where(
+                CheckinRollup.user_id == user_id,
+                CheckinRollup.week_start >= first_full,
+                CheckinRollup.week_start < full_until,
+            )
+        ).one()
+        totals = WindowTotals(*row)
+        edges = [
+            and_(Checkin.date >= start, Checkin.date < first_full),
+            and_(Checkin.date >= full_until, Checkin.date <= end),
+        ]
+    else:
+        edges = [and_(Checkin.date >= start, Checkin.date <= end)]
+    row = db.execute(select(*checkin_aggregates()).where(Checkin.user_id == user_id, or_(*edges))).one()
+    return totals + WindowTotals(*row)
+
+
+def rebuild_rollups(db: Session) -> int:
+    """Recompute every rollup from the check-in table; returns rows written."""
+    bucket = func.date(Checkin.date, "-6 days", "weekday 1")
+    db.execute(delete(CheckinRollup))
+    result = db.execute(
+        insert(CheckinRollup).from_select(
+            ["user_id", "week_start", *(f.name for f in fields(WindowTotals))],
+            select(Checkin.user_id, bucket, *checkin_aggregates()).group_by(Checkin.user_id, bucket),
+        )
+    )
+    db.commit()
+    return result.rowcount
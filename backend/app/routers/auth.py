@@ -1,13 +1,17 @@
 from datetime import datetime
-from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
-from fastapi import APIRouter, Depends, HTTPException, Request, status
-from sqlalchemy import desc, select
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response, status
+from sqlalchemy import select, update
 from sqlalchemy.orm import Session
 
+from ..alarms import reschedule_alarm
+from ..avatars import InvalidAvatar, stored_avatar_url
 from ..db import get_db
+from ..etags import not_modified, weak_etag
 from ..models import Contact, RefreshToken, User
+from ..refresh_tokens import active_devices, same_device_filter
 from ..schemas import (
+    ContactIn,
     ContactsOut,
     ContactsPayload,
     DeviceOut,
@@ -28,6 +32,8 @@ from ..security import (
     verify_password,
     get_current_user,
 )
+from ..timezones import is_valid_timezone
+from ..versions import bump_user_versions
 
 router = APIRouter(tags=["auth"])
 
@@ -35,13 +41,32 @@ MOCK_SMS_CODE = "123456"
 
 
 def validate_timezone(tz: str) -> str:
-    try:
-        ZoneInfo(tz)
-    except ZoneInfoNotFoundError as exc:
-        raise HTTPException(status_code=400, detail="Invalid timezone") from exc
+    if not is_valid_timezone(tz):
+        raise HTTPException(status_code=400, detail="Invalid timezone")
     return tz
 
 
+def avatar_or_400(avatar_url: str | None) -> str | None:
+    try:
+        return stored_avatar_url(avatar_url)
+    except InvalidAvatar as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+
+def contact_values(contact: ContactIn) -> dict:
+    return {**contact.model_dump(), "avatar_url": avatar_or_400(contact.avatar_url)}
+
+
+# Inline images are decoded and resized in these sync dependencies, which
+# FastAPI runs in the threadpool, so they stay off the event loop in async mode.
+def profile_avatar_url(payload: ProfileUpdate) -> str | None:
+    return avatar_or_400(payload.avatar_url)
+
+
+def contacts_values(payload: ContactsPayload) -> tuple[dict, list[dict]]:
+    return contact_values(payload.primary), [contact_values(backup) for backup in payload.backups]
+
+
 @router.post("/auth/register", response_model=UserOut)
 def register(payload: UserCreate, db: Session = Depends(get_db)):
     existing = db.scalar(select(User).where(User.phone == payload.phone))
@@ -162,21 +187,7 @@ def request_code(payload: SmsRequest):
 
 @router.get("/auth/devices", response_model=list[DeviceOut])
 def list_devices(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    stmt = (
-        select(RefreshToken)
-        .where(RefreshToken.user_id == current_user.id)
-        .order_by(desc(RefreshToken.created_at))
-    )
-    tokens = list(db.scalars(stmt).all())
-    deduped: list[RefreshToken] = []
-    seen: set[tuple[str | None, str | None, str | None]] = set()
-    for token in tokens:
-        key = (token.device_name, token.user_agent, token.ip_address)
-        if key in seen:
-            continue
-        seen.add(key)
-        deduped.append(token)
-    return deduped
+    return active_devices(db, current_user.id)
 
 
 @router.post("/auth/logout-device")
@@ -193,13 +204,25 @@ def logout_device(
         )
     )
     if token:
-        token.revoked_at = datetime.utcnow()
+        # The device list shows one row per device; sign out all of its tokens.
+        db.execute(
+            update(RefreshToken)
+            .where(*same_device_filter(token), RefreshToken.revoked_at.is_(None))
+            .values(revoked_at=datetime.utcnow())
+        )
         db.commit()
     return {"status": "ok"}
 
 
 @router.get("/me", response_model=UserOut)
-def me(current_user: User = Depends(get_current_user)):
+def me(
+    response: Response,
+    if_none_match: str | None = Header(default=None),
+    current_user: User = Depends(get_current_user),
+):
+    cached = not_modified(response, if_none_match, weak_etag("me", current_user.id, current_user.version))
+    if cached:
+        return cached
     return current_user
 
 
@@ -208,13 +231,17 @@ def update_profile(
     payload: ProfileUpdate,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
+    avatar_url: str | None = Depends(profile_avatar_url),
 ):
     current_user.nickname = payload.nickname
-    current_user.avatar_url = payload.avatar_url
+    current_user.avatar_url = avatar_url
     current_user.wechat = payload.wechat
     current_user.email = payload.email
+    if payload.alarm_hours != current_user.alarm_hours:
+        reschedule_alarm(current_user, payload.alarm_hours)
     current_user.alarm_hours = payload.alarm_hours
     current_user.estate_note = payload.estate_note
+    bump_user_versions(db, [current_user.id])
     db.commit()
     db.refresh(current_user)
     return current_user
@@ -234,13 +261,15 @@ def save_contacts(
     payload: ContactsPayload,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
+    values: tuple[dict, list[dict]] = Depends(contacts_values),
 ):
+    primary_values, backup_values = values
     # Replace contacts atomically: delete old, insert new
     db.query(Contact).where(Contact.user_id == current_user.id).delete()
-    primary = Contact(user_id=current_user.id, kind="primary", **payload.primary.model_dump())
+    primary = Contact(user_id=current_user.id, kind="primary", **primary_values)
     db.add(primary)
-    for backup in payload.backups:
-        db.add(Contact(user_id=current_user.id, kind="backup", **backup.model_dump()))
+    for values in backup_values:
+        db.add(Contact(user_id=current_user.id, kind="backup", **values))
     db.commit()
     db.refresh(primary)
     backups = list(db.scalars(select(Contact).where(Contact.user_id == current_user.id, Contact.kind == "backup")).all())
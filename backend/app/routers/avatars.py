@@ -0,0 +1,42 @@
+import asyncio
+
+from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
+from fastapi.responses import FileResponse
+
+from ..avatars import (
+    AVATAR_FILE_NAME,
+    AVATAR_MAX_BYTES,
+    CACHE_CONTROL,
+    InvalidAvatar,
+    avatar_file,
+    public_avatar_url,
+    store_avatar,
+)
+from ..models import User
+from ..schemas import AvatarOut
+from ..security import get_current_user
+
+router = APIRouter(prefix="/avatars", tags=["avatars"])
+
+
+@router.post("", response_model=AvatarOut)
+async def upload_avatar(
+    file: UploadFile = File(...),
+    current_user: User = Depends(get_current_user),
+):
+    """Store an image; put the returned ``url`` in a profile or contact ``avatar_url``."""
+    data = await file.read(AVATAR_MAX_BYTES + 1)
+    if len(data) > AVATAR_MAX_BYTES:
+        raise HTTPException(status_code=413, detail="Image too large")
+    try:
+        stored = await asyncio.to_thread(store_avatar, data)
+    except InvalidAvatar as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    return AvatarOut(url=public_avatar_url(stored), thumbnail_url=public_avatar_url(stored, thumbnail=True))
+
+
+@router.get("/{name}")
+def get_avatar(name: str):
+    if not AVATAR_FILE_NAME.match(name) or not avatar_file(name).is_file():
+        raise HTTPException(status_code=404, detail="Avatar not found")
+    return FileResponse(avatar_file(name), media_type="image/webp", headers={"Cache-Control": CACHE_CONTROL})
@@ -1,29 +1,28 @@
 from datetime import date, datetime, timedelta
 import os
 from typing import Optional
-from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
 from sqlalchemy import select
 from sqlalchemy.orm import Session
 
+from ..alarms import arm_alarm
 from ..db import get_db
+from ..etags import not_modified, weak_etag
+from ..leaderboards import record_leaderboard_checkin
 from ..models import Checkin, User
-from ..schemas import CheckinCreate, CheckinOut, StatsOut, SummaryOut, DailySummary
+from ..pagination import keyset_page
+from ..schemas import CheckinCreate, CheckinOut, StatsOut, SummaryOut
+from ..rollups import apply_rollup_delta, checkin_totals, window_totals
 from ..security import get_current_user
+from ..streaks import record_checkin_day, streak_on
+from ..timezones import get_user_local_date
+from ..versions import bump_member_group_versions, bump_user_versions, user_version
 
 router = APIRouter(prefix="/checkins", tags=["checkins"])
 EDIT_WINDOW_DAYS = int(os.getenv("CHECKIN_EDIT_WINDOW_DAYS", "7"))
 
 
-def get_user_local_date(user: User) -> date:
-    try:
-        tz = ZoneInfo(user.timezone)
-    except ZoneInfoNotFoundError:
-        tz = ZoneInfo("UTC")
-    return datetime.now(tz).date()
-
-
 @router.post("/today", response_model=CheckinOut)
 def upsert_today(
     payload: CheckinCreate,
@@ -38,16 +37,27 @@ def upsert_today(
         )
     )
     if existing:
+        before = checkin_totals(existing)
         for field, value in payload.model_dump().items():
             setattr(existing, field, value)
-        current_user.last_checkin_at = datetime.utcnow()
+        apply_rollup_delta(db, current_user.id, today, checkin_totals(existing) - before)
+        arm_alarm(current_user, datetime.utcnow())
+        bump_user_versions(db, [current_user.id])
         db.commit()
         db.refresh(existing)
         return existing
 
+    # current_user may come from the user cache; streak counters must be read
+    # from the row before they are advanced.
+    db.refresh(current_user)
     checkin = Checkin(user_id=current_user.id, date=today, **payload.model_dump())
     db.add(checkin)
-    current_user.last_checkin_at = datetime.utcnow()
+    arm_alarm(current_user, datetime.utcnow())
+    record_checkin_day(db, current_user, today)
+    apply_rollup_delta(db, current_user.id, today, checkin_totals(checkin))
+    record_leaderboard_checkin(db, current_user.id)
+    bump_user_versions(db, [current_user.id])
+    bump_member_group_versions(db, current_user.id)
     db.commit()
     db.refresh(checkin)
     return checkin
@@ -76,8 +86,11 @@ def update_checkin(
     )
     if not existing:
         raise HTTPException(status_code=404, detail="Check-in not found")
+    before = checkin_totals(existing)
     for field, value in payload.model_dump().items():
         setattr(existing, field, value)
+    apply_rollup_delta(db, current_user.id, checkin_date, checkin_totals(existing) - before)
+    bump_user_versions(db, [current_user.id])
     db.commit()
     db.refresh(existing)
     return existing
@@ -102,85 +115,89 @@ def get_today(
 
 @router.get("", response_model=list[CheckinOut])
 def list_checkins(
+    response: Response,
     from_date: Optional[date] = Query(default=None, alias="from"),
     to_date: Optional[date] = Query(default=None, alias="to"),
     limit: int = Query(default=30, ge=1, le=200),
-    offset: int = Query(default=0, ge=0),
+    cursor: Optional[str] = Query(default=None),
+    offset: int = Query(default=0, ge=0, deprecated=True),
     order: str = Query(default="desc", pattern="^(asc|desc)$"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
+    if cursor and offset:
+        raise HTTPException(status_code=400, detail="Use either cursor or offset")
     stmt = select(Checkin).where(Checkin.user_id == current_user.id)
     if from_date:
         stmt = stmt.where(Checkin.date >= from_date)
     if to_date:
         stmt = stmt.where(Checkin.date <= to_date)
-    if order == "asc":
-        stmt = stmt.order_by(Checkin.date.asc())
-    else:
-        stmt = stmt.order_by(Checkin.date.desc())
-    stmt = stmt.limit(limit).offset(offset)
-    return list(db.scalars(stmt).all())
+    if offset:
+        stmt = stmt.offset(offset)
+    return keyset_page(
+        db,
+        stmt,
+        Checkin.date,
+        Checkin.id,
+        limit=limit,
+        cursor=cursor,
+        response=response,
+        descending=order == "desc",
+    )
 
 
 @router.get("/stats", response_model=StatsOut)
 def get_stats(
+    response: Response,
+    if_none_match: Optional[str] = Header(default=None),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
     today = get_user_local_date(current_user)
+    # The streak comes from the row too: the cached user may be a TTL behind it.
+    db.refresh(current_user, ["version", "current_streak", "last_checkin_date"])
+    etag = weak_etag("stats", current_user.id, current_user.version, today)
+    cached = not_modified(response, if_none_match, etag)
+    if cached:
+        return cached
     window_days = 30
     start_date = today - timedelta(days=window_days - 1)
 
-    stmt = select(Checkin).where(
-        Checkin.date >= start_date,
-        Checkin.date <= today,
-        Checkin.user_id == current_user.id,
-    )
-    checkins = list(db.scalars(stmt).all())
-    dates = {c.date for c in checkins}
-
-    streak = 0
-    cursor = today
-    for _ in range(window_days):
-        if cursor in dates:
-            streak += 1
-            cursor -= timedelta(days=1)
-        else:
-            break
-
-    checkin_rate = len(checkins) / window_days
-
-    sleep_values = [c.sleep_hours for c in checkins if c.sleep_hours is not None]
-    avg_sleep = sum(sleep_values) / len(sleep_values) if sleep_values else 0.0
+    totals = window_totals(db, current_user.id, start_date, today)
+    checkin_rate = totals.checkins / window_days
 
     return StatsOut(
-        streak_days=streak,
+        streak_days=streak_on(current_user, today),
         checkin_rate=round(checkin_rate, 3),
-        avg_sleep_hours=round(avg_sleep, 2),
+        avg_sleep_hours=round(totals.avg_sleep, 2),
         total_days=window_days,
-        checkins=len(checkins),
+        checkins=totals.checkins,
         window_days=window_days,
     )
 
 
 @router.get("/summary", response_model=SummaryOut)
 def get_summary(
+    response: Response,
     days: int = Query(default=14, ge=1, le=180),
+    if_none_match: Optional[str] = Header(default=None),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
     today = get_user_local_date(current_user)
+    etag = weak_etag("summary", current_user.id, user_version(db, current_user.id), today, days)
+    cached = not_modified(response, if_none_match, etag)
+    if cached:
+        return cached
     start_date = today - timedelta(days=days - 1)
-    stmt = select(Checkin).where(
+    stmt = select(Checkin.date, Checkin.sleep_hours, Checkin.energy, Checkin.mood).where(
         Checkin.date >= start_date,
         Checkin.date <= today,
         Checkin.user_id == current_user.id,
     )
-    checkins = list(db.scalars(stmt).all())
-    by_date = {c.date: c for c in checkins}
+    by_date = {row.date: row for row in db.execute(stmt)}
 
-    items: list[DailySummary] = []
+    items: list[dict] = []
     sleep_values: list[int] = []
     mood_values: list[int] = []
     energy_values: list[int] = []
@@ -196,33 +213,19 @@ def get_summary(
             if c.energy is not None:
                 energy_values.append(c.energy)
             items.append(
-                DailySummary(
-                    date=d,
-                    checked_in=True,
-                    sleep_hours=c.sleep_hours,
-                    energy=c.energy,
-                    mood=c.mood,
-                )
+                {"date": d, "checked_in": True, "sleep_hours": c.sleep_hours, "energy": c.energy, "mood": c.mood}
             )
         else:
-            items.append(
-                DailySummary(
-                    date=d,
-                    checked_in=False,
-                    sleep_hours=None,
-                    energy=None,
-                    mood=None,
-                )
-            )
+            items.append({"date": d, "checked_in": False, "sleep_hours": None, "energy": None, "mood": None})
 
-    checkin_rate = len(checkins) / days
+    checkin_rate = len(by_date) / days
     avg_sleep = sum(sleep_values) / len(sleep_values) if sleep_values else 0.0
     avg_mood = sum(mood_values) / len(mood_values) if mood_values else 0.0
     avg_energy = sum(energy_values) / len(energy_values) if energy_values else 0.0
 
     return SummaryOut(
         days=days,
-        checkins=len(checkins),
+        checkins=len(by_date),
         checkin_rate=round(checkin_rate, 3),
         avg_sleep_hours=round(avg_sleep, 2),
         avg_energy=round(avg_energy, 2),
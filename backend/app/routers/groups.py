@@ -1,12 +1,20 @@
 from datetime import datetime, timedelta
-import random
-import string
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import and_, desc, func, select
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from sqlalchemy import and_, desc, func, literal_column, or_, select, table
+from sqlalchemy.orm import Session, aliased
 
 from ..db import get_db
+from ..etags import not_modified, weak_etag
+from ..join_codes import allocate_join_code, normalize_join_code, release_join_code
+from ..leaderboards import (
+    count_group_encouragement,
+    leaderboard_periods,
+    leaderboard_rank,
+    leaderboard_top,
+    seed_member,
+    week_rate,
+)
 from ..models import (
     Checkin,
     Group,
@@ -16,6 +24,8 @@ from ..models import (
     Notification,
     User,
 )
+from ..outbox import notify_group_admins, notify_user
+from ..pagination import NEXT_CURSOR_HEADER, decode_cursor, encode_cursor, keyset_page
 from ..schemas import (
     GroupAnnouncementUpdate,
     GroupCreate,
@@ -23,24 +33,22 @@ from ..schemas import (
     GroupEncourageOut,
     GroupEncourageRequest,
     GroupJoinRequest,
+    GroupLeaderboardEntryOut,
+    GroupLeaderboardOut,
     GroupMemberOut,
     GroupNameUpdate,
     GroupOut,
 )
 from ..security import get_current_user
-from .social import get_user_local_date
+from ..timezones import LocalDates, get_checked_in_today, get_local_dates, get_user_local_date
+from ..unread_counts import count_read_notifications, group_unread_counts
+from ..versions import bump_group_versions, my_groups_stamp, unread_groups_stamp
 
 router = APIRouter(prefix="/groups", tags=["groups"])
 
 APPLY_COOLDOWN = timedelta(hours=24)
-
-
-def generate_join_code(db: Session) -> str:
-    while True:
-        code = "".join(random.choices(string.digits, k=4))
-        exists = db.scalar(select(Group.id).where(Group.join_code == code))
-        if not exists:
-            return code
+# groups_fts uses the trigram tokenizer, which cannot match shorter queries.
+GROUP_SEARCH_MIN_CHARS = 3
 
 
 def member_status(group: Group, member: GroupMember | None) -> str:
@@ -49,53 +57,177 @@ def member_status(group: Group, member: GroupMember | None) -> str:
     return "pending" if member.status == "pending" else "member"
 
 
-@router.get("", response_model=list[GroupOut])
-def list_groups(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-):
-    groups = list(db.scalars(select(Group).order_by(desc(Group.created_at))).all())
-    results: list[GroupOut] = []
-    today = get_user_local_date(current_user)
-    for group in groups:
-        member = db.scalar(
-            select(GroupMember).where(
-                GroupMember.group_id == group.id,
-                GroupMember.user_id == current_user.id,
-            )
+def like_pattern(q: str) -> str:
+    return "%" + q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+def announcement_visible(user_id: int):
+    """Whether the caller may read a group's announcement: public groups and their own."""
+    return or_(
+        Group.privacy != "private",
+        Group.id.in_(
+            select(GroupMember.group_id).where(GroupMember.user_id == user_id, GroupMember.status == "accepted")
+        ),
+    )
+
+
+def search_groups(
+    db: Session, q: str, *, user_id: int, limit: int, cursor: str | None, response: Response
+) -> list[Group]:
+    """One page of groups whose name or announcement contains ``q``, newest first.
+
+    Announcements of private groups are hidden from non-members, so they only
+    match for members; names match for everyone. Queries of three or more
+    characters walk ``groups_fts`` backwards by rowid (the group id, so
+    creation order) and stop after one page, however many groups match.
+    Shorter ones are below the trigram size and fall back to a ``LIKE`` scan
+    of the directory order. Both hand out the usual ``(created_at, id)``
+    cursors.
+    """
+    pattern = like_pattern(q)
+    name_matches = Group.name.like(pattern, escape="\\")
+    if len(q) < GROUP_SEARCH_MIN_CHARS:
+        stmt = select(Group).where(
+            or_(name_matches, and_(Group.announcement.like(pattern, escape="\\"), announcement_visible(user_id)))
         )
-        members = list(
-            db.scalars(
-                select(GroupMember.user_id).where(
-                    GroupMember.group_id == group.id,
-                    GroupMember.status == "accepted",
-                )
-            ).all()
+        return keyset_page(db, stmt, Group.created_at, Group.id, limit=limit, cursor=cursor, response=response)
+    rowid = literal_column("groups_fts.rowid")
+    matches = (
+        select(rowid)
+        .select_from(table("groups_fts"))
+        .join(Group, Group.id == rowid)
+        .where(
+            literal_column("groups_fts").op("MATCH")('"' + q.replace('"', '""') + '"'),
+            or_(name_matches, announcement_visible(user_id)),
         )
-        members_count = len(members)
-        active_today = 0
-        if members:
-            active_today = db.scalar(
-                select(func.count(Checkin.id)).where(
-                    Checkin.user_id.in_(members),
-                    Checkin.date == today,
-                )
-            )
+        .order_by(rowid.desc())
+        .limit(limit + 1)
+    )
+    if cursor:
+        _, last_id = decode_cursor(cursor, datetime.fromisoformat)
+        matches = matches.where(rowid < last_id)
+    ids = db.scalars(matches).all()
+    groups = sorted(db.scalars(select(Group).where(Group.id.in_(ids[:limit]))), key=lambda g: g.id, reverse=True)
+    if len(ids) > limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(groups[-1].created_at, groups[-1].id)
+    return groups
+
+
+def build_group_outs(db: Session, groups: list[Group], user_id: int, today) -> list[GroupOut]:
+    """Counts and the caller's membership for one page of groups, in one query."""
+    ids = [group.id for group in groups]
+    if not ids:
+        return []
+    members_count = (
+        select(GroupMember.group_id, func.count().label("members_count"))
+        .where(GroupMember.group_id.in_(ids), GroupMember.status == "accepted")
+        .group_by(GroupMember.group_id)
+        .subquery()
+    )
+    active_today = (
+        select(GroupMember.group_id, func.count().label("active_today"))
+        .join(Checkin, Checkin.user_id == GroupMember.user_id)
+        .where(GroupMember.group_id.in_(ids), Checkin.date == today, GroupMember.status == "accepted")
+        .group_by(GroupMember.group_id)
+        .subquery()
+    )
+    unread = group_unread_counts(user_id)
+    membership = aliased(GroupMember)
+    rows = db.execute(
+        select(
+            Group.id,
+            membership,
+            func.coalesce(members_count.c.members_count, 0),
+            func.coalesce(active_today.c.active_today, 0),
+            func.coalesce(unread.c.unread_count, 0),
+        )
+        .outerjoin(members_count, members_count.c.group_id == Group.id)
+        .outerjoin(active_today, active_today.c.group_id == Group.id)
+        .outerjoin(unread, unread.c.group_id == Group.id)
+        .outerjoin(
+            membership,
+            and_(membership.group_id == Group.id, membership.user_id == user_id),
+        )
+        .where(Group.id.in_(ids))
+    ).all()
+    extra = {row[0]: row[1:] for row in rows}
+    results = []
+    for group in groups:
+        member, count, active, unread_count = extra[group.id]
         results.append(
             GroupOut(
                 id=group.id,
                 name=group.name,
                 privacy=group.privacy,
                 requires_approval=group.requires_approval,
-                members_count=members_count,
-                active_today=active_today or 0,
-                unread_count=0,
+                members_count=count,
+                active_today=active,
+                unread_count=unread_count,
                 status=member_status(group, member),
             )
         )
     return results
 
 
+@router.get("", response_model=list[GroupOut])
+def list_groups(
+    response: Response,
+    q: str | None = Query(default=None, max_length=64),
+    limit: int = Query(default=50, ge=1, le=100),
+    cursor: str | None = Query(default=None),
+    if_none_match: str | None = Header(default=None),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Group directory, newest first; ``q`` searches names and visible announcements."""
+    q = (q or "").strip()
+    if q:
+        groups = search_groups(db, q, user_id=current_user.id, limit=limit, cursor=cursor, response=response)
+    else:
+        groups = keyset_page(
+            db, select(Group), Group.created_at, Group.id, limit=limit, cursor=cursor, response=response
+        )
+    today = get_user_local_date(current_user)
+    etag = weak_etag(
+        "groups",
+        current_user.id,
+        today,
+        q,
+        cursor,
+        [(group.id, group.version) for group in groups],
+        response.headers.get(NEXT_CURSOR_HEADER),
+        unread_groups_stamp(db, current_user.id),
+    )
+    cached = not_modified(response, if_none_match, etag)
+    if cached:
+        return cached
+    return build_group_outs(db, groups, current_user.id, today)
+
+
+@router.get("/mine", response_model=list[GroupOut])
+def list_my_groups(
+    response: Response,
+    if_none_match: str | None = Header(default=None),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Groups the caller has joined or applied to, newest first."""
+    today = get_user_local_date(current_user)
+    etag = weak_etag("groups/mine", current_user.id, today, my_groups_stamp(db, current_user.id))
+    cached = not_modified(response, if_none_match, etag)
+    if cached:
+        return cached
+    groups = list(
+        db.scalars(
+            select(Group)
+            .join(GroupMember, GroupMember.group_id == Group.id)
+            .where(GroupMember.user_id == current_user.id)
+            .order_by(desc(Group.created_at), desc(Group.id))
+        )
+    )
+    return build_group_outs(db, groups, current_user.id, today)
+
+
 @router.get("/{group_id}", response_model=GroupDetailOut)
 def get_group_detail(
     group_id: int,
@@ -116,33 +248,25 @@ def get_group_detail(
     members_out: list[GroupMemberOut] = []
     announcement = group.announcement
     if status == "member":
-        members = list(
-            db.scalars(
-                select(GroupMember).where(
-                    GroupMember.group_id == group.id,
-                    GroupMember.status == "accepted",
-                )
-            ).all()
-        )
-        for gm in members:
-            user = db.scalar(select(User).where(User.id == gm.user_id))
-            if not user:
-                continue
-            checked_in = bool(
-                db.scalar(
-                    select(Checkin.id).where(
-                        Checkin.user_id == user.id, Checkin.date == get_user_local_date(user)
-                    )
-                )
+        rows = db.execute(
+            select(GroupMember.role, User.id, User.nickname, User.phone, User.timezone)
+            .join(User, User.id == GroupMember.user_id)
+            .where(
+                GroupMember.group_id == group.id,
+                GroupMember.status == "accepted",
             )
-            members_out.append(
-                GroupMemberOut(
-                    id=user.id,
-                    name=user.nickname or user.phone,
-                    role=gm.role,
-                    checked_in=checked_in,
-                )
+            .order_by(GroupMember.id)
+        ).all()
+        checked_in = get_checked_in_today(db, {row.id: row.timezone for row in rows})
+        members_out = [
+            GroupMemberOut(
+                id=row.id,
+                name=row.nickname or row.phone,
+                role=row.role,
+                checked_in=row.id in checked_in,
             )
+            for row in rows
+        ]
     if group.privacy == "private" and status != "member":
         announcement = None
         members_out = []
@@ -165,7 +289,7 @@ def create_group(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    join_code = generate_join_code(db)
+    join_code = allocate_join_code(db)
     group = Group(
         name=payload.name,
         privacy=payload.privacy,
@@ -186,6 +310,7 @@ def create_group(
         approved_at=datetime.utcnow(),
     )
     db.add(member)
+    seed_member(db, group.id, current_user.id)
     db.commit()
     return GroupDetailOut(
         id=group.id,
@@ -212,7 +337,7 @@ def join_group(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    code_or_id = payload.code_or_id.strip()
+    code_or_id = normalize_join_code(payload.code_or_id)
     group = None
     if code_or_id.isdigit():
         group = db.scalar(select(Group).where(Group.id == int(code_or_id)))
@@ -255,27 +380,15 @@ def join_group(
                 requested_at=now,
             )
             db.add(member)
-        db.commit()
-        admins = list(
-            db.scalars(
-                select(GroupMember.user_id).where(
-                    GroupMember.group_id == group.id,
-                    GroupMember.status == "accepted",
-                    GroupMember.role.in_(("owner", "admin")),
-                )
-            ).all()
+        notify_group_admins(
+            db,
+            group.id,
+            from_user_id=current_user.id,
+            related_user_id=current_user.id,
+            kind="group_join_request",
+            message=f"{current_user.nickname or current_user.phone} 申请加入 {group.name}",
         )
-        for admin_id in admins:
-            db.add(
-                Notification(
-                    user_id=admin_id,
-                    from_user_id=current_user.id,
-                    related_group_id=group.id,
-                    related_user_id=current_user.id,
-                    kind="group_join_request",
-                    message=f"{current_user.nickname or current_user.phone} 申请加入 {group.name}",
-                )
-            )
+        bump_group_versions(db, [group.id])
         db.commit()
         return GroupDetailOut(
             id=group.id,
@@ -301,29 +414,17 @@ def join_group(
             approved_at=now,
         )
         db.add(member)
-    db.commit()
-    admins = list(
-        db.scalars(
-            select(GroupMember.user_id).where(
-                GroupMember.group_id == group.id,
-                GroupMember.status == "accepted",
-                GroupMember.role.in_(("owner", "admin")),
-            )
-        ).all()
+    seed_member(db, group.id, current_user.id)
+    notify_group_admins(
+        db,
+        group.id,
+        exclude_user_id=current_user.id,
+        from_user_id=current_user.id,
+        related_user_id=current_user.id,
+        kind="group_joined",
+        message=f"{current_user.nickname or current_user.phone} 已加入 {group.name}",
     )
-    for admin_id in admins:
-        if admin_id == current_user.id:
-            continue
-        db.add(
-            Notification(
-                user_id=admin_id,
-                from_user_id=current_user.id,
-                related_group_id=group.id,
-                related_user_id=current_user.id,
-                kind="group_joined",
-                message=f"{current_user.nickname or current_user.phone} 已加入 {group.name}",
-            )
-        )
+    bump_group_versions(db, [group.id])
     db.commit()
     return get_group_detail(group.id, db, current_user)
 
@@ -348,6 +449,7 @@ def update_group_name(
     if not member or member.role not in ("owner", "admin"):
         raise HTTPException(status_code=403, detail="Not allowed")
     group.name = payload.name
+    bump_group_versions(db, [group.id])
     db.commit()
     return get_group_detail(group.id, db, current_user)
 
@@ -372,7 +474,8 @@ def rotate_invite_code(
     )
     if not member or member.role not in ("owner", "admin"):
         raise HTTPException(status_code=403, detail="Not allowed")
-    group.join_code = generate_join_code(db)
+    release_join_code(db, group.join_code)
+    group.join_code = allocate_join_code(db)
     db.commit()
     return get_group_detail(group.id, db, current_user)
 
@@ -407,6 +510,7 @@ def approve_member(
         raise HTTPException(status_code=404, detail="Request not found")
     member.status = "accepted"
     member.approved_at = datetime.utcnow()
+    seed_member(db, group.id, user_id)
     admin_notice = db.scalar(
         select(Notification).where(
             Notification.user_id == current_user.id,
@@ -416,19 +520,21 @@ def approve_member(
         )
     )
     if admin_notice:
+        if admin_notice.read_at is None:
+            count_read_notifications(db, [(current_user.id, admin_notice.kind, group.id)])
         admin_notice.kind = "group_join_approved"
         admin_notice.message = "已通过该入群申请"
         admin_notice.read_at = datetime.utcnow()
-    db.add(
-        Notification(
-            user_id=user_id,
-            from_user_id=current_user.id,
-            related_group_id=group.id,
-            related_user_id=current_user.id,
-            kind="group_join_approved",
-            message=f"你已加入群组 {group.name}",
-        )
+    notify_user(
+        db,
+        user_id,
+        from_user_id=current_user.id,
+        related_group_id=group.id,
+        related_user_id=current_user.id,
+        kind="group_join_approved",
+        message=f"你已加入群组 {group.name}",
     )
+    bump_group_versions(db, [group.id])
     db.commit()
     return get_group_detail(group.id, db, current_user)
 
@@ -471,19 +577,21 @@ def reject_member(
         )
     )
     if admin_notice:
+        if admin_notice.read_at is None:
+            count_read_notifications(db, [(current_user.id, admin_notice.kind, group.id)])
         admin_notice.kind = "group_join_rejected"
         admin_notice.message = "已拒绝该入群申请"
         admin_notice.read_at = datetime.utcnow()
-    db.add(
-        Notification(
-            user_id=user_id,
-            from_user_id=current_user.id,
-            related_group_id=group.id,
-            related_user_id=current_user.id,
-            kind="group_join_rejected",
-            message=f"入群申请已被拒绝（{group.name}）",
-        )
+    notify_user(
+        db,
+        user_id,
+        from_user_id=current_user.id,
+        related_group_id=group.id,
+        related_user_id=current_user.id,
+        kind="group_join_rejected",
+        message=f"入群申请已被拒绝（{group.name}）",
     )
+    bump_group_versions(db, [group.id])
     db.commit()
     return get_group_detail(group.id, db, current_user)
 
@@ -515,7 +623,9 @@ def update_announcement(
 @router.get("/{group_id}/encouragements", response_model=list[GroupEncourageOut])
 def list_group_encouragements(
     group_id: int,
+    response: Response,
     limit: int = Query(default=20, ge=1, le=100),
+    cursor: str | None = Query(default=None),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
@@ -528,26 +638,82 @@ def list_group_encouragements(
     )
     if not member:
         raise HTTPException(status_code=403, detail="Not allowed")
-    items = list(
-        db.scalars(
-            select(GroupEncouragement)
-            .where(GroupEncouragement.group_id == group_id)
-            .order_by(desc(GroupEncouragement.created_at))
-            .limit(limit)
-        ).all()
+    items = keyset_page(
+        db,
+        select(GroupEncouragement).where(GroupEncouragement.group_id == group_id),
+        GroupEncouragement.created_at,
+        GroupEncouragement.id,
+        limit=limit,
+        cursor=cursor,
+        response=response,
     )
-    results: list[GroupEncourageOut] = []
-    for item in items:
-        author = db.scalar(select(User).where(User.id == item.user_id))
-        results.append(
-            GroupEncourageOut(
-                id=item.id,
-                author=author.nickname or author.phone if author else "成员",
-                message=f"{item.emoji} {item.message or ''}".strip(),
-                created_at=item.created_at,
+    authors = {}
+    if items:
+        authors = {
+            row.id: row.nickname or row.phone
+            for row in db.execute(
+                select(User.id, User.nickname, User.phone).where(User.id.in_({item.user_id for item in items}))
             )
+        }
+    return [
+        GroupEncourageOut(
+            id=item.id,
+            author=authors.get(item.user_id, "成员"),
+            message=f"{item.emoji} {item.message or ''}".strip(),
+            created_at=item.created_at,
         )
-    return results
+        for item in items
+    ]
+
+
+@router.get("/{group_id}/leaderboard", response_model=GroupLeaderboardOut)
+def get_group_leaderboard(
+    group_id: int,
+    metric: str = Query(default="encouragements", pattern="^(encouragements|streak|week)$"),
+    limit: int = Query(default=10, ge=1, le=100),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    dates: LocalDates = Depends(get_local_dates),
+):
+    """Top ``limit`` members by ``metric`` plus the caller's own score and rank.
+
+    ``streak`` and ``week`` are read against the group-wide reference date, so
+    every member sees the same board. A week entry's ``rate`` divides by the
+    days of the week that member has had so far in their own timezone.
+    """
+    member = db.scalar(
+        select(GroupMember).where(
+            GroupMember.group_id == group_id,
+            GroupMember.user_id == current_user.id,
+            GroupMember.status == "accepted",
+        )
+    )
+    if not member:
+        raise HTTPException(status_code=403, detail="Not allowed")
+    periods = leaderboard_periods(metric, dates)
+    top = leaderboard_top(db, group_id, metric, periods, limit)
+    users = {
+        user.id: user for user in db.scalars(select(User).where(User.id.in_([user_id for user_id, *_ in top])))
+    }
+    entries = []
+    for user_id, score, period, rank in top:
+        user = users.get(user_id)
+        entries.append(
+            GroupLeaderboardEntryOut(
+                user_id=user_id,
+                name=(user.nickname or user.phone) if user else "成员",
+                score=score,
+                rank=rank,
+                rate=week_rate(score, period, dates.for_user(user)) if metric == "week" and user else None,
+            )
+        )
+    my_score, my_rank = leaderboard_rank(db, group_id, metric, periods, current_user.id)
+    return GroupLeaderboardOut(
+        metric=metric,
+        entries=entries,
+        my_score=my_score,
+        my_rank=my_rank,
+    )
 
 
 @router.post("/{group_id}/encourage")
@@ -573,6 +739,7 @@ def group_encourage(
         message=payload.message,
     )
     db.add(record)
+    count_group_encouragement(db, group_id, current_user.id)
     db.commit()
     return {"sent": True}
 
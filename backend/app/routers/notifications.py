@@ -1,61 +1,67 @@
+import asyncio
+import json
 from datetime import datetime
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import desc, select
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, select, update
 from sqlalchemy.orm import Session
 
-from ..db import get_db
-from ..models import Group, Notification, User
-from ..schemas import NotificationOut, NotificationReadOut
+from ..db import SessionLocal, get_db
+from ..models import Group, Notification, NotificationArchive, User
+from ..notification_stream import NOTIFICATION_STREAM_HEARTBEAT_SECONDS, ServerEvent, broker
+from ..pagination import keyset_page
+from ..schemas import (
+    NotificationOut,
+    NotificationReadBatch,
+    NotificationReadBatchOut,
+    NotificationReadOut,
+    UnreadCountsOut,
+)
 from ..security import get_current_user
+from ..unread_counts import clear_unread_counts, count_read_notifications, unread_summary
 
 router = APIRouter(prefix="/notifications", tags=["notifications"])
 
 
-@router.get("", response_model=list[NotificationOut])
-def list_notifications(
-    limit: int = Query(default=30, ge=1, le=100),
-    unread_only: bool = Query(default=False),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-):
-    stmt = select(Notification).where(Notification.user_id == current_user.id)
-    if unread_only:
-        stmt = stmt.where(Notification.read_at.is_(None))
-    stmt = stmt.order_by(desc(Notification.created_at)).limit(limit)
-    notifications = list(db.scalars(stmt).all())
+def build_notification_outs(db: Session, notifications: list[Notification] | list[NotificationArchive]) -> list[NotificationOut]:
+    """Attach sender, group and user names with one IN-lookup per table."""
+    user_ids = {
+        user_id
+        for item in notifications
+        for user_id in (item.from_user_id, item.related_user_id)
+        if user_id
+    }
+    group_ids = {item.related_group_id for item in notifications if item.related_group_id}
+    users = {}
+    if user_ids:
+        users = {
+            row.id: row
+            for row in db.execute(
+                select(User.id, User.nickname, User.phone, User.avatar_url).where(User.id.in_(user_ids))
+            )
+        }
+    group_names = {}
+    if group_ids:
+        group_names = dict(db.execute(select(Group.id, Group.name).where(Group.id.in_(group_ids))).all())
 
     results: list[NotificationOut] = []
     for item in notifications:
-        from_user_name = None
-        from_user_avatar = None
-        related_group_name = None
-        related_user_name = None
-        if item.from_user_id:
-            from_user = db.scalar(select(User).where(User.id == item.from_user_id))
-            if from_user:
-                from_user_name = from_user.nickname or from_user.phone
-                from_user_avatar = from_user.avatar_url
-        if item.related_group_id:
-            group = db.scalar(select(Group).where(Group.id == item.related_group_id))
-            if group:
-                related_group_name = group.name
-        if item.related_user_id:
-            related_user = db.scalar(select(User).where(User.id == item.related_user_id))
-            if related_user:
-                related_user_name = related_user.nickname or related_user.phone
+        from_user = users.get(item.from_user_id)
+        related_user = users.get(item.related_user_id)
         results.append(
             NotificationOut(
                 id=item.id,
                 kind=item.kind,
                 message=item.message,
                 from_user_id=item.from_user_id,
-                from_user_name=from_user_name,
-                from_user_avatar=from_user_avatar,
+                from_user_name=(from_user.nickname or from_user.phone) if from_user else None,
+                from_user_avatar=from_user.avatar_url if from_user else None,
                 related_group_id=item.related_group_id,
-                related_group_name=related_group_name,
+                related_group_name=group_names.get(item.related_group_id),
                 related_user_id=item.related_user_id,
-                related_user_name=related_user_name,
+                related_user_name=(related_user.nickname or related_user.phone) if related_user else None,
                 created_at=item.created_at,
                 read_at=item.read_at,
             )
@@ -63,42 +69,246 @@ def list_notifications(
     return results
 
 
+STREAM_REPLAY_LIMIT = 100
+STREAM_POLL_BATCH_SIZE = 5000
+
+
+def notification_event(item: NotificationOut) -> ServerEvent:
+    return ServerEvent("notification", item.model_dump_json(), id=item.id)
+
+
+def read_event(payload: dict) -> ServerEvent:
+    return ServerEvent("read", json.dumps(jsonable_encoder(payload)))
+
+
+def fetch_new_notifications(
+    after_id: int | None, user_ids: set[int]
+) -> tuple[int, list[tuple[int, ServerEvent]]]:
+    """Broker poll: notifications after ``after_id`` for users streaming in this process."""
+    with SessionLocal() as db:
+        if after_id is None:
+            return db.scalar(select(func.coalesce(func.max(Notification.id), 0))), []
+        rows = db.execute(
+            select(Notification.id, Notification.user_id)
+            .where(Notification.id > after_id)
+            .order_by(Notification.id)
+            .limit(STREAM_POLL_BATCH_SIZE)
+        ).all()
+        if not rows:
+            return after_id, []
+        wanted = [row.id for row in rows if row.user_id in user_ids]
+        items = []
+        if wanted:
+            items = list(
+                db.scalars(select(Notification).where(Notification.id.in_(wanted)).order_by(Notification.id))
+            )
+        outs = build_notification_outs(db, items)
+        return rows[-1].id, [(item.user_id, notification_event(out)) for item, out in zip(items, outs)]
+
+
+def replay_notifications(user_id: int, after_id: int) -> tuple[list[ServerEvent], bool]:
+    """Notifications a reconnecting stream missed, or ``([], True)`` past the replay limit."""
+    with SessionLocal() as db:
+        items = list(
+            db.scalars(
+                select(Notification)
+                .where(Notification.user_id == user_id, Notification.id > after_id)
+                .order_by(Notification.id)
+                .limit(STREAM_REPLAY_LIMIT + 1)
+            )
+        )
+        if len(items) > STREAM_REPLAY_LIMIT:
+            return [], True
+        return [notification_event(out) for out in build_notification_outs(db, items)], False
+
+
+@router.get("/stream")
+async def stream_notifications(
+    last_event_id: int | None = Header(default=None, alias="Last-Event-ID"),
+    current_user: User = Depends(get_current_user),
+):
+    """Server-sent events: ``notification`` (id = notification id) and ``read``.
+
+    Reconnect with ``Last-Event-ID`` to replay what was missed. A ``reset``
+    event means too much was missed and the client should reload the list.
+    Idle streams get a comment line every heartbeat interval.
+    """
+    user_id = current_user.id
+
+    async def events():
+        subscription = broker.subscribe(user_id)
+        try:
+            yield "retry: 3000\n\n"
+            last_sent = last_event_id or 0
+            if last_event_id is not None:
+                replayed, truncated = await asyncio.to_thread(replay_notifications, user_id, last_event_id)
+                if truncated:
+                    yield ServerEvent("reset", "{}").encode()
+                for event in replayed:
+                    yield event.encode()
+                    last_sent = event.id
+            while True:
+                try:
+                    event = await asyncio.wait_for(
+                        subscription.queue.get(), timeout=NOTIFICATION_STREAM_HEARTBEAT_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                if event is None:
+                    return
+                if event.id is not None and event.id <= last_sent:
+                    continue
+                yield event.encode()
+                if event.id is not None:
+                    last_sent = event.id
+        finally:
+            broker.unsubscribe(subscription)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("", response_model=list[NotificationOut])
+def list_notifications(
+    response: Response,
+    limit: int = Query(default=30, ge=1, le=100),
+    cursor: str | None = Query(default=None),
+    unread_only: bool = Query(default=False),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    stmt = select(Notification).where(Notification.user_id == current_user.id)
+    if unread_only:
+        stmt = stmt.where(Notification.read_at.is_(None))
+    notifications = keyset_page(
+        db, stmt, Notification.created_at, Notification.id, limit=limit, cursor=cursor, response=response
+    )
+    return build_notification_outs(db, notifications)
+
+
+@router.get("/archive", response_model=list[NotificationOut])
+def list_archived_notifications(
+    response: Response,
+    limit: int = Query(default=30, ge=1, le=100),
+    cursor: str | None = Query(default=None),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Notifications moved out by the retention job, newest first."""
+    stmt = select(NotificationArchive).where(NotificationArchive.user_id == current_user.id)
+    notifications = keyset_page(
+        db,
+        stmt,
+        NotificationArchive.created_at,
+        NotificationArchive.id,
+        limit=limit,
+        cursor=cursor,
+        response=response,
+    )
+    return build_notification_outs(db, notifications)
+
+
+@router.get("/unread-count", response_model=UnreadCountsOut)
+def get_unread_counts(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    summary = unread_summary(db, current_user.id)
+    return UnreadCountsOut(total=summary.total, by_kind=summary.by_kind, by_group=summary.by_group)
+
+
 @router.post("/{notification_id}/read", response_model=NotificationReadOut)
 def mark_notification_read(
     notification_id: int,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    notification = db.scalar(
-        select(Notification).where(
+    now = datetime.utcnow()
+    # Conditional on read_at so only the request that flips it uncounts it.
+    flipped = db.execute(
+        update(Notification)
+        .where(
             Notification.id == notification_id,
             Notification.user_id == current_user.id,
+            Notification.read_at.is_(None),
+        )
+        .values(read_at=now)
+        .returning(Notification.kind, Notification.related_group_id),
+        execution_options={"synchronize_session": False},
+    ).one_or_none()
+    if flipped is None:
+        read_at = db.scalar(
+            select(Notification.read_at).where(
+                Notification.id == notification_id,
+                Notification.user_id == current_user.id,
+            )
         )
+        if read_at is None:
+            raise HTTPException(status_code=404, detail="Notification not found")
+        return NotificationReadOut(id=notification_id, read_at=read_at)
+    count_read_notifications(db, [(current_user.id, flipped.kind, flipped.related_group_id)])
+    db.commit()
+    broker.publish_threadsafe(current_user.id, read_event({"ids": [notification_id], "read_at": now}))
+    return NotificationReadOut(id=notification_id, read_at=now)
+
+
+@router.post("/read", response_model=NotificationReadBatchOut)
+def mark_read(
+    payload: NotificationReadBatch,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Mark the listed ``ids``, or every notification with id <= ``up_to_id``, as read.
+
+    ``up_to_id`` is the newest notification the client has seen (the SSE
+    event id), so notifications that arrive later stay unread.
+    """
+    if (payload.ids is None) == (payload.up_to_id is None):
+        raise HTTPException(status_code=400, detail="Provide either ids or up_to_id")
+    now = datetime.utcnow()
+    stmt = update(Notification).where(
+        Notification.user_id == current_user.id,
+        Notification.read_at.is_(None),
     )
-    if not notification:
-        raise HTTPException(status_code=404, detail="Notification not found")
-    if notification.read_at:
-        return NotificationReadOut(id=notification.id, read_at=notification.read_at)
-    notification.read_at = datetime.utcnow()
+    if payload.ids is not None:
+        stmt = stmt.where(Notification.id.in_(payload.ids))
+    else:
+        stmt = stmt.where(Notification.id <= payload.up_to_id)
+    flipped = db.execute(
+        stmt.values(read_at=now).returning(Notification.id, Notification.kind, Notification.related_group_id),
+        execution_options={"synchronize_session": False},
+    ).all()
+    count_read_notifications(db, ((current_user.id, kind, group_id) for _, kind, group_id in flipped))
     db.commit()
-    return NotificationReadOut(id=notification.id, read_at=notification.read_at)
+    if flipped:
+        event = {"ids": [row.id for row in flipped]} if payload.ids is not None else {"up_to_id": payload.up_to_id}
+        broker.publish_threadsafe(current_user.id, read_event({**event, "read_at": now}))
+    return NotificationReadBatchOut(count=len(flipped), read_at=now)
 
 
-@router.post("/read-all")
+@router.post("/read-all", response_model=NotificationReadBatchOut)
 def mark_all_read(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
     now = datetime.utcnow()
-    notifications = list(
-        db.scalars(
-            select(Notification).where(
-                Notification.user_id == current_user.id,
-                Notification.read_at.is_(None),
-            )
-        ).all()
+    result = db.execute(
+        update(Notification)
+        .where(
+            Notification.user_id == current_user.id,
+            Notification.read_at.is_(None),
+        )
+        .values(read_at=now),
+        execution_options={"synchronize_session": False},
     )
-    for item in notifications:
-        item.read_at = now
+    # The UPDATE holds the write lock, so no notification can arrive before the
+    # commit: every counter of the user is now zero.
+    clear_unread_counts(db, current_user.id)
     db.commit()
-    return {"count": len(notifications), "read_at": now}
+    if result.rowcount:
+        broker.publish_threadsafe(current_user.id, read_event({"all": True, "read_at": now}))
+    return NotificationReadBatchOut(count=result.rowcount, read_at=now)
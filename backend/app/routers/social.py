@@ -1,12 +1,11 @@
-from datetime import date, datetime, timedelta
-from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
-
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy import and_, or_, select
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status
+from sqlalchemy import and_, case, or_, select
 from sqlalchemy.orm import Session
 
 from ..db import get_db
-from ..models import Checkin, Encouragement, FriendSetting, Friendship, Notification, Reminder, User
+from ..etags import not_modified, weak_etag
+from ..models import Encouragement, FriendSetting, Friendship, Reminder, User
+from ..outbox import notify_user
 from ..schemas import (
     EncourageRequest,
     FriendAccept,
@@ -18,39 +17,13 @@ from ..schemas import (
     RemindOut,
 )
 from ..security import get_current_user
+from ..streaks import streak_on
+from ..timezones import LocalDates, get_checked_in_today, get_local_dates, get_user_local_date
+from ..versions import bump_user_versions, friend_versions, user_version
 
 router = APIRouter(prefix="/friends", tags=["friends"])
 
 REMINDER_DAILY_LIMIT = 1
-STREAK_WINDOW_DAYS = 30
-
-
-def get_user_local_date(user: User) -> date:
-    try:
-        tz = ZoneInfo(user.timezone)
-    except ZoneInfoNotFoundError:
-        tz = ZoneInfo("UTC")
-    return datetime.now(tz).date()
-
-
-def get_streak_days(db: Session, user: User) -> int:
-    today = get_user_local_date(user)
-    start_date = today - timedelta(days=STREAK_WINDOW_DAYS - 1)
-    stmt = select(Checkin.date).where(
-        Checkin.user_id == user.id,
-        Checkin.date >= start_date,
-        Checkin.date <= today,
-    )
-    dates = {row for row in db.scalars(stmt).all()}
-    streak = 0
-    cursor = today
-    for _ in range(STREAK_WINDOW_DAYS):
-        if cursor in dates:
-            streak += 1
-            cursor -= timedelta(days=1)
-        else:
-            break
-    return streak
 
 
 def find_friendship(db: Session, user_id: int, friend_id: int) -> Friendship | None:
@@ -76,24 +49,37 @@ def ensure_friend_settings(db: Session, user_id: int, friend_id: int) -> None:
     db.add(FriendSetting(user_id=user_id, friend_id=friend_id))
 
 
-def to_friend_out(db: Session, current_user: User, friendship: Friendship, friend: User) -> FriendOut:
-    today = get_user_local_date(friend)
-    checked_in = db.scalar(
-        select(Checkin.id).where(Checkin.user_id == friend.id, Checkin.date == today)
-    )
+def friend_status_label(current_user: User, friendship: Friendship) -> str:
     if friendship.status == "pending":
-        status_label = "pending_out" if friendship.user_id == current_user.id else "pending_in"
-    else:
-        status_label = friendship.status
-    return FriendOut(
-        id=friend.id,
-        nickname=friend.nickname,
-        avatar_url=friend.avatar_url,
-        status=status_label,
-        today_checked_in=bool(checked_in),
-        streak_days=get_streak_days(db, friend),
-        message=friendship.message,
-    )
+        return "pending_out" if friendship.user_id == current_user.id else "pending_in"
+    return friendship.status
+
+
+def build_friend_outs(
+    db: Session,
+    current_user: User,
+    pairs: list[tuple[Friendship, User]],
+    dates: LocalDates | None = None,
+) -> list[FriendOut]:
+    dates = dates or LocalDates()
+    user_timezones = {friend.id: friend.timezone for _, friend in pairs}
+    checked_in = get_checked_in_today(db, user_timezones, dates)
+    return [
+        FriendOut(
+            id=friend.id,
+            nickname=friend.nickname,
+            avatar_url=friend.avatar_url,
+            status=friend_status_label(current_user, friendship),
+            today_checked_in=friend.id in checked_in,
+            streak_days=streak_on(friend, dates.for_user(friend)),
+            message=friendship.message,
+        )
+        for friendship, friend in pairs
+    ]
+
+
+def to_friend_out(db: Session, current_user: User, friendship: Friendship, friend: User) -> FriendOut:
+    return build_friend_outs(db, current_user, [(friendship, friend)])[0]
 
 
 @router.post("/request", response_model=FriendOut)
@@ -117,6 +103,7 @@ def request_friend(
         if existing.status == "pending" and existing.user_id == target.id:
             existing.status = "accepted"
             existing.blocked_by = None
+            bump_user_versions(db, [current_user.id, target.id])
             db.commit()
             ensure_friend_settings(db, current_user.id, target.id)
             ensure_friend_settings(db, target.id, current_user.id)
@@ -125,6 +112,7 @@ def request_friend(
         if existing.status == "pending" and existing.user_id == current_user.id:
             if payload.message is not None:
                 existing.message = payload.message
+                bump_user_versions(db, [current_user.id, target.id])
                 db.commit()
         return to_friend_out(db, current_user, existing, target)
 
@@ -135,6 +123,7 @@ def request_friend(
         message=payload.message,
     )
     db.add(friendship)
+    bump_user_versions(db, [current_user.id, target.id])
     db.commit()
     db.refresh(friendship)
     return to_friend_out(db, current_user, friendship, target)
@@ -159,6 +148,7 @@ def accept_friend(
     friendship.blocked_by = None
     ensure_friend_settings(db, current_user.id, payload.friend_id)
     ensure_friend_settings(db, payload.friend_id, current_user.id)
+    bump_user_versions(db, [current_user.id, payload.friend_id])
     db.commit()
     friend = db.scalar(select(User).where(User.id == payload.friend_id))
     return to_friend_out(db, current_user, friendship, friend)
@@ -166,23 +156,38 @@ def accept_friend(
 
 @router.get("", response_model=list[FriendOut])
 def list_friends(
+    response: Response,
+    if_none_match: str | None = Header(default=None),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
+    dates: LocalDates = Depends(get_local_dates),
 ):
-    stmt = select(Friendship).where(
-        or_(Friendship.user_id == current_user.id, Friendship.friend_id == current_user.id)
+    # Each friend's status and streak depend on the date in their own timezone.
+    friends = friend_versions(db, current_user.id)
+    etag = weak_etag(
+        "friends",
+        current_user.id,
+        user_version(db, current_user.id),
+        [(friend_id, version, dates.today(timezone)) for friend_id, version, timezone in friends],
     )
-    friendships = list(db.scalars(stmt).all())
-    results: list[FriendOut] = []
-    for friendship in friendships:
-        if friendship.status == "blocked":
-            continue
-        friend_id = (
-            friendship.friend_id if friendship.user_id == current_user.id else friendship.user_id
+    cached = not_modified(response, if_none_match, etag)
+    if cached:
+        return cached
+    friend_id = case(
+        (Friendship.user_id == current_user.id, Friendship.friend_id),
+        else_=Friendship.user_id,
+    )
+    stmt = (
+        select(Friendship, User)
+        .join(User, User.id == friend_id)
+        .where(
+            or_(Friendship.user_id == current_user.id, Friendship.friend_id == current_user.id),
+            Friendship.status != "blocked",
         )
-        friend = db.scalar(select(User).where(User.id == friend_id))
-        results.append(to_friend_out(db, current_user, friendship, friend))
-    return results
+        .order_by(Friendship.id)
+    )
+    pairs = [(friendship, friend) for friendship, friend in db.execute(stmt)]
+    return build_friend_outs(db, current_user, pairs, dates)
 
 
 @router.get("/{friend_id}", response_model=FriendDetailOut)
@@ -318,14 +323,7 @@ def remind_friend(
         return RemindOut(sent=False, limited=True)
 
     db.add(Reminder(from_user_id=current_user.id, to_user_id=friend_id, date=reminder_date))
-    db.add(
-        Notification(
-            user_id=friend_id,
-            from_user_id=current_user.id,
-            kind="remind",
-            message="提醒你打卡啦",
-        )
-    )
+    notify_user(db, friend_id, from_user_id=current_user.id, kind="remind", message="提醒你打卡啦")
     db.commit()
     return RemindOut(sent=True, limited=False)
 
@@ -352,13 +350,8 @@ def encourage_friend(
         message=payload.message,
     )
     db.add(record)
-    db.add(
-        Notification(
-            user_id=friend_id,
-            from_user_id=current_user.id,
-            kind="encourage",
-            message=f"给你加油 {payload.emoji}",
-        )
+    notify_user(
+        db, friend_id, from_user_id=current_user.id, kind="encourage", message=f"给你加油 {payload.emoji}"
     )
     db.commit()
     return {"sent": True}
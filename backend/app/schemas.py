@@ -1,7 +1,9 @@
 from datetime import date, datetime
 from typing import Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_serializer
+
+from .avatars import public_avatar_url
 
 
 class UserCreate(BaseModel):
@@ -24,6 +26,10 @@ class UserOut(BaseModel):
     last_checkin_at: datetime | None = None
     created_at: datetime
 
+    @field_serializer("avatar_url")
+    def serialize_avatar_url(self, value: str | None) -> str | None:
+        return public_avatar_url(value)
+
     class Config:
         from_attributes = True
 
@@ -79,6 +85,10 @@ class ContactOut(ContactIn):
     id: int
     kind: str
 
+    @field_serializer("avatar_url")
+    def serialize_avatar_url(self, value: str | None) -> str | None:
+        return public_avatar_url(value)
+
     class Config:
         from_attributes = True
 
@@ -176,6 +186,10 @@ class FriendOut(BaseModel):
     streak_days: int
     message: str | None = None
 
+    @field_serializer("avatar_url")
+    def serialize_avatar_url(self, value: str | None) -> str | None:
+        return public_avatar_url(value, thumbnail=True)
+
 
 class FriendDetailOut(BaseModel):
     id: int
@@ -188,6 +202,10 @@ class FriendDetailOut(BaseModel):
     last_checkin_at: datetime | None = None
     permission: FriendPermissionOut
 
+    @field_serializer("avatar_url")
+    def serialize_avatar_url(self, value: str | None) -> str | None:
+        return public_avatar_url(value)
+
 
 class EncourageRequest(BaseModel):
     emoji: str = Field(min_length=1, max_length=16)
@@ -213,6 +231,10 @@ class NotificationOut(BaseModel):
     created_at: datetime
     read_at: datetime | None = None
 
+    @field_serializer("from_user_avatar")
+    def serialize_from_user_avatar(self, value: str | None) -> str | None:
+        return public_avatar_url(value, thumbnail=True)
+
     class Config:
         from_attributes = True
 
@@ -222,6 +244,27 @@ class NotificationReadOut(BaseModel):
     read_at: datetime
 
 
+class NotificationReadBatch(BaseModel):
+    ids: list[int] | None = Field(default=None, min_length=1, max_length=500)
+    up_to_id: int | None = None
+
+
+class NotificationReadBatchOut(BaseModel):
+    count: int
+    read_at: datetime
+
+
+class AvatarOut(BaseModel):
+    url: str
+    thumbnail_url: str
+
+
+class UnreadCountsOut(BaseModel):
+    total: int
+    by_kind: dict[str, int]
+    by_group: dict[int, int]
+
+
 class GroupCreate(BaseModel):
     name: str = Field(min_length=1, max_length=64)
     privacy: str = Field(pattern=r"^(public|private)$")
@@ -279,3 +322,19 @@ class GroupEncourageOut(BaseModel):
     author: str
     message: str
     created_at: datetime
+
+
+class GroupLeaderboardEntryOut(BaseModel):
+    user_id: int
+    name: str
+    score: int
+    rank: int
+    # week only: share of this week's days so far with a check-in.
+    rate: float | None = None
+
+
+class GroupLeaderboardOut(BaseModel):
+    metric: str
+    entries: list[GroupLeaderboardEntryOut]
+    my_score: int
+    my_rank: int
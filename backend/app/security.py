@@ -1,47 +1,46 @@
 import hashlib
 import os
-from pathlib import Path
+import secrets
 from datetime import datetime, timedelta
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from .db import get_db
+from . import config  # noqa: F401  (loads backend/.env)
+from .db import get_async_db, get_db
+from .hashing import PasswordPoolBusy, hash_in_worker, password_pool, verify_in_worker
 from .models import User
-
-def load_env_file() -> None:
-    env_path = Path(__file__).resolve().parents[1] / ".env"
-    if not env_path.exists():
-        return
-    for line in env_path.read_text(encoding="utf-8").splitlines():
-        line = line.strip()
-        if not line or line.startswith("#") or "=" not in line:
-            continue
-        key, value = line.split("=", 1)
-        os.environ.setdefault(key.strip(), value.strip())
-
-
-load_env_file()
+from .user_cache import user_cache
 
 SECRET_KEY = os.getenv("SILEME_SECRET_KEY", "dev-secret-change-me")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_MINUTES = 15
 REFRESH_TOKEN_DAYS = 30
 
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
 http_bearer = HTTPBearer(auto_error=False)
 
 
+def run_password_job(fn, *args):
+    try:
+        return password_pool.run(fn, *args)
+    except PasswordPoolBusy as exc:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server busy, try again",
+            headers={"Retry-After": "1"},
+        ) from exc
+
+
 def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+    return run_password_job(hash_in_worker, password)
 
 
 def verify_password(password: str, hashed: str) -> bool:
-    return pwd_context.verify(password, hashed)
+    return run_password_job(verify_in_worker, password, hashed)
 
 
 def hash_token(token: str) -> str:
@@ -58,7 +57,8 @@ def create_access_token(user_id: int) -> tuple[str, int]:
 def create_refresh_token(user_id: int) -> tuple[str, int, datetime]:
     expires_delta = timedelta(days=REFRESH_TOKEN_DAYS)
     expire = datetime.utcnow() + expires_delta
-    payload = {"sub": str(user_id), "type": "refresh", "exp": expire}
+    # jti keeps two refresh tokens issued in the same second distinct.
+    payload = {"sub": str(user_id), "type": "refresh", "exp": expire, "jti": secrets.token_hex(8)}
     token = jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
     return token, int(expires_delta.total_seconds()), expire
 
@@ -70,10 +70,7 @@ def decode_token(token: str) -> dict:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token") from exc
 
 
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(http_bearer),
-    db: Session = Depends(get_db),
-) -> User:
+def user_id_from_credentials(credentials: HTTPAuthorizationCredentials | None) -> int:
     if not credentials or credentials.scheme.lower() != "bearer":
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
 
@@ -84,8 +81,34 @@ def get_current_user(
     user_id = payload.get("sub")
     if not user_id:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token subject")
+    return int(user_id)
+
 
-    user = db.scalar(select(User).where(User.id == int(user_id)))
+def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(http_bearer),
+    db: Session = Depends(get_db),
+) -> User:
+    user_id = user_id_from_credentials(credentials)
+    cached = user_cache.get(user_id)
+    if cached is not None:
+        return db.merge(cached, load=False)
+    user = db.scalar(select(User).where(User.id == user_id))
+    if not user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+    user_cache.put(user)
+    return user
+
+
+async def get_current_user_async(
+    credentials: HTTPAuthorizationCredentials = Depends(http_bearer),
+    db: AsyncSession = Depends(get_async_db),
+) -> User:
+    user_id = user_id_from_credentials(credentials)
+    cached = user_cache.get(user_id)
+    if cached is not None:
+        return await db.merge(cached, load=False)
+    user = await db.scalar(select(User).where(User.id == user_id))
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+    user_cache.put(user)
     return user
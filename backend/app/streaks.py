@@ -0,0 +1,101 @@
+"""Streak counters stored on the user row.
+
+``current_streak`` is the length of the run of consecutive check-in days that
+ends on ``last_checkin_date``; ``longest_streak`` is the longest run ever. Both
+are updated in the same transaction as the check-in, so reads are O(1) and not
+limited to a trailing window. Migration 002 backfills them, and a user whose
+``last_checkin_date`` is still empty gets them recomputed from their
+check-ins on their next one. ``rebuild_streaks`` recomputes them from the
+check-in rows (``python -m app.manage rebuild-streaks``).
+"""
+
+from datetime import date, timedelta
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from .models import Checkin, User
+from .versions import bump_user_versions
+
+REBUILD_BATCH_SIZE = 500
+
+
+def streak_on(user: User, today: date) -> int:
+    """Streak as seen on ``today``: it only counts while today is checked in."""
+    if user.last_checkin_date == today:
+        return user.current_streak
+    return 0
+
+
+def runs_from_dates(dates: list[date]) -> tuple[int, int]:
+    """(current run ending at the last date, longest run) for ascending dates."""
+    current = longest = 0
+    previous: date | None = None
+    for day in dates:
+        current = current + 1 if previous and day - previous == timedelta(days=1) else 1
+        longest = max(longest, current)
+        previous = day
+    return current, longest
+
+
+def record_checkin_day(db: Session, user: User, day: date) -> None:
+    """Account for a newly created check-in on ``day``. Call before commit."""
+    last = user.last_checkin_date
+    if last == day:
+        return
+    if last is None or day < last:
+        # No counters yet, which may still hide older check-ins, or an
+        # out-of-order day (e.g. the user moved west across a date line).
+        db.flush()
+        rebuild_user_streak(db, user)
+        return
+    if day - last == timedelta(days=1):
+        user.current_streak += 1
+    else:
+        user.current_streak = 1
+    user.last_checkin_date = day
+    user.longest_streak = max(user.longest_streak, user.current_streak)
+
+
+def rebuild_user_streak(db: Session, user: User) -> None:
+    dates = list(db.scalars(select(Checkin.date).where(Checkin.user_id == user.id).order_by(Checkin.date)))
+    user.current_streak, user.longest_streak = runs_from_dates(dates)
+    user.last_checkin_date = dates[-1] if dates else None
+
+
+def rebuild_streaks(db: Session) -> int:
+    """Recompute every user's counters from the check-in table; returns users updated."""
+    updated = 0
+    last_user_id = 0
+    while True:
+        user_ids = list(
+            db.scalars(
+                select(User.id).where(User.id > last_user_id).order_by(User.id).limit(REBUILD_BATCH_SIZE)
+            )
+        )
+        if not user_ids:
+            return updated
+        dates_by_user: dict[int, list[date]] = {user_id: [] for user_id in user_ids}
+        rows = db.execute(
+            select(Checkin.user_id, Checkin.date)
+            .where(Checkin.user_id.in_(user_ids))
+            .order_by(Checkin.user_id, Checkin.date)
+        )
+        for user_id, day in rows:
+            dates_by_user[user_id].append(day)
+        values = []
+        for user_id, dates in dates_by_user.items():
+            current, longest = runs_from_dates(dates)
+            values.append(
+                {
+                    "id": user_id,
+                    "current_streak": current,
+                    "longest_streak": longest,
+                    "last_checkin_date": dates[-1] if dates else None,
+                }
+            )
+        db.execute(update(User), values)
+        bump_user_versions(db, user_ids)
+        db.commit()
+        updated += len(user_ids)
+        last_user_id = user_ids[-1]
@@ -0,0 +1,85 @@
+"""Users' local dates.
+
+Check-ins, streaks and "checked in today" are keyed by the date in each
+user's own timezone. Zones are loaded once per process, and unknown names
+fall back to UTC. ``LocalDates`` resolves "today" once per distinct timezone
+against a single instant. Handlers take one per request through
+``Depends(get_local_dates)``, so a list of members or friends costs one
+date computation per timezone. An ETag and the body built after it also see
+the same date even if midnight passes in between.
+"""
+
+from datetime import date, datetime, timezone as dt_timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from sqlalchemy import and_, or_, select
+from sqlalchemy.orm import Session
+
+from .models import Checkin, User
+
+FALLBACK_TIMEZONE = "UTC"
+
+
+@lru_cache(maxsize=512)
+def load_zone(name: str) -> ZoneInfo | None:
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        return None
+
+
+def is_valid_timezone(name: str) -> bool:
+    return load_zone(name) is not None
+
+
+def get_zone(name: str) -> ZoneInfo:
+    return load_zone(name) or load_zone(FALLBACK_TIMEZONE)
+
+
+class LocalDates:
+    """Today's date per timezone at one instant, computed once per timezone."""
+
+    def __init__(self, now: datetime | None = None) -> None:
+        self.now = now or datetime.now(dt_timezone.utc)
+        self.by_timezone: dict[str, date] = {}
+
+    def today(self, timezone: str) -> date:
+        if timezone not in self.by_timezone:
+            self.by_timezone[timezone] = self.now.astimezone(get_zone(timezone)).date()
+        return self.by_timezone[timezone]
+
+    def for_user(self, user: User) -> date:
+        return self.today(user.timezone)
+
+    def ids_by_date(self, user_timezones: dict[int, str]) -> dict[date, list[int]]:
+        """Group user ids by their local today; timezones on the same date share a bucket."""
+        buckets: dict[date, list[int]] = {}
+        for user_id, timezone in user_timezones.items():
+            buckets.setdefault(self.today(timezone), []).append(user_id)
+        return buckets
+
+
+def get_local_dates() -> LocalDates:
+    return LocalDates()
+
+
+def get_local_date(timezone: str) -> date:
+    return LocalDates().today(timezone)
+
+
+def get_user_local_date(user: User) -> date:
+    return get_local_date(user.timezone)
+
+
+def get_checked_in_today(
+    db: Session, user_timezones: dict[int, str], dates: LocalDates | None = None
+) -> set[int]:
+    """Ids of users who checked in on their local today, in one query with one term per date."""
+    if not user_timezones:
+        return set()
+    buckets = (dates or LocalDates()).ids_by_date(user_timezones)
+    stmt = select(Checkin.user_id).where(
+        or_(*(and_(Checkin.date == day, Checkin.user_id.in_(ids)) for day, ids in buckets.items()))
+    )
+    return set(db.scalars(stmt).all())
@@ -0,0 +1,114 @@
+"""Unread notification counters.
+
+``notification_unread_counts`` holds one row per (user, kind, related group)
+with the number of unread notifications in it. Every write that creates a
+notification or marks one read adds its delta in the same transaction, so the
+badge endpoint and ``GroupOut.unread_count`` read a handful of counter rows
+instead of counting notifications. Notifications without a related group are
+counted under ``group_id`` 0.
+"""
+
+from collections import Counter
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from .models import Notification, NotificationUnreadCount
+
+# Rows per multi-row upsert, well under SQLite's bound-parameter limit.
+UPSERT_CHUNK_SIZE = 1000
+
+UnreadKey = tuple[int, str, int | None]  # user_id, kind, related_group_id
+
+
+@dataclass
+class UnreadSummary:
+    total: int = 0
+    by_kind: dict[str, int] = field(default_factory=dict)
+    by_group: dict[int, int] = field(default_factory=dict)
+
+
+def apply_unread_deltas(db: Session, deltas: Counter) -> None:
+    """Add ``deltas`` (keyed by ``UnreadKey``) to the counters in the current transaction."""
+    values = [
+        {"user_id": user_id, "kind": kind, "group_id": group_id or 0, "unread": delta}
+        for (user_id, kind, group_id), delta in deltas.items()
+        if delta
+    ]
+    for start in range(0, len(values), UPSERT_CHUNK_SIZE):
+        stmt = sqlite_insert(NotificationUnreadCount).values(values[start : start + UPSERT_CHUNK_SIZE])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[
+                NotificationUnreadCount.user_id,
+                NotificationUnreadCount.kind,
+                NotificationUnreadCount.group_id,
+            ],
+            set_={"unread": NotificationUnreadCount.unread + stmt.excluded.unread},
+        )
+        db.execute(stmt)
+
+
+def count_new_notifications(db: Session, rows: Iterable[dict]) -> None:
+    """Count notification rows about to be bulk-inserted (as ``insert(Notification)`` values)."""
+    apply_unread_deltas(db, Counter((row["user_id"], row["kind"], row.get("related_group_id")) for row in rows))
+
+
+def count_read_notifications(db: Session, keys: Iterable[UnreadKey]) -> None:
+    """Uncount notifications that went from unread to read in this transaction."""
+    apply_unread_deltas(db, Counter({key: -count for key, count in Counter(keys).items()}))
+
+
+def clear_unread_counts(db: Session, user_id: int) -> None:
+    db.execute(delete(NotificationUnreadCount).where(NotificationUnreadCount.user_id == user_id))
+
+
+def unread_summary(db: Session, user_id: int) -> UnreadSummary:
+    summary = UnreadSummary()
+    rows = db.execute(
+        select(NotificationUnreadCount.kind, NotificationUnreadCount.group_id, NotificationUnreadCount.unread).where(
+            NotificationUnreadCount.user_id == user_id,
+            NotificationUnreadCount.unread > 0,
+        )
+    )
+    for kind, group_id, unread in rows:
+        summary.total += unread
+        summary.by_kind[kind] = summary.by_kind.get(kind, 0) + unread
+        if group_id:
+            summary.by_group[group_id] = summary.by_group.get(group_id, 0) + unread
+    return summary
+
+
+def group_unread_counts(user_id: int):
+    """Subquery of (group_id, unread_count) for ``user_id``, to outer-join onto groups."""
+    return (
+        select(
+            NotificationUnreadCount.group_id,
+            func.sum(NotificationUnreadCount.unread).label("unread_count"),
+        )
+        .where(
+            NotificationUnreadCount.user_id == user_id,
+            NotificationUnreadCount.group_id != 0,
+            NotificationUnreadCount.unread > 0,
+        )
+        .group_by(NotificationUnreadCount.group_id)
+        .subquery()
+    )
+
+
+def rebuild_unread_counts(db: Session) -> int:
+    """Recompute every counter from the notifications table; returns rows written."""
+    group_id = func.coalesce(Notification.related_group_id, 0)
+    db.execute(delete(NotificationUnreadCount))
+    result = db.execute(
+        insert(NotificationUnreadCount).from_select(
+            ["user_id", "kind", "group_id", "unread"],
+            select(Notification.user_id, Notification.kind, group_id, func.count())
+            .where(Notification.read_at.is_(None))
+            .group_by(Notification.user_id, Notification.kind, group_id),
+        )
+    )
+    db.commit()
+    return result.rowcount
@@ -0,0 +1,126 @@
+"""In-process cache of authenticated ``User`` rows, keyed by user id.
+
+``get_current_user`` runs on every authenticated request, so a hit here skips
+the ``SELECT`` from ``users``. Entries are column snapshots with a short TTL
+and LRU eviction. On a hit the snapshot is merged into the request session
+without a query (``merge(load=False)``), so handlers can still modify and
+commit the user as usual.
+
+Writes that change a user row call ``invalidate_after_commit(db, user_ids)``
+(``bump_user_versions`` already does). The entries are dropped once that
+session commits and kept if it rolls back, so a handler cannot commit the
+change and forget the cache. Other worker processes only see such a change
+once their entry expires, which is why the TTL stays short.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Iterable
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from .models import User
+
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "30"))
+
+USER_COLUMNS = tuple(attr.key for attr in inspect(User).column_attrs)
+# Session.info key of the user ids to invalidate when the session commits.
+PENDING_INVALIDATIONS = "user_cache_invalidations"
+
+
+class UserCache:
+    def __init__(self, max_size: int, ttl_seconds: float) -> None:
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.entries: OrderedDict[int, tuple[float, dict]] = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0 and self.ttl_seconds > 0
+
+    def get(self, user_id: int) -> User | None:
+        """A detached User built from the snapshot, or None on a miss."""
+        if not self.enabled:
+            return None
+        with self.lock:
+            entry = self.entries.get(user_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, snapshot = entry
+            if expires_at < time.monotonic():
+                del self.entries[user_id]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self.entries.move_to_end(user_id)
+            self.hits += 1
+        user = User(**snapshot)
+        make_transient_to_detached(user)
+        return user
+
+    def put(self, user: User) -> None:
+        if not self.enabled:
+            return
+        snapshot = {key: getattr(user, key) for key in USER_COLUMNS}
+        with self.lock:
+            self.entries[user.id] = (time.monotonic() + self.ttl_seconds, snapshot)
+            self.entries.move_to_end(user.id)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, user_id: int) -> None:
+        with self.lock:
+            if self.entries.pop(user_id, None) is not None:
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self) -> dict:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self.entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "expirations": self.expirations,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+user_cache = UserCache(USER_CACHE_SIZE, USER_CACHE_TTL_SECONDS)
+
+
+def invalidate_after_commit(db: Session, user_ids: Iterable[int]) -> None:
+    """Drop the users' cache entries once ``db`` commits; a rollback keeps them."""
+    db.info.setdefault(PENDING_INVALIDATIONS, set()).update(user_ids)
+
+
+@event.listens_for(Session, "after_commit")
+def invalidate_committed(session: Session) -> None:
+    for user_id in session.info.pop(PENDING_INVALIDATIONS, ()):
+        user_cache.invalidate(user_id)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def forget_rolled_back(session: Session, previous_transaction) -> None:
+    # A rolled-back savepoint leaves the outer transaction and its changes pending.
+    if not session.in_transaction():
+        session.info.pop(PENDING_INVALIDATIONS, None)
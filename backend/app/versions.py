@@ -0,0 +1,113 @@
+"""Version stamps behind the conditional GETs (see app/etags.py).
+
+``users.version`` and ``groups.version`` are counters that writes bump in the
+same transaction as the change:
+
+* a user's version moves when anything shown about them in ``/me``,
+  ``/checkins/stats``, ``/checkins/summary`` or a friend's ``/friends`` list
+  changes: profile edits, check-ins, friendships and streak rebuilds;
+* a group's version moves when its ``GroupOut`` entry changes: joins,
+  approvals, rejections, renames, and the first check-in of the day of any
+  accepted member (``active_today``).
+
+Handlers then derive an ETag from a few stamp reads instead of running the
+query that builds the response. ``/me`` is built from ``current_user``, so
+its tag uses that object's version and is never newer than the body. The
+stats, summary and friends bodies are read from the database, so their tags
+read the stored version with ``user_version``. A cached user from another
+worker can be a TTL behind the row and would otherwise keep matching old
+tags. Versions only ever increase.
+
+The ``GET /groups`` directory has no such stamp, since one would have to cover
+every group. It tags a page by the ids and versions its page query returned
+instead, and a match still skips the per-group counts.
+"""
+
+from collections.abc import Iterable
+
+from sqlalchemy import case, func, or_, select, update
+from sqlalchemy.orm import Session
+
+from .models import Friendship, Group, GroupMember, NotificationUnreadCount, User
+from .user_cache import invalidate_after_commit
+
+
+def bump_user_versions(db: Session, user_ids: Iterable[int]) -> None:
+    """Bump the users' versions; their cached rows are dropped when ``db`` commits."""
+    user_ids = list(user_ids)
+    if user_ids:
+        db.execute(
+            update(User).where(User.id.in_(user_ids)).values(version=User.version + 1),
+            execution_options={"synchronize_session": False},
+        )
+        invalidate_after_commit(db, user_ids)
+
+
+def user_version(db: Session, user_id: int) -> int:
+    """The user's version as stored, which may be newer than a cached ``User``."""
+    return db.scalar(select(User.version).where(User.id == user_id))
+
+
+def bump_group_versions(db: Session, group_ids: Iterable[int]) -> None:
+    group_ids = list(group_ids)
+    if group_ids:
+        db.execute(
+            update(Group).where(Group.id.in_(group_ids)).values(version=Group.version + 1),
+            execution_options={"synchronize_session": False},
+        )
+
+
+def bump_member_group_versions(db: Session, user_id: int) -> None:
+    """Bump every group ``user_id`` is an accepted member of."""
+    memberships = select(GroupMember.group_id).where(
+        GroupMember.user_id == user_id, GroupMember.status == "accepted"
+    )
+    db.execute(
+        update(Group).where(Group.id.in_(memberships)).values(version=Group.version + 1),
+        execution_options={"synchronize_session": False},
+    )
+
+
+def friend_versions(db: Session, user_id: int) -> list[tuple[int, int, str]]:
+    """``(id, version, timezone)`` of everyone in the user's non-blocked friendships."""
+    friend_id = case(
+        (Friendship.user_id == user_id, Friendship.friend_id),
+        else_=Friendship.user_id,
+    )
+    return [
+        tuple(row)
+        for row in db.execute(
+            select(User.id, User.version, User.timezone)
+            .join(Friendship, User.id == friend_id)
+            .where(
+                or_(Friendship.user_id == user_id, Friendship.friend_id == user_id),
+                Friendship.status != "blocked",
+            )
+            .order_by(Friendship.id)
+        )
+    ]
+
+
+def unread_groups_stamp(db: Session, user_id: int) -> tuple:
+    """The user's unread notification counts per group, as in ``GroupOut.unread_count``."""
+    rows = db.execute(
+        select(NotificationUnreadCount.group_id, func.sum(NotificationUnreadCount.unread))
+        .where(
+            NotificationUnreadCount.user_id == user_id,
+            NotificationUnreadCount.group_id != 0,
+            NotificationUnreadCount.unread > 0,
+        )
+        .group_by(NotificationUnreadCount.group_id)
+        .order_by(NotificationUnreadCount.group_id)
+    ).all()
+    return tuple(map(tuple, rows))
+
+
+def my_groups_stamp(db: Session, user_id: int) -> tuple:
+    """Everything ``GET /groups/mine`` depends on for ``user_id``, except the date."""
+    count, total, last_id = db.execute(
+        select(func.count(), func.total(Group.version), func.max(Group.id)).join(
+            GroupMember, (GroupMember.group_id == Group.id) & (GroupMember.user_id == user_id)
+        )
+    ).one()
+    return count, int(total), last_id, unread_groups_stamp(db, user_id)
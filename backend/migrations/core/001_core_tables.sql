@@ -0,0 +1,67 @@
+-- Step 1: core tables (users, refresh tokens, contacts, check-ins)
+
+CREATE TABLE IF NOT EXISTS users (
+  id INTEGER PRIMARY KEY,
+  phone VARCHAR(20) NOT NULL,
+  password_hash VARCHAR(255) NOT NULL,
+  timezone VARCHAR(64) NOT NULL,
+  nickname VARCHAR(64),
+  avatar_url TEXT,
+  wechat VARCHAR(64),
+  email VARCHAR(320),
+  alarm_hours INTEGER NOT NULL,
+  estate_note TEXT,
+  last_checkin_at DATETIME,
+  created_at DATETIME NOT NULL
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS ix_users_phone ON users(phone);
+
+CREATE TABLE IF NOT EXISTS refresh_tokens (
+  id INTEGER PRIMARY KEY,
+  user_id INTEGER NOT NULL,
+  token_hash VARCHAR(64) NOT NULL,
+  device_name VARCHAR(128),
+  user_agent VARCHAR(255),
+  ip_address VARCHAR(64),
+  created_at DATETIME NOT NULL,
+  expires_at DATETIME NOT NULL,
+  revoked_at DATETIME,
+  FOREIGN KEY(user_id) REFERENCES users(id)
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS ix_refresh_tokens_token_hash ON refresh_tokens(token_hash);
+CREATE INDEX IF NOT EXISTS ix_refresh_tokens_user_id ON refresh_tokens(user_id);
+
+CREATE TABLE IF NOT EXISTS contacts (
+  id INTEGER PRIMARY KEY,
+  user_id INTEGER NOT NULL,
+  kind VARCHAR(16) NOT NULL,
+  name VARCHAR(64) NOT NULL,
+  relation VARCHAR(64) NOT NULL,
+  phone VARCHAR(20) NOT NULL,
+  wechat VARCHAR(64),
+  email VARCHAR(320),
+  note TEXT,
+  avatar_url TEXT,
+  created_at DATETIME NOT NULL,
+  FOREIGN KEY(user_id) REFERENCES users(id)
+);
+
+CREATE INDEX IF NOT EXISTS ix_contacts_user_id ON contacts(user_id);
+
+CREATE TABLE IF NOT EXISTS checkins (
+  id INTEGER PRIMARY KEY,
+  user_id INTEGER NOT NULL,
+  date DATE NOT NULL,
+  alive BOOLEAN NOT NULL,
+  sleep_hours INTEGER,
+  energy INTEGER,
+  mood INTEGER,
+  note TEXT,
+  FOREIGN KEY(user_id) REFERENCES users(id),
+  CONSTRAINT uq_checkins_user_date UNIQUE (user_id, date)
+);
+
+CREATE INDEX IF NOT EXISTS ix_checkins_user_id ON checkins(user_id);
+CREATE INDEX IF NOT EXISTS ix_checkins_date ON checkins(date);
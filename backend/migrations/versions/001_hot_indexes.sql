@@ -0,0 +1,11 @@
+-- migrate: per-statement
+-- Composite indexes for the hot read paths. Each index is built and committed
+-- on its own so writers wait for one index at a time, not the whole file.
+
+CREATE INDEX IF NOT EXISTS idx_groups_created_at ON groups(created_at);
+CREATE INDEX IF NOT EXISTS idx_group_members_group_status ON group_members(group_id, status, user_id);
+CREATE INDEX IF NOT EXISTS idx_group_members_user_status ON group_members(user_id, status);
+CREATE INDEX IF NOT EXISTS idx_notifications_user_created ON notifications(user_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_notifications_user_read ON notifications(user_id, read_at);
+CREATE INDEX IF NOT EXISTS idx_refresh_tokens_user_created ON refresh_tokens(user_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_group_encouragements_group_created ON group_encouragements(group_id, created_at);
@@ -0,0 +1,30 @@
+-- Derived streak state per user, maintained on check-in and backfilled here.
+-- Consecutive dates share julianday(date) - row_number(), which numbers each
+-- run of days. Repair: python -m app.manage rebuild-streaks
+
+ALTER TABLE users ADD COLUMN current_streak INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE users ADD COLUMN longest_streak INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE users ADD COLUMN last_checkin_date DATE;
+
+WITH days AS (
+  SELECT user_id, date, julianday(date) - ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY date) AS run
+  FROM checkins
+),
+runs AS (
+  SELECT user_id, COUNT(*) AS length, MAX(date) AS last_day
+  FROM days
+  GROUP BY user_id, run
+),
+totals AS (
+  SELECT user_id, MAX(length) AS longest, MAX(last_day) AS last_day
+  FROM runs
+  GROUP BY user_id
+)
+UPDATE users SET
+  current_streak = (
+    SELECT runs.length FROM runs WHERE runs.user_id = users.id AND runs.last_day = totals.last_day
+  ),
+  longest_streak = totals.longest,
+  last_checkin_date = totals.last_day
+FROM totals
+WHERE totals.user_id = users.id;
@@ -0,0 +1,31 @@
+-- Weekly per-user check-in aggregates (week_start is the Monday), maintained
+-- on write and backfilled here. Repair: python -m app.manage rebuild-rollups
+
+CREATE TABLE IF NOT EXISTS checkin_rollups (
+  id INTEGER PRIMARY KEY,
+  user_id INTEGER NOT NULL,
+  week_start DATE NOT NULL,
+  checkins INTEGER NOT NULL DEFAULT 0,
+  sleep_count INTEGER NOT NULL DEFAULT 0,
+  sleep_sum INTEGER NOT NULL DEFAULT 0,
+  energy_count INTEGER NOT NULL DEFAULT 0,
+  energy_sum INTEGER NOT NULL DEFAULT 0,
+  mood_count INTEGER NOT NULL DEFAULT 0,
+  mood_sum INTEGER NOT NULL DEFAULT 0,
+  FOREIGN KEY(user_id) REFERENCES users(id),
+  CONSTRAINT uq_checkin_rollups_user_week UNIQUE (user_id, week_start)
+);
+
+INSERT OR IGNORE INTO checkin_rollups (
+  user_id, week_start, checkins,
+  sleep_count, sleep_sum, energy_count, energy_sum, mood_count, mood_sum
+)
+SELECT
+  user_id,
+  date(date, '-6 days', 'weekday 1'),
+  COUNT(*),
+  COUNT(sleep_hours), COALESCE(SUM(sleep_hours), 0),
+  COUNT(energy), COALESCE(SUM(energy), 0),
+  COUNT(mood), COALESCE(SUM(mood), 0)
+FROM checkins
+GROUP BY user_id, date(date, '-6 days', 'weekday 1');
@@ -0,0 +1,13 @@
+-- Missed check-in alarms: the deadline is last_checkin_at + alarm_hours and is
+-- cleared when the alarm fires (see app/alarms.py). Only deadlines still in
+-- the future are backfilled, so the deploy does not fire a burst of alarms
+-- for users who stopped checking in long ago.
+
+ALTER TABLE users ADD COLUMN alarm_due_at DATETIME;
+
+UPDATE users
+SET alarm_due_at = datetime(last_checkin_at, printf('%d hours', alarm_hours))
+WHERE last_checkin_at IS NOT NULL
+  AND datetime(last_checkin_at, printf('%d hours', alarm_hours)) > datetime('now');
+
+CREATE INDEX IF NOT EXISTS idx_users_alarm_due_at ON users(alarm_due_at) WHERE alarm_due_at IS NOT NULL;
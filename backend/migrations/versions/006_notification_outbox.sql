@@ -0,0 +1,15 @@
+-- Notifications appended by request handlers and fanned out by the outbox
+-- dispatcher (app/outbox.py). Rows are deleted once dispatched.
+
+CREATE TABLE IF NOT EXISTS notification_outbox (
+  id INTEGER PRIMARY KEY,
+  audience VARCHAR(16) NOT NULL,
+  target_id INTEGER NOT NULL,
+  exclude_user_id INTEGER,
+  from_user_id INTEGER,
+  related_group_id INTEGER,
+  related_user_id INTEGER,
+  kind VARCHAR(32) NOT NULL,
+  message VARCHAR(200) NOT NULL,
+  created_at DATETIME NOT NULL
+);
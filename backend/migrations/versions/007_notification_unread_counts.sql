@@ -0,0 +1,19 @@
+-- Unread notification counters per (user, kind, related group), maintained
+-- on insert and read and backfilled here. group_id is 0 for notifications
+-- without a related group. Repair: python -m app.manage rebuild-unread-counts
+
+CREATE TABLE IF NOT EXISTS notification_unread_counts (
+  id INTEGER PRIMARY KEY,
+  user_id INTEGER NOT NULL,
+  kind VARCHAR(32) NOT NULL,
+  group_id INTEGER NOT NULL DEFAULT 0,
+  unread INTEGER NOT NULL DEFAULT 0,
+  FOREIGN KEY(user_id) REFERENCES users(id),
+  CONSTRAINT uq_notification_unread_counts_key UNIQUE (user_id, kind, group_id)
+);
+
+INSERT OR IGNORE INTO notification_unread_counts (user_id, kind, group_id, unread)
+SELECT user_id, kind, COALESCE(related_group_id, 0), COUNT(*)
+FROM notifications
+WHERE read_at IS NULL
+GROUP BY user_id, kind, COALESCE(related_group_id, 0);
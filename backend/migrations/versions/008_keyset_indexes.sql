@@ -0,0 +1,10 @@
+-- migrate: per-statement
+-- Keyset pagination orders by (created_at, id). These indexes cover the full
+-- sort key and replace the (.., created_at) ones from 001_hot_indexes.
+-- Check-ins page on (date, id) through uq_checkins_user_date, since the date
+-- is already unique per user.
+
+CREATE INDEX IF NOT EXISTS idx_notifications_user_created_id ON notifications(user_id, created_at, id);
+DROP INDEX IF EXISTS idx_notifications_user_created;
+CREATE INDEX IF NOT EXISTS idx_group_encouragements_group_created_id ON group_encouragements(group_id, created_at, id);
+DROP INDEX IF EXISTS idx_group_encouragements_group_created;
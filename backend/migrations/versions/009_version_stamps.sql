@@ -0,0 +1,5 @@
+-- Version stamps for ETags on /me, /checkins/stats, /checkins/summary,
+-- /friends and /groups; bumped by writes (app/versions.py).
+
+ALTER TABLE users ADD COLUMN version INTEGER NOT NULL DEFAULT 1;
+ALTER TABLE groups ADD COLUMN version INTEGER NOT NULL DEFAULT 1;
@@ -0,0 +1,23 @@
+-- migrate: per-statement
+-- Archive for notifications moved out of the hot table by the retention job
+-- (app/retention.py). Rows keep their original id. The partial indexes let
+-- each retention pass find its rows without scanning the whole table.
+
+CREATE TABLE IF NOT EXISTS notifications_archive (
+  id INTEGER PRIMARY KEY,
+  user_id INTEGER NOT NULL,
+  from_user_id INTEGER,
+  related_group_id INTEGER,
+  related_user_id INTEGER,
+  kind VARCHAR(32) NOT NULL,
+  message VARCHAR(200) NOT NULL,
+  created_at DATETIME NOT NULL,
+  read_at DATETIME,
+  archived_at DATETIME NOT NULL,
+  FOREIGN KEY(user_id) REFERENCES users(id),
+  FOREIGN KEY(from_user_id) REFERENCES users(id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_notifications_archive_user_created_id ON notifications_archive(user_id, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_notifications_read_at ON notifications(read_at) WHERE read_at IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_notifications_unread_created ON notifications(created_at) WHERE read_at IS NULL;
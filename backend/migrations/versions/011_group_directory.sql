@@ -0,0 +1,30 @@
+-- Group directory: keyset index for GET /groups and a full-text index over
+-- group names and announcements. The trigram tokenizer matches any
+-- substring of three or more characters, Chinese included. groups_fts is an
+-- external-content table kept in sync by triggers and backfilled here.
+-- Repair: INSERT INTO groups_fts(groups_fts) VALUES ('rebuild');
+
+CREATE INDEX IF NOT EXISTS idx_groups_created_id ON groups(created_at, id);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS groups_fts USING fts5(
+  name,
+  announcement,
+  content='groups',
+  content_rowid='id',
+  tokenize='trigram'
+);
+
+CREATE TRIGGER IF NOT EXISTS groups_fts_insert AFTER INSERT ON groups BEGIN
+  INSERT INTO groups_fts(rowid, name, announcement) VALUES (new.id, new.name, new.announcement);
+END;
+
+CREATE TRIGGER IF NOT EXISTS groups_fts_delete AFTER DELETE ON groups BEGIN
+  INSERT INTO groups_fts(groups_fts, rowid, name, announcement) VALUES ('delete', old.id, old.name, old.announcement);
+END;
+
+CREATE TRIGGER IF NOT EXISTS groups_fts_update AFTER UPDATE OF name, announcement ON groups BEGIN
+  INSERT INTO groups_fts(groups_fts, rowid, name, announcement) VALUES ('delete', old.id, old.name, old.announcement);
+  INSERT INTO groups_fts(rowid, name, announcement) VALUES (new.id, new.name, new.announcement);
+END;
+
+INSERT INTO groups_fts(groups_fts) VALUES ('rebuild');
@@ -0,0 +1,18 @@
+-- Join-code allocator state (app/join_codes.py): the sequence behind new
+-- codes with its permutation key, and codes released by invite-code rotation
+-- waiting to be reused. The key must never change once codes are issued.
+
+CREATE TABLE IF NOT EXISTS join_code_state (
+  id INTEGER PRIMARY KEY,
+  next_value INTEGER NOT NULL DEFAULT 0,
+  key VARCHAR(32) NOT NULL
+);
+
+INSERT OR IGNORE INTO join_code_state (id, next_value, key) VALUES (1, 0, lower(hex(randomblob(16))));
+
+CREATE TABLE IF NOT EXISTS released_join_codes (
+  code VARCHAR(16) PRIMARY KEY,
+  released_at DATETIME NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_released_join_codes_released_at ON released_join_codes(released_at);
@@ -0,0 +1,73 @@
+-- Per-group leaderboards (app/leaderboards.py), kept up to date by
+-- encouragement and check-in writes and backfilled here. The index is the
+-- sorted order every leaderboard is read in. group_leaderboard_counts holds
+-- the number of members at each score and is maintained by the triggers
+-- below, so the backfill fills it too.
+-- Repair: python -m app.manage rebuild-leaderboards
+
+CREATE TABLE IF NOT EXISTS group_leaderboard_scores (
+  id INTEGER PRIMARY KEY,
+  group_id INTEGER NOT NULL,
+  metric VARCHAR(16) NOT NULL,
+  user_id INTEGER NOT NULL,
+  period DATE NOT NULL,
+  score INTEGER NOT NULL DEFAULT 0,
+  FOREIGN KEY(group_id) REFERENCES groups(id),
+  FOREIGN KEY(user_id) REFERENCES users(id),
+  CONSTRAINT uq_group_leaderboard_scores_key UNIQUE (group_id, metric, user_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_group_leaderboard_scores_rank
+  ON group_leaderboard_scores(group_id, metric, period, score DESC, user_id);
+
+CREATE TABLE IF NOT EXISTS group_leaderboard_counts (
+  id INTEGER PRIMARY KEY,
+  group_id INTEGER NOT NULL,
+  metric VARCHAR(16) NOT NULL,
+  period DATE NOT NULL,
+  score INTEGER NOT NULL,
+  members INTEGER NOT NULL DEFAULT 0,
+  CONSTRAINT uq_group_leaderboard_counts_key UNIQUE (group_id, metric, period, score)
+);
+
+CREATE TRIGGER IF NOT EXISTS group_leaderboard_counts_insert AFTER INSERT ON group_leaderboard_scores BEGIN
+  INSERT INTO group_leaderboard_counts (group_id, metric, period, score, members)
+  VALUES (new.group_id, new.metric, new.period, new.score, 1)
+  ON CONFLICT (group_id, metric, period, score) DO UPDATE SET members = members + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS group_leaderboard_counts_delete AFTER DELETE ON group_leaderboard_scores BEGIN
+  UPDATE group_leaderboard_counts SET members = members - 1
+  WHERE group_id = old.group_id AND metric = old.metric AND period = old.period AND score = old.score;
+  DELETE FROM group_leaderboard_counts
+  WHERE group_id = old.group_id AND metric = old.metric AND period = old.period AND score = old.score
+    AND members <= 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS group_leaderboard_counts_update AFTER UPDATE OF period, score ON group_leaderboard_scores BEGIN
+  UPDATE group_leaderboard_counts SET members = members - 1
+  WHERE group_id = old.group_id AND metric = old.metric AND period = old.period AND score = old.score;
+  DELETE FROM group_leaderboard_counts
+  WHERE group_id = old.group_id AND metric = old.metric AND period = old.period AND score = old.score
+    AND members <= 0;
+  INSERT INTO group_leaderboard_counts (group_id, metric, period, score, members)
+  VALUES (new.group_id, new.metric, new.period, new.score, 1)
+  ON CONFLICT (group_id, metric, period, score) DO UPDATE SET members = members + 1;
+END;
+
+INSERT OR IGNORE INTO group_leaderboard_scores (group_id, metric, user_id, period, score)
+SELECT group_id, 'encouragements', user_id, '1970-01-01', COUNT(*)
+FROM group_encouragements
+GROUP BY group_id, user_id;
+
+INSERT OR IGNORE INTO group_leaderboard_scores (group_id, metric, user_id, period, score)
+SELECT m.group_id, 'streak', u.id, u.last_checkin_date, u.current_streak
+FROM group_members m JOIN users u ON u.id = m.user_id
+WHERE m.status = 'accepted' AND u.last_checkin_date IS NOT NULL AND u.current_streak > 0;
+
+INSERT OR IGNORE INTO group_leaderboard_scores (group_id, metric, user_id, period, score)
+SELECT m.group_id, 'week', u.id, date(u.last_checkin_date, '-6 days', 'weekday 1'),
+  (SELECT COUNT(*) FROM checkins c
+   WHERE c.user_id = u.id AND c.date >= date(u.last_checkin_date, '-6 days', 'weekday 1'))
+FROM group_members m JOIN users u ON u.id = m.user_id
+WHERE m.status = 'accepted' AND u.last_checkin_date IS NOT NULL AND u.current_streak > 0;
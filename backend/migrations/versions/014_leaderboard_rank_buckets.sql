@@ -0,0 +1,66 @@
+-- Leaderboard ranks in a bounded number of lookups (app/leaderboards.py).
+-- group_leaderboard_counts used to hold the members at each score, so a rank
+-- summed one row per distinct higher score. It now holds the members per
+-- power-of-two bucket of scores, (score >> level) at each of the 32 levels
+-- in group_leaderboard_levels. Any range of higher scores is the union of at
+-- most 32 buckets. The triggers below replace those from 013 and the table
+-- is backfilled from group_leaderboard_scores.
+-- Repair: python -m app.manage rebuild-leaderboards
+
+DROP TRIGGER IF EXISTS group_leaderboard_counts_insert;
+DROP TRIGGER IF EXISTS group_leaderboard_counts_delete;
+DROP TRIGGER IF EXISTS group_leaderboard_counts_update;
+DROP TABLE IF EXISTS group_leaderboard_counts;
+
+CREATE TABLE IF NOT EXISTS group_leaderboard_levels (
+  level INTEGER PRIMARY KEY
+);
+
+INSERT OR IGNORE INTO group_leaderboard_levels (level)
+WITH RECURSIVE levels(level) AS (SELECT 0 UNION ALL SELECT level + 1 FROM levels WHERE level < 31)
+SELECT level FROM levels;
+
+CREATE TABLE IF NOT EXISTS group_leaderboard_counts (
+  id INTEGER PRIMARY KEY,
+  group_id INTEGER NOT NULL,
+  metric VARCHAR(16) NOT NULL,
+  period DATE NOT NULL,
+  level INTEGER NOT NULL,
+  bucket INTEGER NOT NULL,
+  members INTEGER NOT NULL DEFAULT 0,
+  CONSTRAINT uq_group_leaderboard_counts_key UNIQUE (group_id, metric, period, level, bucket)
+);
+
+CREATE TRIGGER IF NOT EXISTS group_leaderboard_counts_insert AFTER INSERT ON group_leaderboard_scores BEGIN
+  INSERT INTO group_leaderboard_counts (group_id, metric, period, level, bucket, members)
+  SELECT new.group_id, new.metric, new.period, level, new.score >> level, 1 FROM group_leaderboard_levels WHERE true
+  ON CONFLICT (group_id, metric, period, level, bucket) DO UPDATE SET members = members + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS group_leaderboard_counts_delete AFTER DELETE ON group_leaderboard_scores BEGIN
+  UPDATE group_leaderboard_counts SET members = members - 1
+  WHERE group_id = old.group_id AND metric = old.metric AND period = old.period
+    AND (level, bucket) IN (SELECT level, old.score >> level FROM group_leaderboard_levels);
+  DELETE FROM group_leaderboard_counts
+  WHERE group_id = old.group_id AND metric = old.metric AND period = old.period
+    AND (level, bucket) IN (SELECT level, old.score >> level FROM group_leaderboard_levels)
+    AND members <= 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS group_leaderboard_counts_update AFTER UPDATE OF period, score ON group_leaderboard_scores BEGIN
+  UPDATE group_leaderboard_counts SET members = members - 1
+  WHERE group_id = old.group_id AND metric = old.metric AND period = old.period
+    AND (level, bucket) IN (SELECT level, old.score >> level FROM group_leaderboard_levels);
+  DELETE FROM group_leaderboard_counts
+  WHERE group_id = old.group_id AND metric = old.metric AND period = old.period
+    AND (level, bucket) IN (SELECT level, old.score >> level FROM group_leaderboard_levels)
+    AND members <= 0;
+  INSERT INTO group_leaderboard_counts (group_id, metric, period, level, bucket, members)
+  SELECT new.group_id, new.metric, new.period, level, new.score >> level, 1 FROM group_leaderboard_levels WHERE true
+  ON CONFLICT (group_id, metric, period, level, bucket) DO UPDATE SET members = members + 1;
+END;
+
+INSERT INTO group_leaderboard_counts (group_id, metric, period, level, bucket, members)
+SELECT s.group_id, s.metric, s.period, l.level, s.score >> l.level, COUNT(*)
+FROM group_leaderboard_scores s CROSS JOIN group_leaderboard_levels l
+GROUP BY s.group_id, s.metric, s.period, l.level, s.score >> l.level;
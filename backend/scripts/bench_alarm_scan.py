@@ -0,0 +1,122 @@
+"""Alarm scan cycle time on a large user table.
+
+Usage (from backend/):
+    python scripts/bench_alarm_scan.py --users 1000000 --due 1000
+
+The script seeds a fresh, migrated database with ``--users`` armed users whose
+deadlines fall over the next three days, plus ``--due`` users who are overdue
+and have a registered contact. It then times:
+
+* an indexed scan cycle (``fire_due_alarms``) that fires the due alarms;
+* a second cycle with nothing due, the steady state between deadlines;
+* the full-table scan this replaces (deadline computed per row).
+"""
+
+import argparse
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+
+def seed(path: str, users: int, due: int) -> None:
+    now = datetime.utcnow()
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=OFF")
+
+    def rows():
+        for i in range(1, users + due + 1):
+            if i <= users:
+                last = now - timedelta(minutes=random.randint(0, 24 * 60))
+                deadline = last + timedelta(hours=72)
+            else:
+                last = now - timedelta(hours=25)
+                deadline = last + timedelta(hours=24)
+            yield (
+                i,
+                f"2{i:010d}",
+                "x",
+                "Asia/Shanghai",
+                24 if i > users else 72,
+                last.isoformat(sep=" "),
+                deadline.isoformat(sep=" ", timespec="seconds"),
+                now.isoformat(sep=" "),
+            )
+
+    conn.executemany(
+        "INSERT INTO users (id, phone, password_hash, timezone, alarm_hours, last_checkin_at,"
+        " alarm_due_at, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        rows(),
+    )
+    # Every overdue user lists the first user as their primary contact.
+    conn.executemany(
+        "INSERT INTO contacts (user_id, kind, name, relation, phone, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+        ((i, "primary", "c", "r", "20000000001", now.isoformat(sep=" ")) for i in range(users + 1, users + due + 1)),
+    )
+    conn.commit()
+    conn.execute("ANALYZE")
+    conn.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--due", type=int, default=1000)
+    args = parser.parse_args()
+
+    path = f"{tempfile.mkdtemp(prefix='bench-alarms-')}/bench.db"
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    sys.path.insert(0, str(BACKEND_DIR))
+    from app.alarms import fire_due_alarms
+    from app.db import SessionLocal
+    from app.migrate import run_migrations
+
+    run_migrations()
+    started = time.perf_counter()
+    seed(path, args.users, args.due)
+    seed_seconds = time.perf_counter() - started
+
+    with SessionLocal() as db:
+        started = time.perf_counter()
+        fired = fire_due_alarms(db)
+        fire_ms = (time.perf_counter() - started) * 1000
+        started = time.perf_counter()
+        idle_fired = fire_due_alarms(db)
+        idle_ms = (time.perf_counter() - started) * 1000
+
+    conn = sqlite3.connect(path)
+    started = time.perf_counter()
+    conn.execute(
+        "SELECT count(*) FROM users WHERE last_checkin_at IS NOT NULL"
+        " AND datetime(last_checkin_at, printf('%d hours', alarm_hours)) <= datetime('now')"
+    ).fetchone()
+    full_scan_ms = (time.perf_counter() - started) * 1000
+    notifications = conn.execute("SELECT count(*) FROM notifications WHERE kind = 'alarm'").fetchone()[0]
+    conn.close()
+
+    print(
+        json.dumps(
+            {
+                "users": args.users + args.due,
+                "seed_s": round(seed_seconds, 1),
+                "fired": fired,
+                "notifications": notifications,
+                "fire_cycle_ms": round(fire_ms, 1),
+                "idle_cycle_fired": idle_fired,
+                "idle_cycle_ms": round(idle_ms, 2),
+                "full_scan_ms": round(full_scan_ms, 1),
+            }
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""Concurrent /checkins/today throughput for each engine profile.
+
+Profiles: legacy SQLite settings, the tuned engine, and the tuned engine with
+DB_MODE=async.
+
+Usage (from backend/):
+    python scripts/bench_checkins_today.py --requests 2000 --concurrency 32
+
+Each profile starts its own uvicorn on a fresh database file, registers a few
+users, then mixes GET and POST /checkins/today from a thread pool. Only the
+standard library and the backend requirements are needed.
+"""
+
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+PROFILES = {
+    # What app/db.py did before the engine became configurable.
+    "legacy": {
+        "SQLITE_JOURNAL_MODE": "DELETE",
+        "SQLITE_SYNCHRONOUS": "FULL",
+        "SQLITE_BUSY_TIMEOUT_MS": "5000",
+        "SQLITE_MMAP_SIZE": "0",
+        "SQLITE_CACHE_SIZE": "-2000",
+        "DB_POOL_SIZE": "5",
+        "DB_MAX_OVERFLOW": "10",
+    },
+    # Defaults from app/db.py.
+    "tuned": {},
+    # Tuned engine with handlers on the event loop (AsyncSession over aiosqlite).
+    "async": {"DB_MODE": "async"},
+}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def call(base: str, method: str, path: str, body: dict | None = None, token: str | None = None):
+    data = json.dumps(body).encode() if body is not None else None
+    req = urllib.request.Request(base + path, data=data, method=method)
+    req.add_header("Content-Type", "application/json")
+    if token:
+        req.add_header("Authorization", f"Bearer {token}")
+    try:
+        with urllib.request.urlopen(req, timeout=60) as resp:
+            return resp.status, json.loads(resp.read() or b"null")
+    except urllib.error.HTTPError as exc:
+        return exc.code, None
+
+
+def wait_ready(base: str, proc: subprocess.Popen) -> None:
+    for _ in range(100):
+        if proc.poll() is not None:
+            raise RuntimeError("uvicorn exited during startup")
+        try:
+            if call(base, "GET", "/")[0] == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError("uvicorn did not become ready")
+
+
+def run_profile(name: str, args) -> dict:
+    workdir = tempfile.mkdtemp(prefix=f"bench-{name}-")
+    env = {**os.environ, **PROFILES[name], "DATABASE_URL": f"sqlite:///{workdir}/bench.db"}
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    subprocess.run([sys.executable, "-m", "app.manage", "migrate"], cwd=BACKEND_DIR, env=env, check=True)
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env=env,
+    )
+    try:
+        wait_ready(base, proc)
+        tokens = []
+        for i in range(args.users):
+            phone = f"1380000{i:04d}"
+            call(base, "POST", "/auth/register", {"phone": phone, "password": "benchpass1", "sms_code": "123456"})
+            status, pair = call(base, "POST", "/auth/login", {"phone": phone, "password": "benchpass1"})
+            if status != 200:
+                raise RuntimeError(f"login failed with {status}")
+            tokens.append(pair["access_token"])
+            call(base, "POST", "/checkins/today", {"alive": True, "sleep_hours": 7}, tokens[-1])
+
+        def one(i: int) -> tuple[int, float]:
+            token = tokens[i % len(tokens)]
+            started = time.perf_counter()
+            if i % args.write_every == 0:
+                status, _ = call(base, "POST", "/checkins/today", {"alive": True, "mood": 1 + i % 5}, token)
+            else:
+                status, _ = call(base, "GET", "/checkins/today", token=token)
+            return status, time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            results = list(pool.map(one, range(args.requests)))
+        elapsed = time.perf_counter() - started
+    finally:
+        proc.terminate()
+        proc.wait()
+
+    latencies = sorted(latency for _, latency in results)
+    errors = sum(1 for status, _ in results if status >= 500)
+    return {
+        "profile": name,
+        "requests": len(results),
+        "errors": errors,
+        "rps": round(len(results) / elapsed, 1),
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 1),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--write-every", type=int, default=5, help="every Nth request is a POST")
+    parser.add_argument("--profile", choices=sorted(PROFILES), action="append")
+    args = parser.parse_args()
+
+    for name in args.profile or ["legacy", "tuned", "async"]:
+        print(json.dumps(run_profile(name, args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""Full GET vs conditional GET (304) on the read-heavy endpoints.
+
+Usage (from backend/):
+    python scripts/bench_conditional_get.py --friends 200 --groups 500
+
+Starts one uvicorn worker on a fresh database. It registers a user and seeds
+friends with 180 days of check-ins each, plus groups the user belongs to. It
+then times repeated requests to each endpoint, first without and then with
+``If-None-Match`` set to the ETag of the first response. It reports p50
+latency and body bytes for both.
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_checkins_today import BACKEND_DIR, call, free_port, wait_ready  # noqa: E402
+
+PATHS = ("/me", "/checkins/stats", "/checkins/summary?days=180", "/friends", "/groups")
+
+
+def seed(path: str, user_id: int, friends: int, groups: int) -> None:
+    now = datetime.utcnow().isoformat(sep=" ")
+    today = date.today()
+    conn = sqlite3.connect(path)
+    first = user_id + 1
+    friend_ids = range(first, first + friends)
+    conn.executemany(
+        "INSERT INTO users (id, phone, password_hash, timezone, alarm_hours, current_streak, longest_streak,"
+        " last_checkin_date, version, created_at) VALUES (?, ?, 'x', 'Asia/Shanghai', 24, 180, 180, ?, 1, ?)",
+        ((i, f"2{i:010d}", today.isoformat(), now) for i in friend_ids),
+    )
+    conn.executemany(
+        "INSERT INTO checkins (user_id, date, alive, sleep_hours, mood) VALUES (?, ?, 1, 7, 3)",
+        (
+            (i, (today - timedelta(days=day)).isoformat())
+            for i in [user_id, *friend_ids]
+            for day in range(180)
+        ),
+    )
+    conn.executemany(
+        "INSERT INTO friendships (user_id, friend_id, status, created_at) VALUES (?, ?, 'accepted', ?)",
+        ((user_id, i, now) for i in friend_ids),
+    )
+    conn.executemany(
+        "INSERT INTO groups (id, name, privacy, requires_approval, join_code, owner_id, version, created_at)"
+        " VALUES (?, ?, 'public', 1, ?, ?, 1, ?)",
+        ((g, f"g{g}", f"B{g:07d}", user_id, now) for g in range(1, groups + 1)),
+    )
+    conn.executemany(
+        "INSERT INTO group_members (group_id, user_id, role, status, requested_at) VALUES (?, ?, ?, 'accepted', ?)",
+        (
+            (g, member, "owner" if member == user_id else "member", now)
+            for g in range(1, groups + 1)
+            for member in (user_id, first + g % max(friends, 1))
+        ),
+    )
+    conn.commit()
+    conn.close()
+
+
+def timed_get(base: str, path: str, token: str, etag: str | None = None) -> tuple[float, int, int, str | None]:
+    req = urllib.request.Request(base + path)
+    req.add_header("Authorization", f"Bearer {token}")
+    if etag:
+        req.add_header("If-None-Match", etag)
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=60) as resp:
+            body = resp.read()
+            status, tag = resp.status, resp.headers.get("ETag")
+    except urllib.error.HTTPError as exc:
+        body = exc.read()
+        status, tag = exc.code, exc.headers.get("ETag")
+    return time.perf_counter() - started, status, len(body), tag
+
+
+def measure(base: str, path: str, token: str, repeat: int) -> dict:
+    _, _, _, etag = timed_get(base, path, token)
+    result = {}
+    for label, tag in (("full", None), ("conditional", etag)):
+        samples = [timed_get(base, path, token, tag) for _ in range(repeat)]
+        timings = sorted(sample[0] for sample in samples)
+        result[label] = {
+            "status": samples[0][1],
+            "bytes": samples[0][2],
+            "p50_ms": round(timings[len(timings) // 2] * 1000, 2),
+        }
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--friends", type=int, default=200)
+    parser.add_argument("--groups", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench-etag-")
+    db_path = f"{workdir}/bench.db"
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{db_path}", "PASSWORD_HASH_WORKERS": "0"}
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    subprocess.run([sys.executable, "-m", "app.manage", "migrate"], cwd=BACKEND_DIR, env=env, check=True)
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env=env,
+    )
+    try:
+        wait_ready(base, proc)
+        call(base, "POST", "/auth/register", {"phone": "13800000001", "password": "benchpass1", "sms_code": "123456"})
+        token = call(base, "POST", "/auth/login", {"phone": "13800000001", "password": "benchpass1"})[1]["access_token"]
+        user_id = call(base, "GET", "/me", token=token)[1]["id"]
+        seed(db_path, user_id, args.friends, args.groups)
+        results = {path: measure(base, path, token, args.repeat) for path in PATHS}
+        print(json.dumps({"friends": args.friends, "groups": args.groups, "results": results}, indent=2))
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+if __name__ == "__main__":
+    main()
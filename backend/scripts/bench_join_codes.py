@@ -0,0 +1,143 @@
+"""Join-code allocation time as the groups table fills up.
+
+Usage (from backend/):
+    python scripts/bench_join_codes.py --max-groups 1000000
+
+The script grows a fresh, migrated database to 1k, 10k, 100k, ... groups,
+with codes taken from the allocator's sequence. At each size it times
+``--samples`` group creations through ``allocate_join_code``, then the same
+number again served from released codes past their quarantine. For
+comparison it times the random 4-digit draw with a lookup per attempt that
+this replaces, at increasing occupancy of its 10,000-code space. That draw
+never finishes once all 10,000 codes are taken.
+"""
+
+import argparse
+import json
+import os
+import random
+import sqlite3
+import string
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+
+def fill(path: str, size: int) -> None:
+    """Add groups with the next codes of the sequence until there are ``size``."""
+    from app.join_codes import code_for_sequence
+
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA synchronous=OFF")
+    next_value, key = conn.execute("SELECT next_value, key FROM join_code_state WHERE id = 1").fetchone()
+    key = bytes.fromhex(key)
+    missing = size - conn.execute("SELECT count(*) FROM groups").fetchone()[0]
+    now = datetime.utcnow().isoformat(sep=" ")
+    conn.executemany(
+        "INSERT INTO groups (name, privacy, requires_approval, join_code, owner_id, version, created_at)"
+        " VALUES ('g', 'private', 0, ?, 1, 1, ?)",
+        ((code_for_sequence(sequence, key), now) for sequence in range(next_value, next_value + missing)),
+    )
+    conn.execute("UPDATE join_code_state SET next_value = ? WHERE id = 1", (next_value + missing,))
+    conn.commit()
+    conn.close()
+
+
+def time_creations(samples: int) -> dict:
+    from app.db import SessionLocal
+    from app.join_codes import allocate_join_code
+    from app.models import Group
+
+    timings = []
+    with SessionLocal() as db:
+        for _ in range(samples):
+            started = time.perf_counter()
+            code = allocate_join_code(db)
+            db.add(Group(name="g", privacy="private", requires_approval=False, join_code=code, owner_id=1))
+            db.commit()
+            timings.append(time.perf_counter() - started)
+    return summarize(timings)
+
+
+def release_aged(path: str, count: int) -> None:
+    """Rotate ``count`` groups' codes away and age the released codes past the quarantine."""
+    conn = sqlite3.connect(path)
+    released_at = (datetime.utcnow() - timedelta(days=365)).isoformat(sep=" ")
+    # Replacement codes are lowercase, which the allocator never hands out.
+    rows = conn.execute(
+        "SELECT id, join_code FROM groups WHERE join_code GLOB '[A-Z]*' ORDER BY id LIMIT ?", (count,)
+    ).fetchall()
+    conn.executemany(
+        "UPDATE groups SET join_code = ? WHERE id = ?", ((f"x{group_id}", group_id) for group_id, _ in rows)
+    )
+    conn.executemany(
+        "INSERT INTO released_join_codes (code, released_at) VALUES (?, ?)",
+        ((code, released_at) for _, code in rows),
+    )
+    conn.commit()
+    conn.close()
+
+
+def time_legacy(occupancy: float, samples: int) -> dict:
+    """The old generator: draw 4 digits, query, retry while taken."""
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE groups (id INTEGER PRIMARY KEY, join_code TEXT NOT NULL UNIQUE)")
+    taken = random.sample(range(10_000), int(10_000 * occupancy))
+    conn.executemany("INSERT INTO groups (join_code) VALUES (?)", ((f"{code:04d}",) for code in taken))
+    timings, attempts = [], 0
+    for _ in range(samples):
+        started = time.perf_counter()
+        while True:
+            attempts += 1
+            code = "".join(random.choices(string.digits, k=4))
+            if not conn.execute("SELECT id FROM groups WHERE join_code = ?", (code,)).fetchone():
+                break
+        timings.append(time.perf_counter() - started)
+    conn.close()
+    return {**summarize(timings), "attempts_per_code": round(attempts / samples, 1)}
+
+
+def summarize(timings: list[float]) -> dict:
+    timings = sorted(timings)
+    return {
+        "p50_ms": round(timings[len(timings) // 2] * 1000, 3),
+        "p99_ms": round(timings[max(0, int(len(timings) * 0.99) - 1)] * 1000, 3),
+        "max_ms": round(timings[-1] * 1000, 3),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--max-groups", type=int, default=1_000_000)
+    parser.add_argument("--samples", type=int, default=500)
+    args = parser.parse_args()
+
+    path = f"{tempfile.mkdtemp(prefix='bench-join-codes-')}/bench.db"
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    sys.path.insert(0, str(BACKEND_DIR))
+    from app.migrate import run_migrations
+
+    run_migrations()
+    allocator = []
+    size = 1000
+    while size <= args.max_groups:
+        fill(path, size)
+        result = {"groups": size, "sequence": time_creations(args.samples)}
+        release_aged(path, args.samples)
+        result["recycled"] = time_creations(args.samples)
+        allocator.append(result)
+        size *= 10
+
+    legacy = [
+        {"occupancy": occupancy, **time_legacy(occupancy, args.samples)}
+        for occupancy in (0.1, 0.5, 0.9, 0.99, 0.999)
+    ]
+    print(json.dumps({"allocator": allocator, "legacy_4_digit": legacy}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
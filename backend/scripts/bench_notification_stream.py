@@ -0,0 +1,159 @@
+"""Idle SSE connections per worker and notification delivery latency.
+
+Usage (from backend/):
+    python scripts/bench_notification_stream.py --streams 10000
+
+Starts one uvicorn worker on a fresh database and opens ``--streams`` idle
+``GET /notifications/stream`` connections for one user. It then reports the
+server's resident memory, sends a friend reminder to that user, and times
+delivery of the event to every stream. Finally it reconnects with
+Last-Event-ID and checks that a missed notification is replayed.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_checkins_today import BACKEND_DIR, call, free_port, wait_ready  # noqa: E402
+
+
+def rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status", encoding="ascii") as handle:
+        for line in handle:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+async def open_stream(port: int, token: str, last_event_id: int | None = None):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port, limit=2**20)
+    headers = [
+        "GET /notifications/stream HTTP/1.1",
+        f"Host: 127.0.0.1:{port}",
+        f"Authorization: Bearer {token}",
+        "Accept: text/event-stream",
+    ]
+    if last_event_id is not None:
+        headers.append(f"Last-Event-ID: {last_event_id}")
+    writer.write(("\r\n".join(headers) + "\r\n\r\n").encode())
+    await writer.drain()
+    status = await reader.readline()
+    if b" 200 " not in status:
+        raise RuntimeError(f"stream rejected: {status!r}")
+    while (await reader.readline()) not in (b"\r\n", b""):
+        pass
+    return reader, writer
+
+
+async def wait_for_event(reader: asyncio.StreamReader, kind: str) -> str:
+    """Read chunks until an event of ``kind`` arrives; returns its data line."""
+    buffer = b""
+    while True:
+        chunk = await reader.read(65536)
+        if not chunk:
+            raise RuntimeError("stream closed")
+        buffer += chunk
+        marker = f"event: {kind}\n".encode()
+        if marker in buffer:
+            rest = buffer.split(marker, 1)[1]
+            while b"\n\n" not in rest:
+                rest += await reader.read(65536)
+            return next(line for line in rest.decode().splitlines() if line.startswith("data: "))[6:]
+
+
+async def bench(args, port: int, pid: int, sender: str, receiver: str, sender_id: int) -> dict:
+    rss_before = rss_mb(pid)
+    started = time.perf_counter()
+    streams = []
+    for offset in range(0, args.streams, 500):
+        batch = min(500, args.streams - offset)
+        streams.extend(await asyncio.gather(*(open_stream(port, receiver) for _ in range(batch))))
+    connect_s = time.perf_counter() - started
+    await asyncio.sleep(1)
+    stats = await asyncio.to_thread(call, f"http://127.0.0.1:{port}", "GET", "/internal/stats")
+    rss_after = rss_mb(pid)
+
+    sent_at = time.perf_counter()
+    await asyncio.to_thread(call, f"http://127.0.0.1:{port}", "POST", f"/friends/{args.receiver_id}/remind", None, sender)
+
+    async def delivery(reader) -> float:
+        await wait_for_event(reader, "notification")
+        return time.perf_counter() - sent_at
+
+    latencies = sorted(await asyncio.gather(*(delivery(reader) for reader, _ in streams)))
+    for _, writer in streams:
+        writer.close()
+
+    # Resume: miss one notification, then reconnect with Last-Event-ID.
+    reader, writer = await open_stream(port, receiver)
+    await asyncio.to_thread(
+        call, f"http://127.0.0.1:{port}", "POST", f"/friends/{args.receiver_id}/encourage", {"emoji": "💪"}, sender
+    )
+    first = json.loads(await wait_for_event(reader, "notification"))
+    writer.close()
+    await asyncio.to_thread(
+        call, f"http://127.0.0.1:{port}", "POST", f"/friends/{args.receiver_id}/encourage", {"emoji": "🎉"}, sender
+    )
+    await asyncio.sleep(3)
+    reader, writer = await open_stream(port, receiver, last_event_id=first["id"])
+    replayed = json.loads(await asyncio.wait_for(wait_for_event(reader, "notification"), timeout=10))
+    writer.close()
+
+    return {
+        "streams": args.streams,
+        "connections_seen": stats[1]["notification_stream"]["connections"],
+        "connect_s": round(connect_s, 1),
+        "rss_mb_before": round(rss_before, 1),
+        "rss_mb_after": round(rss_after, 1),
+        "kb_per_stream": round((rss_after - rss_before) * 1024 / args.streams, 1),
+        "delivery_p50_ms": round(latencies[len(latencies) // 2] * 1000),
+        "delivery_max_ms": round(latencies[-1] * 1000),
+        "resume_replayed": replayed["id"] > first["id"] and "🎉" in replayed["message"],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--streams", type=int, default=10000)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench-stream-")
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{workdir}/bench.db", "PASSWORD_HASH_WORKERS": "0"}
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    subprocess.run([sys.executable, "-m", "app.manage", "migrate"], cwd=BACKEND_DIR, env=env, check=True)
+    proc = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port),
+            "--log-level", "warning", "--backlog", "4096",
+        ],
+        cwd=BACKEND_DIR,
+        env=env,
+    )
+    try:
+        wait_ready(base, proc)
+        tokens = []
+        for phone in ("13800000001", "13800000002"):
+            call(base, "POST", "/auth/register", {"phone": phone, "password": "benchpass1", "sms_code": "123456"})
+            tokens.append(call(base, "POST", "/auth/login", {"phone": phone, "password": "benchpass1"})[1]["access_token"])
+        sender, receiver = tokens
+        call(base, "POST", "/friends/request", {"phone": "13800000002"}, sender)
+        args.receiver_id = call(base, "GET", "/me", token=receiver)[1]["id"]
+        sender_id = call(base, "GET", "/me", token=sender)[1]["id"]
+        call(base, "POST", "/friends/accept", {"friend_id": sender_id}, receiver)
+        print(json.dumps(asyncio.run(bench(args, port, proc.pid, sender, receiver, sender_id))))
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+if __name__ == "__main__":
+    main()
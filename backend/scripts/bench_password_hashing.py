@@ -0,0 +1,139 @@
+"""Login throughput and its effect on unrelated endpoints.
+
+Profiles: Argon2 inline in the request thread (PASSWORD_HASH_WORKERS=0, the old
+behaviour) and the bounded process pool from app/hashing.py.
+
+Usage (from backend/):
+    python scripts/bench_password_hashing.py --seconds 10 --concurrency 16
+
+Each profile starts its own uvicorn on a fresh database file and first
+measures GET /checkins/today latency while idle. It then runs a login storm
+from a thread pool while one probe thread keeps calling GET /checkins/today,
+and reports logins/s, logins/s per hashing core, 503 rejections, and the probe
+latency under load.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_checkins_today import BACKEND_DIR, call, free_port, wait_ready  # noqa: E402
+
+PROFILES = {
+    "inline": {"PASSWORD_HASH_WORKERS": "0"},
+    "pool": {},
+}
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return round(values[max(0, int(len(values) * fraction) - 1)] * 1000, 1)
+
+
+def probe(base: str, token: str, stop: threading.Event, latencies: list[float]) -> None:
+    while not stop.is_set():
+        started = time.perf_counter()
+        call(base, "GET", "/checkins/today", token=token)
+        latencies.append(time.perf_counter() - started)
+        time.sleep(0.01)
+
+
+def run_profile(name: str, args) -> dict:
+    workdir = tempfile.mkdtemp(prefix=f"bench-hash-{name}-")
+    env = {**os.environ, **PROFILES[name], "DATABASE_URL": f"sqlite:///{workdir}/bench.db"}
+    if args.workers is not None and name == "pool":
+        env["PASSWORD_HASH_WORKERS"] = str(args.workers)
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    subprocess.run([sys.executable, "-m", "app.manage", "migrate"], cwd=BACKEND_DIR, env=env, check=True)
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env=env,
+    )
+    try:
+        wait_ready(base, proc)
+        phones = [f"1390000{i:04d}" for i in range(args.users)]
+        for phone in phones:
+            call(base, "POST", "/auth/register", {"phone": phone, "password": "benchpass1", "sms_code": "123456"})
+        status, pair = call(base, "POST", "/auth/login", {"phone": phones[0], "password": "benchpass1"})
+        if status != 200:
+            raise RuntimeError(f"login failed with {status}")
+        token = pair["access_token"]
+        call(base, "POST", "/checkins/today", {"alive": True}, token)
+
+        idle: list[float] = []
+        stop = threading.Event()
+        probe_thread = threading.Thread(target=probe, args=(base, token, stop, idle))
+        probe_thread.start()
+        time.sleep(2)
+        stop.set()
+        probe_thread.join()
+
+        loaded: list[float] = []
+        stop = threading.Event()
+        probe_thread = threading.Thread(target=probe, args=(base, token, stop, loaded))
+        deadline = time.perf_counter() + args.seconds
+
+        def storm(i: int) -> tuple[int, int]:
+            ok = busy = 0
+            while time.perf_counter() < deadline:
+                phone = phones[i % len(phones)]
+                status, _ = call(base, "POST", "/auth/login", {"phone": phone, "password": "benchpass1"})
+                ok += status == 200
+                busy += status == 503
+            return ok, busy
+
+        probe_thread.start()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            results = list(pool.map(storm, range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        probe_thread.join()
+        stats = call(base, "GET", "/internal/stats")[1]["password_pool"]
+    finally:
+        proc.terminate()
+        proc.wait()
+
+    logins = sum(ok for ok, _ in results)
+    cores = max(1, stats["workers"])
+    return {
+        "profile": name,
+        "hash_workers": stats["workers"],
+        "logins_per_s": round(logins / elapsed, 1),
+        "logins_per_s_per_core": round(logins / elapsed / cores, 1),
+        "rejected_503": sum(busy for _, busy in results),
+        "probe_idle_p50_ms": percentile(idle, 0.5),
+        "probe_idle_p99_ms": percentile(idle, 0.99),
+        "probe_storm_p50_ms": percentile(loaded, 0.5),
+        "probe_storm_p99_ms": percentile(loaded, 0.99),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--workers", type=int, help="PASSWORD_HASH_WORKERS for the pool profile")
+    parser.add_argument("--profile", choices=sorted(PROFILES), action="append")
+    args = parser.parse_args()
+
+    for name in args.profile or ["inline", "pool"]:
+        print(json.dumps(run_profile(name, args)))
+
+
+if __name__ == "__main__":
+    main()
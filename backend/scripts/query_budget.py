@@ -0,0 +1,416 @@
+"""Query-count and latency checks for the list endpoints.
+
+Usage (from backend/):
+    python scripts/query_budget.py            # every scenario
+    python scripts/query_budget.py groups     # a single scenario
+
+Each scenario grows a throwaway SQLite database through several sizes, calls
+the route handler directly, counts the SQL statements it issues and reports
+p50/p99 handler latency over repeated calls. The script exits with status 1
+when a statement count changes with the data size.
+"""
+
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp(prefix='query-budget-')}/budget.db"
+sys.path.insert(0, str(BACKEND_DIR))
+
+from fastapi import Response  # noqa: E402
+from sqlalchemy import delete, event, insert, select  # noqa: E402
+
+from app.db import SessionLocal, engine  # noqa: E402
+from app.migrate import run_migrations  # noqa: E402
+from app.leaderboards import leaderboard_periods  # noqa: E402
+from app.models import (  # noqa: E402
+    Checkin,
+    Friendship,
+    Group,
+    GroupEncouragement,
+    GroupLeaderboardScore,
+    GroupMember,
+    Notification,
+    User,
+)
+from app.pagination import encode_cursor  # noqa: E402
+from app.routers import checkins, groups, notifications, social  # noqa: E402
+from app.schemas import GroupJoinRequest  # noqa: E402
+from app.timezones import LocalDates, get_user_local_date  # noqa: E402
+
+SCENARIOS = {}
+
+
+class QueryCounter:
+    def __init__(self) -> None:
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self.on_execute)
+
+    def on_execute(self, *args) -> None:
+        self.count += 1
+
+    def measure(self, fn, repeat: int = 20) -> tuple[int, list[float]]:
+        self.count = 0
+        fn()
+        count = self.count
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - started)
+        return count, sorted(timings)
+
+
+def scenario(fn):
+    SCENARIOS[fn.__name__] = fn
+    return fn
+
+
+def add_user(db, phone: str, timezone: str = "Asia/Shanghai") -> User:
+    user = User(phone=phone, password_hash="x", timezone=timezone)
+    db.add(user)
+    db.flush()
+    return user
+
+
+DIRECTORY_SIZES = (100, 10_000, 100_000)
+
+
+def grow_directory(db, me: User, owner_id: int, created: int, size: int) -> None:
+    """Bulk-add groups up to ``size``; ``me`` is an accepted member of the first 20."""
+    db.execute(
+        insert(Group),
+        [
+            {
+                "name": f"晨跑打卡{i}" if i % 100 else f"夜读会{i}",
+                "privacy": "public",
+                "requires_approval": True,
+                "join_code": f"Q{i:07d}",
+                "owner_id": owner_id,
+            }
+            for i in range(created, size)
+        ],
+    )
+    group_ids = db.scalars(select(Group.id).order_by(Group.id).offset(created)).all()
+    db.execute(
+        insert(GroupMember),
+        [
+            {"group_id": group_id, "user_id": user_id, "role": role, "status": "accepted"}
+            for index, group_id in enumerate(group_ids, start=created)
+            for user_id, role in ((owner_id, "owner"), (me.id, "member"))
+            if role == "owner" or index < 20
+        ],
+    )
+    db.commit()
+
+
+def directory_scenario(name: str, call) -> list[tuple[int, int, list[float]]]:
+    """Rebuild the group directory from scratch and ``call(db, me)`` at each size."""
+    results = []
+    with SessionLocal() as db:
+        me = add_user(db, f"dir-{name}")
+        owner = add_user(db, f"dir-{name}-owner")
+        db.add(Checkin(user_id=me.id, date=get_user_local_date(me), alive=True))
+        db.execute(delete(GroupMember))
+        db.execute(delete(Group))
+        db.commit()
+        created = 0
+        for size in DIRECTORY_SIZES:
+            grow_directory(db, me, owner.id, created, size)
+            created = size
+            count, timings = call(db, me)
+            results.append((size, count, timings))
+    return results
+
+
+def directory_page(db, me: User, q: str | None = None) -> list:
+    return groups.list_groups(
+        response=Response(), q=q, limit=50, cursor=None, if_none_match=None, db=db, current_user=me
+    )
+
+
+@scenario
+def groups_list(counter: QueryCounter) -> list[tuple[int, int, list[float]]]:
+    """GET /groups, first directory page; the caller is in 20 groups, one checked in."""
+    return directory_scenario("list", lambda db, me: counter.measure(lambda: directory_page(db, me)))
+
+
+@scenario
+def groups_search_common(counter: QueryCounter) -> list[tuple[int, int, list[float]]]:
+    """GET /groups?q= with a term that matches 99% of groups."""
+    return directory_scenario("common", lambda db, me: counter.measure(lambda: directory_page(db, me, "晨跑打")))
+
+
+@scenario
+def groups_search_rare(counter: QueryCounter) -> list[tuple[int, int, list[float]]]:
+    """GET /groups?q= with a term that matches 1% of groups."""
+    return directory_scenario("rare", lambda db, me: counter.measure(lambda: directory_page(db, me, "夜读会")))
+
+
+@scenario
+def groups_mine(counter: QueryCounter) -> list[tuple[int, int, list[float]]]:
+    """GET /groups/mine for a member of 20 groups."""
+    return directory_scenario(
+        "mine",
+        lambda db, me: counter.measure(
+            lambda: groups.list_my_groups(response=Response(), if_none_match=None, db=db, current_user=me)
+        )
+    )
+
+
+@scenario
+def group_detail(counter: QueryCounter) -> list[tuple[int, int, list[float]]]:
+    """GET /groups/{id} for a member, members spread over three timezones."""
+    timezones = ("Asia/Shanghai", "Europe/London", "America/New_York")
+    results = []
+    with SessionLocal() as db:
+        me = add_user(db, "13700000000")
+        group = Group(name="big", privacy="public", requires_approval=True, join_code="D000001", owner_id=me.id)
+        db.add(group)
+        db.flush()
+        db.add(GroupMember(group_id=group.id, user_id=me.id, role="owner", status="accepted"))
+        created = 1
+        for size in (10, 100, 1000):
+            while created < size:
+                user = add_user(db, f"137{created:08d}", timezone=timezones[created % len(timezones)])
+                db.add(GroupMember(group_id=group.id, user_id=user.id, role="member", status="accepted"))
+                if created % 2:
+                    db.add(Checkin(user_id=user.id, date=get_user_local_date(user), alive=True))
+                created += 1
+            db.commit()
+            count, timings = counter.measure(
+                lambda: groups.get_group_detail(group_id=group.id, db=db, current_user=me)
+            )
+            results.append((size, count, timings))
+    return results
+
+
+@scenario
+def group_leaderboard(counter: QueryCounter) -> list[tuple[int, int, list[float]]]:
+    """GET /groups/{id}/leaderboard?metric=week for a member ranked last, every score distinct."""
+    results = []
+    with SessionLocal() as db:
+        me = add_user(db, "13200000000")
+        group = Group(name="board", privacy="public", requires_approval=False, join_code="L000001", owner_id=me.id)
+        db.add(group)
+        db.flush()
+        db.add(GroupMember(group_id=group.id, user_id=me.id, role="owner", status="accepted"))
+        period = leaderboard_periods("week", LocalDates())[0]
+        db.add(GroupLeaderboardScore(group_id=group.id, metric="week", user_id=me.id, period=period, score=1))
+        created = 1
+        for size in (10, 1000, 100_000):
+            rows = [
+                {"phone": f"132{i:08d}", "password_hash": "x", "timezone": "Asia/Shanghai"}
+                for i in range(created, size)
+            ]
+            user_ids = db.scalars(insert(User).returning(User.id), rows).all() if rows else []
+            if user_ids:
+                db.execute(
+                    insert(GroupMember),
+                    [{"group_id": group.id, "user_id": uid, "role": "member", "status": "accepted"} for uid in user_ids],
+                )
+                db.execute(
+                    insert(GroupLeaderboardScore),
+                    [
+                        {"group_id": group.id, "metric": "week", "user_id": uid, "period": period, "score": 1 + uid}
+                        for uid in user_ids
+                    ],
+                )
+            created = size
+            db.commit()
+            count, timings = counter.measure(
+                lambda: groups.get_group_leaderboard(
+                    group_id=group.id, metric="week", limit=10, db=db, current_user=me, dates=LocalDates()
+                )
+            )
+            results.append((size, count, timings))
+    return results
+
+
+@scenario
+def encouragement_wall(counter: QueryCounter) -> list[tuple[int, int, list[float]]]:
+    """GET /groups/{id}/encouragements?limit=N, every item from a different member."""
+    results = []
+    with SessionLocal() as db:
+        me = add_user(db, "13800000000")
+        group = Group(name="wall", privacy="public", requires_approval=False, join_code="W000001", owner_id=me.id)
+        db.add(group)
+        db.flush()
+        db.add(GroupMember(group_id=group.id, user_id=me.id, role="owner", status="accepted"))
+        created = 0
+        for size in (10, 50, 100):
+            while created < size:
+                author = add_user(db, f"138{created + 1:08d}")
+                db.add(GroupMember(group_id=group.id, user_id=author.id, role="member", status="accepted"))
+                db.add(GroupEncouragement(group_id=group.id, user_id=author.id, emoji="💪", message="加油"))
+                created += 1
+            db.commit()
+            count, timings = counter.measure(
+                lambda: groups.list_group_encouragements(
+                    group_id=group.id, response=Response(), limit=size, cursor=None, db=db, current_user=me
+                )
+            )
+            results.append((size, count, timings))
+    return results
+
+
+@scenario
+def notifications_page(counter: QueryCounter) -> list[tuple[int, int, list[float]]]:
+    """GET /notifications?limit=N, every item from a different sender and group."""
+    results = []
+    with SessionLocal() as db:
+        me = add_user(db, "13600000000")
+        created = 0
+        for size in (10, 50, 100):
+            while created < size:
+                sender = add_user(db, f"136{created + 1:08d}")
+                group = Group(
+                    name=f"n{created}",
+                    privacy="public",
+                    requires_approval=True,
+                    join_code=f"N{created:06d}",
+                    owner_id=sender.id,
+                )
+                db.add(group)
+                db.flush()
+                db.add(
+                    Notification(
+                        user_id=me.id,
+                        from_user_id=sender.id,
+                        related_group_id=group.id,
+                        related_user_id=sender.id,
+                        kind="group_join_request",
+                        message="join",
+                    )
+                )
+                created += 1
+            db.commit()
+            count, timings = counter.measure(
+                lambda: notifications.list_notifications(
+                    response=Response(), limit=size, cursor=None, unread_only=False, db=db, current_user=me
+                )
+            )
+            results.append((size, count, timings))
+    return results
+
+
+@scenario
+def checkins_deep_page(counter: QueryCounter) -> list[tuple[int, int, list[float]]]:
+    """GET /checkins?cursor= for the oldest page of a history of N days."""
+    results = []
+    with SessionLocal() as db:
+        me = add_user(db, "13300000000")
+        first_day = date(2000, 1, 1)
+        created = 0
+        for size in (1000, 10000, 50000):
+            db.execute(
+                insert(Checkin),
+                [
+                    {"user_id": me.id, "date": first_day + timedelta(days=day), "alive": True}
+                    for day in range(created, size)
+                ],
+            )
+            created = size
+            db.commit()
+            # The cursor of the page that ends 30 rows before the oldest check-in.
+            day, row_id = db.execute(
+                select(Checkin.date, Checkin.id)
+                .where(Checkin.user_id == me.id)
+                .order_by(Checkin.date)
+                .offset(30)
+                .limit(1)
+            ).one()
+            cursor = encode_cursor(day, row_id)
+            count, timings = counter.measure(
+                lambda: checkins.list_checkins(
+                    response=Response(),
+                    from_date=None,
+                    to_date=None,
+                    limit=30,
+                    cursor=cursor,
+                    offset=0,
+                    order="desc",
+                    db=db,
+                    current_user=me,
+                )
+            )
+            results.append((size, count, timings))
+    return results
+
+
+@scenario
+def friends_list(counter: QueryCounter) -> list[tuple[int, int, list[float]]]:
+    """GET /friends, friends in three timezones with streaks of up to 20 days."""
+    timezones = ("Asia/Shanghai", "Europe/London", "America/New_York")
+    results = []
+    with SessionLocal() as db:
+        me = add_user(db, "13500000000")
+        created = 0
+        for size in (10, 100, 300):
+            while created < size:
+                friend = add_user(db, f"135{created + 1:08d}", timezone=timezones[created % len(timezones)])
+                db.add(Friendship(user_id=me.id, friend_id=friend.id, status="accepted"))
+                today = get_user_local_date(friend)
+                for offset in range(created % 20):
+                    db.add(Checkin(user_id=friend.id, date=today - timedelta(days=offset), alive=True))
+                created += 1
+            db.commit()
+            count, timings = counter.measure(
+                lambda: social.list_friends(
+                    response=Response(), if_none_match=None, db=db, current_user=me, dates=LocalDates()
+                )
+            )
+            results.append((size, count, timings))
+    return results
+
+
+@scenario
+def join_group(counter: QueryCounter) -> list[tuple[int, int, list[float]]]:
+    """POST /groups/join into an approval group with N admins (fan-out is left to the outbox)."""
+    results = []
+    with SessionLocal() as db:
+        owner = add_user(db, "13400000000")
+        group = Group(name="admins", privacy="public", requires_approval=True, join_code="J000001", owner_id=owner.id)
+        db.add(group)
+        db.flush()
+        db.add(GroupMember(group_id=group.id, user_id=owner.id, role="owner", status="accepted"))
+        created = 1
+        for size in (10, 100, 1000):
+            while created < size:
+                admin = add_user(db, f"134{created:08d}")
+                db.add(GroupMember(group_id=group.id, user_id=admin.id, role="admin", status="accepted"))
+                created += 1
+            joiners = iter([add_user(db, f"133{size:05d}{i:03d}") for i in range(21)])
+            db.commit()
+            payload = GroupJoinRequest(code_or_id=str(group.id))
+            count, timings = counter.measure(
+                lambda: groups.join_group(payload=payload, db=db, current_user=next(joiners))
+            )
+            results.append((size, count, timings))
+    return results
+
+
+def main() -> int:
+    run_migrations()
+    counter = QueryCounter()
+    names = sys.argv[1:] or list(SCENARIOS)
+    failed = False
+    for name in names:
+        results = SCENARIOS[name](counter)
+        counts = {count for _, count, _ in results}
+        status = "ok" if len(counts) == 1 else "FAIL: query count grows with size"
+        failed |= len(counts) != 1
+        print(f"{name}: {status}")
+        for size, count, timings in results:
+            p50 = timings[len(timings) // 2] * 1000
+            p99 = timings[max(0, int(len(timings) * 0.99) - 1)] * 1000
+            print(f"  size={size:>6} queries={count:>4} p50={p50:8.1f}ms p99={p99:8.1f}ms")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
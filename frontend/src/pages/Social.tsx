@@ -24,6 +24,12 @@ export default function Social() {
   const groupState = useGroups({ showNotice, showError });
   const {
     groups,
+    directory,
+    directoryQuery,
+    setDirectoryQuery,
+    hasMoreGroups,
+    loadingDirectory,
+    loadMoreGroups,
     refreshGroups,
     selectedGroup,
     groupEncourageOpen,
@@ -91,6 +97,12 @@ export default function Social() {
     onRemind: handleRemind,
     onEncourage: handleEncourage,
     groups,
+    directory,
+    directoryQuery,
+    onDirectoryQueryChange: setDirectoryQuery,
+    hasMoreGroups,
+    loadingDirectory,
+    onLoadMoreGroups: loadMoreGroups,
     onOpenPanel: () => setGroupPanelOpen(true),
     onOpenDetail: openGroupDetail,
     onOpenEncourage: openGroupEncourage,
@@ -156,6 +168,12 @@ export default function Social() {
 
       <GroupSection
         groups={sectionProps.group.groups}
+        directory={sectionProps.group.directory}
+        directoryQuery={sectionProps.group.directoryQuery}
+        onDirectoryQueryChange={sectionProps.group.onDirectoryQueryChange}
+        hasMoreGroups={sectionProps.group.hasMoreGroups}
+        loadingDirectory={sectionProps.group.loadingDirectory}
+        onLoadMoreGroups={sectionProps.group.onLoadMoreGroups}
         onOpenPanel={sectionProps.group.onOpenPanel}
         onOpenDetail={sectionProps.group.onOpenDetail}
         onOpenEncourage={sectionProps.group.onOpenEncourage}
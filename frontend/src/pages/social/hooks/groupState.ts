@@ -1,5 +1,12 @@
-import { useCallback, useEffect, useState } from "react";
-import { GroupDetail, GroupSummary, getGroupDetail, getGroups, getMe } from "../../../services/api";
+import { useCallback, useEffect, useRef, useState } from "react";
+import {
+  GroupDetail,
+  GroupSummary,
+  getGroupDetail,
+  getGroupDirectory,
+  getMe,
+  getMyGroups
+} from "../../../services/api";
 import { useAsyncList } from "../../../hooks";
 import { useAsyncValue } from "../../../hooks";
 import { useSheetState } from "../../../hooks";
@@ -13,13 +20,65 @@ export function useGroupList(showError: (message: string) => void) {
   );
 
   const { items, setItems, refresh } = useAsyncList<GroupSummary>({
-    load: getGroups,
+    load: getMyGroups,
     onError: handleError
   });
 
   return { groups: items, setGroups: setItems, refreshGroups: refresh };
 }
 
+export function useGroupDirectory(showError: (message: string) => void) {
+  const [directory, setDirectory] = useState<GroupSummary[]>([]);
+  const [directoryQuery, setDirectoryQuery] = useState("");
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingDirectory, setLoadingDirectory] = useState(false);
+  // Only the latest request may update the list; older searches are dropped.
+  const requestId = useRef(0);
+
+  const loadPage = useCallback(
+    async (query: string, cursor: string | null) => {
+      const id = ++requestId.current;
+      setLoadingDirectory(true);
+      try {
+        const page = await getGroupDirectory({ q: query.trim() || undefined, cursor });
+        if (id !== requestId.current) return;
+        setDirectory((prev) => (cursor ? [...prev, ...page.groups] : page.groups));
+        setNextCursor(page.nextCursor);
+      } catch (err) {
+        if (id === requestId.current) {
+          showError(err instanceof Error ? err.message : "群组加载失败");
+        }
+      } finally {
+        if (id === requestId.current) setLoadingDirectory(false);
+      }
+    },
+    [showError]
+  );
+
+  useEffect(() => {
+    const timer = window.setTimeout(() => void loadPage(directoryQuery, null), 300);
+    return () => window.clearTimeout(timer);
+  }, [directoryQuery, loadPage]);
+
+  const refreshDirectory = useCallback(() => loadPage(directoryQuery, null), [directoryQuery, loadPage]);
+
+  const loadMoreGroups = useCallback(() => {
+    if (nextCursor && !loadingDirectory) {
+      void loadPage(directoryQuery, nextCursor);
+    }
+  }, [directoryQuery, loadPage, loadingDirectory, nextCursor]);
+
+  return {
+    directory,
+    directoryQuery,
+    setDirectoryQuery,
+    hasMoreGroups: nextCursor !== null,
+    loadingDirectory,
+    refreshDirectory,
+    loadMoreGroups
+  };
+}
+
 export function useCurrentUserId() {
   const loadMe = useCallback(async () => {
     const me = await getMe();
@@ -1,13 +1,26 @@
-import { useState } from "react";
+import { useCallback, useState } from "react";
 import type { NoticeHandlers } from "../../../hooks";
 import { useGroupActions } from "./groupActions";
 import { useGroupDetailDrafts, useGroupEncourageWall, useGroupForm } from "./groupHooks";
 import { useGroupJoinRequests } from "./groupJoinRequests";
 import { useGroupPermissions } from "./groupPermissions";
-import { useCurrentUserId, useGroupList, useGroupSelection } from "./groupState";
+import { useCurrentUserId, useGroupDirectory, useGroupList, useGroupSelection } from "./groupState";
 
 export function useGroups({ showNotice, showError }: NoticeHandlers) {
-  const { groups, refreshGroups } = useGroupList(showError);
+  const { groups, refreshGroups: refreshMyGroups } = useGroupList(showError);
+  const {
+    directory,
+    directoryQuery,
+    setDirectoryQuery,
+    hasMoreGroups,
+    loadingDirectory,
+    refreshDirectory,
+    loadMoreGroups
+  } = useGroupDirectory(showError);
+  // Creating, joining or approving changes both lists: my groups and the statuses in the directory.
+  const refreshGroups = useCallback(async () => {
+    await Promise.all([refreshMyGroups(), refreshDirectory()]);
+  }, [refreshDirectory, refreshMyGroups]);
   const {
     selectedGroup,
     setSelectedGroup,
@@ -82,6 +95,12 @@ export function useGroups({ showNotice, showError }: NoticeHandlers) {
 
   return {
     groups,
+    directory,
+    directoryQuery,
+    setDirectoryQuery,
+    hasMoreGroups,
+    loadingDirectory,
+    loadMoreGroups,
     refreshGroups,
     selectedGroup,
     selectedGroupId,
@@ -23,6 +23,12 @@ export type FriendSectionProps = {
 
 export type GroupSectionProps = {
   groups: GroupSummary[];
+  directory: GroupSummary[];
+  directoryQuery: string;
+  onDirectoryQueryChange: (value: string) => void;
+  hasMoreGroups: boolean;
+  loadingDirectory: boolean;
+  onLoadMoreGroups: () => void;
   onOpenPanel: () => void;
   onOpenDetail: (groupId: number) => void;
   onOpenEncourage: (groupId: number) => void;
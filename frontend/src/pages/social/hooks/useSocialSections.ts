@@ -23,6 +23,12 @@ export function useSocialSections({
   onRemind,
   onEncourage,
   groups,
+  directory,
+  directoryQuery,
+  onDirectoryQueryChange,
+  hasMoreGroups,
+  loadingDirectory,
+  onLoadMoreGroups,
   onOpenPanel,
   onOpenDetail,
   onOpenEncourage,
@@ -57,6 +63,12 @@ export function useSocialSections({
   });
   const group = useGroupSectionProps({
     groups,
+    directory,
+    directoryQuery,
+    onDirectoryQueryChange,
+    hasMoreGroups,
+    loadingDirectory,
+    onLoadMoreGroups,
     onOpenPanel,
     onOpenDetail,
     onOpenEncourage,
@@ -116,6 +128,12 @@ export function useFriendSectionProps({
 
 export function useGroupSectionProps({
   groups,
+  directory,
+  directoryQuery,
+  onDirectoryQueryChange,
+  hasMoreGroups,
+  loadingDirectory,
+  onLoadMoreGroups,
   onOpenPanel,
   onOpenDetail,
   onOpenEncourage,
@@ -123,6 +141,12 @@ export function useGroupSectionProps({
 }: GroupSectionParams): SocialSectionProps["group"] {
   return {
     groups,
+    directory,
+    directoryQuery,
+    onDirectoryQueryChange,
+    hasMoreGroups,
+    loadingDirectory,
+    onLoadMoreGroups,
     onOpenPanel,
     onOpenDetail,
     onOpenEncourage,
@@ -2,15 +2,27 @@ import { EmptyState, SectionHeader } from "../../../../components/common";
 import type { GroupSectionProps } from "../../hooks/sectionProps";
 import GroupCard from "./GroupCard";
 import GroupSectionHeader from "./GroupSectionHeader";
+import { Button } from "@/components/ui/button";
 import { Card, CardContent } from "@/components/ui/card";
+import { Input } from "@/components/ui/input";
 
 export default function GroupSection({
   groups,
+  directory,
+  directoryQuery,
+  onDirectoryQueryChange,
+  hasMoreGroups,
+  loadingDirectory,
+  onLoadMoreGroups,
   onOpenPanel,
   onOpenDetail,
   onOpenEncourage,
   isGroupMember
 }: GroupSectionProps) {
+  // Groups already in "my groups" are not repeated in the directory.
+  const myGroupIds = new Set(groups.map((group) => group.id));
+  const otherGroups = directory.filter((group) => !myGroupIds.has(group.id));
+
   return (
     <section>
       <Card className="border-border/70 bg-white/85 shadow-soft backdrop-blur">
@@ -35,6 +47,42 @@ export default function GroupSection({
               ))}
             </div>
           )}
+          <div className="space-y-3 border-t border-border/60 pt-4">
+            <div className="text-sm font-semibold text-ink">发现群组</div>
+            <Input
+              value={directoryQuery}
+              placeholder="搜索群名称或公告"
+              onChange={(event) => onDirectoryQueryChange(event.target.value)}
+            />
+            {otherGroups.length === 0 && !loadingDirectory && !hasMoreGroups ? (
+              <div className="text-center text-xs text-muted-foreground">
+                {directoryQuery.trim() ? "没有找到相关群组" : "暂时没有其它群组"}
+              </div>
+            ) : (
+              <div className="flex flex-col gap-3">
+                {otherGroups.map((group) => (
+                  <GroupCard
+                    key={group.id}
+                    group={group}
+                    isMember={isGroupMember(group)}
+                    onOpenDetail={onOpenDetail}
+                    onOpenEncourage={onOpenEncourage}
+                  />
+                ))}
+              </div>
+            )}
+            {hasMoreGroups ? (
+              <Button
+                type="button"
+                variant="outline"
+                className="w-full rounded-full"
+                disabled={loadingDirectory}
+                onClick={onLoadMoreGroups}
+              >
+                {loadingDirectory ? "加载中..." : "加载更多"}
+              </Button>
+            ) : null}
+          </div>
         </CardContent>
       </Card>
     </section>
@@ -184,6 +184,11 @@ export type GroupSummary = {
   status: "member" | "pending" | "none";
 };
 
+export type GroupDirectoryPage = {
+  groups: GroupSummary[];
+  nextCursor: string | null;
+};
+
 export type GroupMember = {
   id: number;
   name: string;
@@ -588,11 +593,25 @@ export async function markAllNotificationsRead(): Promise<void> {
   await handleJson(res);
 }
 
-export async function getGroups(): Promise<GroupSummary[]> {
-  const res = await apiFetch(`${API_BASE}/groups`);
+export async function getMyGroups(): Promise<GroupSummary[]> {
+  const res = await apiFetch(`${API_BASE}/groups/mine`);
   return handleJson<GroupSummary[]>(res);
 }
 
+export async function getGroupDirectory(params: {
+  q?: string;
+  cursor?: string | null;
+  limit?: number;
+}): Promise<GroupDirectoryPage> {
+  const search = new URLSearchParams();
+  if (params.q) search.set("q", params.q);
+  if (params.cursor) search.set("cursor", params.cursor);
+  if (params.limit) search.set("limit", String(params.limit));
+  const res = await apiFetch(`${API_BASE}/groups?${search.toString()}`);
+  const groups = await handleJson<GroupSummary[]>(res);
+  return { groups, nextCursor: res.headers.get("X-Next-Cursor") };
+}
+
 export async function getGroupDetail(groupId: number): Promise<GroupDetail> {
   const res = await apiFetch(`${API_BASE}/groups/${groupId}`);
   return handleJson<GroupDetail>(res);